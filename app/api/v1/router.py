@@ -15,6 +15,9 @@ from app.modules.metrics.router import router as metrics_router
 from app.modules.asaas.router import router as asaas_router
 from app.modules.equipe.router import router as equipe_router
 from app.modules.financeiro.router import router as financeiro_router
+from app.modules.financeiro.router import root_router as financeiro_root_router
+from app.modules.events.router import router as events_router
+from app.modules.agenda.router import router as agenda_router
 
 api_router = APIRouter()
 
@@ -32,4 +35,7 @@ api_router.include_router(atividades_router, prefix="/atividades", tags=["ativid
 api_router.include_router(metrics_router, prefix="/metrics", tags=["metrics"])
 api_router.include_router(asaas_router, prefix="/billing", tags=["Billing/Asaas"])
 api_router.include_router(equipe_router, prefix="/equipe", tags=["Equipe"])
-api_router.include_router(financeiro_router, prefix="/financeiro/pagamentos", tags=["Financeiro - Pagamentos"])
\ No newline at end of file
+api_router.include_router(financeiro_router, prefix="/financeiro/pagamentos", tags=["Financeiro - Pagamentos"])
+api_router.include_router(financeiro_root_router, prefix="/financeiro")
+api_router.include_router(events_router, prefix="/events", tags=["events"])
+api_router.include_router(agenda_router, prefix="/agenda", tags=["agenda"])
\ No newline at end of file
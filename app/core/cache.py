@@ -0,0 +1,185 @@
+# app/core/cache.py
+"""
+Cache de respostas por mentor, com invalidação por tags.
+
+- Chave: (mentor_id, rota, parâmetros) + versões das tags da resposta.
+- Tags ("students", "pagamentos", "products", "atividades"...) são por mentor. Cada
+  tag tem uma versão aleatória; `invalidate(mentor_id, *tags)` troca a versão e as
+  entradas antigas ficam inalcançáveis (expiram sozinhas).
+  Os handlers de escrita chamam `invalidate` depois do commit.
+- `stale` > 0 = stale-while-revalidate: vencido o `ttl`, a resposta antiga ainda é
+  servida por até `stale` segundos enquanto uma tarefa recalcula em sessão própria.
+
+Backend: LRU em memória (padrão, por processo) ou Redis quando `CACHE_URL` está
+configurada (requer o pacote `redis`; compartilhado entre instâncias).
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Iterable, Optional, Protocol
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger("mentorpro.cache")
+
+Loader = Callable[[AsyncSession], Awaitable[Any]]
+
+# versões de tag vivem bem mais que qualquer entrada
+TAG_TTL_SECONDS = 7 * 24 * 3600
+
+
+class Backend(Protocol):
+    async def get(self, key: str) -> Optional[str]: ...
+    async def set(self, key: str, value: str, ttl: float) -> None: ...
+    async def tag_versions(self, tags: list[str]) -> list[str]: ...
+    async def bump_tags(self, tags: list[str]) -> None: ...
+
+
+class MemoryBackend:
+    def __init__(self, maxsize: int) -> None:
+        self._data = TTLCache(ttl=60, maxsize=maxsize)
+        self._tags = TTLCache(ttl=TAG_TTL_SECONDS, maxsize=maxsize)
+
+    async def get(self, key: str) -> Optional[str]:
+        return self._data.get(key)
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        self._data.set(key, value, ttl)
+
+    async def tag_versions(self, tags: list[str]) -> list[str]:
+        out = []
+        for t in tags:
+            v = self._tags.get(t)
+            if v is None:
+                # tag sem versão (nova ou descartada) nunca reaproveita entradas antigas
+                v = uuid.uuid4().hex
+                self._tags.set(t, v)
+            out.append(v)
+        return out
+
+    async def bump_tags(self, tags: list[str]) -> None:
+        for t in tags:
+            self._tags.set(t, uuid.uuid4().hex)
+
+
+class RedisBackend:
+    def __init__(self, url: str) -> None:
+        import redis.asyncio as aioredis  # opcional: só com CACHE_URL
+
+        self._r = aioredis.from_url(url, decode_responses=True)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._r.get(key)
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        await self._r.set(key, value, px=max(int(ttl * 1000), 1))
+
+    async def tag_versions(self, tags: list[str]) -> list[str]:
+        keys = [f"tag:{t}" for t in tags]
+        vals = await self._r.mget(keys)
+        for i, v in enumerate(vals):
+            if v is None:
+                await self._r.set(keys[i], uuid.uuid4().hex, ex=TAG_TTL_SECONDS, nx=True)
+                vals[i] = await self._r.get(keys[i])
+        return vals
+
+    async def bump_tags(self, tags: list[str]) -> None:
+        async with self._r.pipeline(transaction=False) as p:
+            for t in tags:
+                p.set(f"tag:{t}", uuid.uuid4().hex, ex=TAG_TTL_SECONDS)
+            await p.execute()
+
+
+def _make_backend() -> Backend:
+    if settings.CACHE_URL:
+        try:
+            return RedisBackend(settings.CACHE_URL)
+        except Exception:
+            logger.exception("[CACHE] Redis indisponível (%s); usando memória", settings.CACHE_URL)
+    return MemoryBackend(settings.CACHE_MAX_ENTRIES)
+
+
+backend: Backend = _make_backend()
+
+# chaves em recálculo (stale-while-revalidate) e suas tarefas
+_REFRESHING: dict[str, asyncio.Task] = {}
+
+
+def _tags(mentor_id: Any, tags: Iterable[str]) -> list[str]:
+    return [f"{mentor_id}:{t}" for t in tags]
+
+
+async def invalidate(mentor_id: Any, *tags: str) -> None:
+    """Chamar após o commit da escrita."""
+    try:
+        await backend.bump_tags(_tags(mentor_id, tags))
+    except Exception:
+        logger.exception("[CACHE] falha ao invalidar %s %s", mentor_id, tags)
+
+
+async def _store(key: str, value: Any, ttl: float, stale: float) -> None:
+    entry = json.dumps({"f": time.time() + ttl, "v": value}, separators=(",", ":"))
+    await backend.set(key, entry, ttl + stale)
+
+
+async def _refresh(key: str, loader: Loader, ttl: float, stale: float) -> None:
+    try:
+        async with AsyncSessionLocal() as db:
+            await _store(key, jsonable_encoder(await loader(db)), ttl, stale)
+    except Exception:
+        logger.exception("[CACHE] recálculo de %s falhou", key)
+    finally:
+        _REFRESHING.pop(key, None)
+
+
+async def cached(
+    db: AsyncSession,
+    *,
+    mentor_id: Any,
+    route: str,
+    params: Any = None,
+    tags: Iterable[str],
+    ttl: float,
+    loader: Loader,
+    stale: float = 0,
+    refresh: bool = False,
+) -> Any:
+    """
+    Resposta (já em forma JSON) de `loader(db)`, do cache quando possível.
+    O loader recebe a sessão: no recálculo em segundo plano ela é própria.
+    `refresh=True` ignora o que está em cache e grava o resultado recalculado.
+    """
+    try:
+        versions = await backend.tag_versions(_tags(mentor_id, tags))
+        raw = json.dumps([route, mentor_id, params, versions], sort_keys=True, default=str)
+        key = f"resp:{mentor_id}:{route}:{hashlib.sha1(raw.encode()).hexdigest()}"
+        hit = None if refresh else await backend.get(key)
+    except Exception:
+        logger.exception("[CACHE] backend indisponível; calculando sem cache")
+        return jsonable_encoder(await loader(db))
+
+    if hit is not None:
+        entry = json.loads(hit)
+        if entry["f"] >= time.time():
+            return entry["v"]
+        if stale and key not in _REFRESHING:
+            _REFRESHING[key] = asyncio.create_task(_refresh(key, loader, ttl, stale))
+        if stale:
+            return entry["v"]
+
+    value = jsonable_encoder(await loader(db))
+    try:
+        await _store(key, value, ttl, stale)
+    except Exception:
+        logger.exception("[CACHE] falha ao gravar %s", key)
+    return value
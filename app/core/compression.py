@@ -0,0 +1,181 @@
+# app/core/compression.py
+"""
+Compressão das respostas (gzip ou brotli) negociada pelo `Accept-Encoding`.
+
+- brotli tem preferência quando o cliente aceita e o pacote `brotli` está instalado;
+  sem o pacote, só gzip.
+- corpo inteiro (Response comum): abaixo de `COMPRESSION_MIN_BYTES` sai sem compressão;
+- corpo em partes (StreamingResponse): cada parte passa pelo compressor e o que ele já
+  produziu é enviado na hora — memória limitada, sem acumular o corpo. Partes pequenas
+  não forçam flush (pioraria a taxa); a cada `STREAM_FLUSH_BYTES` de entrada há um
+  flush para o cliente ir recebendo os dados;
+- SSE (`text/event-stream`) nunca é comprimido: cada evento precisa sair imediatamente;
+- só tipos textuais/JSON/MessagePack; respostas que já têm `Content-Encoding` passam.
+
+Níveis baixos (gzip 5, brotli 4) por latência: a maior parte do ganho de tamanho
+já vem neles, com uma fração do custo de CPU dos níveis máximos.
+"""
+from __future__ import annotations
+
+import zlib
+from typing import Any, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli  # opcional
+except ImportError:  # pragma: no cover - depende do ambiente
+    brotli = None
+
+_COMPRESSIBLE = (
+    "text/", "application/json", "application/x-msgpack", "application/msgpack",
+    "application/vnd.msgpack", "application/javascript", "application/xml", "image/svg+xml",
+)
+_NEVER = ("text/event-stream",)
+
+STREAM_FLUSH_BYTES = 64 * 1024
+
+
+def _accepted(accept_encoding: str) -> set[str]:
+    """Codificações com q > 0 (`*` conta como gzip)."""
+    out: set[str] = set()
+    for part in accept_encoding.lower().split(","):
+        coding, *params = (p.strip() for p in part.split(";"))
+        q = next((p[2:] for p in params if p.startswith("q=")), "1")
+        try:
+            if float(q) <= 0:
+                continue
+        except ValueError:
+            continue
+        out.add("gzip" if coding == "*" else coding)
+    return out
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = _accepted(accept_encoding)
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def _compressible(headers: Headers) -> bool:
+    ctype = headers.get("content-type", "").lower()
+    return ctype.startswith(_COMPRESSIBLE) and not ctype.startswith(_NEVER)
+
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int) -> None:
+        if encoding == "br":
+            self._c: Any = brotli.Compressor(mode=brotli.MODE_TEXT, quality=brotli_quality)
+            self._process, self._finish, self._flush = self._c.process, self._c.finish, self._c.flush
+        else:
+            self._c = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._process, self._finish = self._c.compress, self._c.flush
+            self._flush = lambda: self._c.flush(zlib.Z_SYNC_FLUSH)
+        self._pending = 0  # bytes de entrada desde o último flush
+
+    def process(self, data: bytes, stream: bool = False) -> bytes:
+        if not data:
+            return b""
+        out = self._process(data)
+        self._pending += len(data)
+        if stream and self._pending >= STREAM_FLUSH_BYTES:
+            out += self._flush()
+            self._pending = 0
+        return out
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 5,
+        brotli_quality: int = 4,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _Responder(self, encoding, send).run(scope, receive)
+
+
+class _Responder:
+    """Estado de uma resposta: segura o `http.response.start` até ver a primeira parte."""
+
+    def __init__(self, mw: CompressionMiddleware, encoding: str, send: Send) -> None:
+        self.mw = mw
+        self.encoding = encoding
+        self.send = send
+        self.start: Optional[Message] = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+
+    async def run(self, scope: Scope, receive: Receive) -> None:
+        await self.mw.app(scope, receive, self.wrapped_send)
+
+    async def wrapped_send(self, message: Message) -> None:
+        kind = message["type"]
+        if kind == "http.response.start":
+            self.start = message
+            headers = Headers(raw=message["headers"])
+            if "content-encoding" in headers or not _compressible(headers):
+                self.passthrough = True
+            elif message["status"] not in (204, 304):
+                # a representação depende do Accept-Encoding, comprimida ou não
+                MutableHeaders(raw=message["headers"]).add_vary_header("Accept-Encoding")
+            return
+        if kind != "http.response.body":
+            await self.send(message)
+            return
+
+        if self.start is not None:
+            start, self.start = self.start, None
+            await self._begin(start, message)
+            return
+        if self.compressor is None:
+            await self.send(message)
+            return
+
+        more = message.get("more_body", False)
+        body = self.compressor.process(message.get("body", b""), stream=more)
+        if not more:
+            body += self.compressor.finish()
+        if body or not more:
+            await self.send({"type": "http.response.body", "body": body, "more_body": more})
+
+    async def _begin(self, start: Message, first: Message) -> None:
+        body = first.get("body", b"")
+        more = first.get("more_body", False)
+        if self.passthrough or start["status"] in (204, 304) or (not more and len(body) < self.mw.minimum_size):
+            await self.send(start)
+            await self.send(first)
+            return
+
+        self.compressor = _Compressor(self.encoding, self.mw.gzip_level, self.mw.brotli_quality)
+        headers = MutableHeaders(raw=start["headers"])
+        headers["Content-Encoding"] = self.encoding
+        data = self.compressor.process(body, stream=more)
+        if more:
+            # tamanho final desconhecido: o servidor usa chunked
+            del headers["Content-Length"]
+        else:
+            data += self.compressor.finish()
+            headers["Content-Length"] = str(len(data))
+        await self.send(start)
+        await self.send({"type": "http.response.body", "body": data, "more_body": more})
@@ -22,6 +22,42 @@ class Settings(BaseSettings):
 
     # Outras integrações
     ASAAS_API_BASE: str = "https://api.asaas.com/v3"
+    ASAAS_MAX_CONCURRENCY: int = 5           # requisições simultâneas nos lotes
+    ASAAS_REQUESTS_PER_SECOND: float = 5.0   # teto de req/s por lote
+    ASAAS_CUSTOMER_INDEX_TTL_SECONDS: int = 10 * 60  # índice cpf/email -> customer id
+    ASAAS_CUSTOMER_INDEX_MAX_PAGES: int = 100        # x100 customers no aquecimento
+    ASAAS_PAYMENTS_CACHE_TTL_SECONDS: int = 30       # cache de /students/{id}/asaas/payments
+    ASAAS_CHARGE_CLAIM_TTL_SECONDS: int = 24 * 60 * 60  # reserva de pagamento em emissão (lote que caiu)
+
+    # Cache de respostas do dashboard (app/core/cache.py)
+    CACHE_URL: Optional[str] = None            # redis://... (pacote redis); vazio = memória do processo
+    CACHE_MAX_ENTRIES: int = 10000             # LRU em memória
+    DASHBOARD_CACHE_TTL_SECONDS: int = 30      # contagens/agregados do dashboard
+    DASHBOARD_CACHE_STALE_SECONDS: int = 300   # stale-while-revalidate dos agregados
+
+    # Compressão das respostas (app/core/compression.py)
+    COMPRESSION_MIN_BYTES: int = 1024          # corpos menores saem sem compressão
+    COMPRESSION_GZIP_LEVEL: int = 5            # 1-9; níveis baixos por latência
+    COMPRESSION_BROTLI_QUALITY: int = 4        # 0-11; só com o pacote brotli
+
+    # Sync incremental dos quadros (GET /crm/changes, /atividades/changes)
+    SYNC_CLOCK_SKEW_SECONDS: int = 30          # janela reenviada a cada poll (commits atrasados)
+    SYNC_TOMBSTONE_RETENTION_DAYS: int = 30    # cursor mais antigo que isso => reset (recarga total)
+
+    # Eventos (SSE /api/v1/events/stream)
+    EVENTS_PG_NOTIFY: bool = False             # fan-out via LISTEN/NOTIFY (várias instâncias)
+    EVENTS_KEEPALIVE_SECONDS: int = 15         # comentário ": ping" para manter a conexão viva
+
+    # DDL complementar (extensões/índices de busca) aplicado no startup
+    DB_APPLY_DDL_ON_STARTUP: bool = True
+
+    # Jobs em background (desligue em instâncias que não devem rodar jobs)
+    BACKGROUND_JOBS_ENABLED: bool = True
+    MRR_SNAPSHOT_INTERVAL_SECONDS: int = 60 * 60   # snapshot é upsert por dia → idempotente
+    OVERDUE_SWEEP_INTERVAL_SECONDS: int = 15 * 60  # pendente vencido -> atrasado
+    ASAAS_OUTBOX_INTERVAL_SECONDS: int = 5 * 60    # retry das exclusões de customers no Asaas
+    BOARD_COMPACTION_INTERVAL_SECONDS: int = 60 * 60  # reespaça chaves de ordenação longas (CRM/atividades)
+    SYNC_TOMBSTONE_PURGE_INTERVAL_SECONDS: int = 6 * 60 * 60  # apaga tombstones além da retenção
 
     class Config:
         env_file = ".env"
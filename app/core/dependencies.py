@@ -20,6 +20,9 @@ async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: AsyncSession = Depends(get_db),
 ) -> User:
+    return await user_from_token(db, token)
+
+async def user_from_token(db: AsyncSession, token: Optional[str]) -> User:
     if not token:
         raise HTTPException(status_code=401, detail="Missing token")
     try:
@@ -0,0 +1,130 @@
+# app/core/etag.py
+"""
+Requisições condicionais (ETag / If-None-Match) nas listagens.
+
+Cada recurso listado tem um contador por escopo (mentor ou tenant) em
+`resource_versions`, incrementado na mesma transação das escritas:
+
+- escritas pelo ORM: automático, via `after_flush`, para os modelos registrados com
+  `track(Model, recurso, atributo_do_escopo)`;
+- escritas em lote (`insert()/update()/delete()`, SQL textual): o código chama
+  `touch(db, Model, condições)` (antes do DELETE) ou `bump(db, recurso, escopo)`.
+
+A dependência `conditional(recurso)` lê só o contador: se o ETag bate com o
+If-None-Match, responde 304 sem executar a consulta da listagem nem serializar.
+"""
+from __future__ import annotations
+
+import hashlib
+from typing import Any, Callable, Iterable
+
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy import event, inspect, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.dependencies import get_current_user, get_db
+from app.core.responses import wants_msgpack
+from app.modules.sync.models import ResourceVersion
+from app.modules.users.models import User
+
+CACHE_CONTROL = "private, no-cache"
+
+# modelo -> (recurso, atributo do escopo)
+_TRACKED: dict[type, tuple[str, str]] = {}
+
+
+def track(model: type, resource: str, scope_attr: str) -> None:
+    _TRACKED[model] = (resource, scope_attr)
+
+
+def _bump_stmt(dialect: str, pairs: Iterable[tuple[str, Any]]):
+    rows = [{"resource": r, "scope": str(s), "version": 1} for r, s in sorted(pairs, key=str)]
+    ins = (postgresql.insert if dialect == "postgresql" else sqlite.insert)(ResourceVersion).values(rows)
+    return ins.on_conflict_do_update(
+        index_elements=["resource", "scope"],
+        set_={"version": ResourceVersion.version + 1},
+    )
+
+
+def _bump_sync(conn: Connection, pairs: set[tuple[str, Any]]) -> None:
+    if pairs:
+        conn.execute(_bump_stmt(conn.dialect.name, pairs))
+
+
+async def bump(db: AsyncSession, resource: str, scope: Any) -> None:
+    """Invalida o ETag de `resource` no escopo (não faz commit)."""
+    await db.run_sync(lambda s: _bump_sync(s.connection(), {(resource, scope)}))
+
+
+async def touch(db: AsyncSession, model: type, conds: list) -> None:
+    """Escrita em lote em `model`: incrementa os escopos das linhas que casam com `conds`."""
+    tracked = _TRACKED.get(model)
+    if tracked is None:
+        return
+    resource, attr = tracked
+    scopes = (await db.execute(select(getattr(model, attr)).where(*conds).distinct())).scalars().all()
+    pairs = {(resource, s) for s in scopes if s is not None}
+    if pairs:
+        await db.run_sync(lambda s: _bump_sync(s.connection(), pairs))
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_flushed(session: Session, flush_context) -> None:
+    pairs: set[tuple[str, Any]] = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        tracked = _TRACKED.get(type(obj))
+        if tracked is None:
+            continue
+        if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+            continue
+        resource, attr = tracked
+        hist = inspect(obj).attrs[attr].history
+        # escopo atual e, se mudou de dono, o anterior
+        for value in (*hist.unchanged, *hist.added, *hist.deleted):
+            if value is not None:
+                pairs.add((resource, value))
+    _bump_sync(session.connection(), pairs)
+
+
+# ---------------- Dependência ----------------
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # comparação fraca: ignora o prefixo W/
+    return any(t.strip().removeprefix("W/") == etag.removeprefix("W/") for t in if_none_match.split(","))
+
+
+def conditional(resource: str, scope: Callable[[User], Any] = lambda u: u.id):
+    """
+    Dependência das listagens: `dependencies=[Depends(etag.conditional("students"))]`.
+    O ETag combina versão do recurso, usuário, query string (filtros/paginação) e
+    formato negociado pelo `Accept` (JSON ou MessagePack).
+    """
+    async def dep(
+        request: Request,
+        response: Response,
+        db: AsyncSession = Depends(get_db),
+        me: User = Depends(get_current_user),
+    ) -> None:
+        version = await db.scalar(
+            select(ResourceVersion.version).where(
+                ResourceVersion.resource == resource, ResourceVersion.scope == str(scope(me)),
+            )
+        ) or 0
+        raw = (
+            f"{resource}:{scope(me)}:{version}:{me.id}:{sorted(request.query_params.multi_items())}"
+            f":{wants_msgpack(request)}"
+        )
+        etag = f'W/"{hashlib.sha1(raw.encode()).hexdigest()[:20]}"'
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+        inm = request.headers.get("if-none-match")
+        if inm and _matches(inm, etag):
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+
+    return dep
@@ -0,0 +1,164 @@
+# app/core/responses.py
+"""
+Caminho rápido de serialização para listagens grandes.
+
+Em vez de carregar entidades ORM e validar cada linha pelo `response_model`, o
+endpoint seleciona só as colunas do schema como tuplas (`RowSerializer.columns`)
+e as converte com um plano pré-compilado por schema (nome de saída + conversão
+por campo), codificado com orjson em `FastJSONResponse`.
+
+O `response_model` continua declarado para a documentação OpenAPI; como o
+endpoint devolve um `Response`, o FastAPI não revalida o conteúdo.
+
+Para grids, `negotiated()` escolhe o formato pelo `Accept` (`application/x-msgpack`
+ou JSON) e `?shape=columnar` troca a lista de objetos por um array por coluna
+(`RowSerializer.columnar`): os nomes dos campos saem uma vez só, não por linha.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, time
+from decimal import Decimal
+from functools import lru_cache
+from types import UnionType
+from typing import Any, Callable, Iterable, Literal, Optional, Sequence, Union, get_args, get_origin
+from uuid import UUID
+
+import msgpack
+import orjson
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+_ORJSON_OPTS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+MSGPACK = "application/x-msgpack"
+_MSGPACK_TYPES = (MSGPACK, "application/msgpack", "application/vnd.msgpack")
+
+Shape = Literal["rows", "columnar"]
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=_ORJSON_OPTS)
+
+
+def _msgpack_default(v: Any) -> Any:
+    """Mesmas strings que o JSON para tipos sem equivalente no MessagePack."""
+    if isinstance(v, datetime):
+        s = v.isoformat()
+        return s[:-6] + "Z" if s.endswith("+00:00") else s  # como OPT_UTC_Z
+    if isinstance(v, (date, time)):
+        return v.isoformat()
+    if isinstance(v, Decimal):
+        return float(v)
+    if isinstance(v, UUID):
+        return str(v)
+    raise TypeError(f"tipo não serializável em msgpack: {type(v).__name__}")
+
+
+class MsgPackResponse(Response):
+    media_type = MSGPACK
+
+    def render(self, content: Any) -> bytes:
+        return msgpack.packb(content, default=_msgpack_default, use_bin_type=True)
+
+
+def _to_float(v: Any) -> Optional[float]:
+    return None if v is None else float(v)
+
+
+def _converter(annotation: Any) -> Optional[Callable[[Any], Any]]:
+    """Conversões que o pydantic faria na saída; o resto o orjson já escreve igual."""
+    # Optional[X] / Union[X, None] e X | None (PEP 604) têm origens diferentes
+    args = get_args(annotation) if get_origin(annotation) in (Union, UnionType) else (annotation,)
+    if float in args or Decimal in args:
+        return _to_float  # Numeric vem como Decimal do banco
+    return None
+
+
+class RowSerializer:
+    """
+    Plano de serialização de `schema` a partir das colunas de `model`.
+    `keys` são os nomes de saída (alias de serialização); a ordem casa com `columns`.
+    """
+
+    def __init__(self, schema: type[BaseModel], model: Any) -> None:
+        self.keys: list[str] = []
+        self.columns: list[Any] = []
+        convs: list[tuple[int, Callable[[Any], Any]]] = []
+        for i, (name, f) in enumerate(schema.model_fields.items()):
+            src = f.validation_alias if isinstance(f.validation_alias, str) else name
+            self.keys.append(f.serialization_alias or f.alias or name)
+            self.columns.append(getattr(model, src))
+            conv = _converter(f.annotation)
+            if conv is not None:
+                convs.append((i, conv))
+        self._convs = tuple(convs)
+
+    def columnar(self, rows: Iterable[Sequence[Any]]) -> dict[str, list[Any]]:
+        """`{campo: [valores...]}` na ordem das linhas; colunas extras são ignoradas."""
+        cols = list(zip(*rows))
+        out = {k: list(cols[i]) if cols else [] for i, k in enumerate(self.keys)}
+        for i, conv in self._convs:
+            k = self.keys[i]
+            out[k] = [conv(v) for v in out[k]]
+        return out
+
+    def dicts(self, rows: Iterable[Sequence[Any]]) -> list[dict[str, Any]]:
+        """Colunas extras no fim da tupla (além de `columns`) são ignoradas."""
+        keys, convs = self.keys, self._convs
+        if not convs:
+            return [dict(zip(keys, r)) for r in rows]
+        out = []
+        for r in rows:
+            d = dict(zip(keys, r))
+            for i, conv in convs:
+                k = keys[i]
+                d[k] = conv(d[k])
+            out.append(d)
+        return out
+
+
+@lru_cache(maxsize=None)
+def row_serializer(schema: type[BaseModel], model: Any) -> RowSerializer:
+    return RowSerializer(schema, model)
+
+
+def fast_json(content: Any, response: Optional[Response] = None, status_code: int = 200) -> FastJSONResponse:
+    """
+    `FastJSONResponse` levando os headers já definidos por dependências no `response`
+    injetado (ex.: ETag), que o FastAPI não copia quando o endpoint devolve um Response.
+    """
+    return FastJSONResponse(content, status_code=status_code, headers=_headers(response))
+
+
+def _headers(response: Optional[Response]) -> Optional[dict[str, str]]:
+    headers = dict(response.headers) if response is not None else None
+    if headers:
+        headers.pop("content-length", None)
+    return headers
+
+
+def wants_msgpack(request: Request) -> bool:
+    """`Accept` pede MessagePack (sem q=0). Qualquer outra coisa recebe JSON."""
+    for part in request.headers.get("accept", "").split(","):
+        media, *params = (p.strip().lower() for p in part.split(";"))
+        if media not in _MSGPACK_TYPES:
+            continue
+        q = next((p[2:] for p in params if p.startswith("q=")), "1")
+        try:
+            return float(q) > 0
+        except ValueError:
+            return True
+    return False
+
+
+def negotiated(
+    request: Request, content: Any, response: Optional[Response] = None, status_code: int = 200,
+) -> Response:
+    """Como `fast_json`, mas em MessagePack quando o `Accept` pedir."""
+    cls = MsgPackResponse if wants_msgpack(request) else FastJSONResponse
+    resp = cls(content, status_code=status_code, headers=_headers(response))
+    resp.headers["Vary"] = "Accept"
+    return resp
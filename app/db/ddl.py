@@ -0,0 +1,73 @@
+# app/db/ddl.py
+"""
+DDL complementar ao `Base.metadata.create_all` (extensões, colunas geradas, índices
+especiais, tabelas virtuais), específico por dialeto e idempotente.
+
+Cada módulo registra seus passos com `@register(nome, "postgresql" | "sqlite")`; o
+lifespan chama `apply_all(engine)` no startup. Um passo que falha é logado e não impede
+os demais; o código consulta `is_applied(nome)` para decidir se pode usar o recurso.
+"""
+from __future__ import annotations
+
+import logging
+from typing import Callable, Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger("mentorpro.ddl")
+
+# retorna False quando não se aplica (ex.: tabela ainda não existe)
+DDLStep = Callable[[Connection], Optional[bool]]
+
+# nome -> {dialeto: passo}
+_REGISTRY: dict[str, dict[str, DDLStep]] = {}
+_APPLIED: set[str] = set()
+
+
+def register(name: str, dialect: str) -> Callable[[DDLStep], DDLStep]:
+    def deco(fn: DDLStep) -> DDLStep:
+        _REGISTRY.setdefault(name, {})[dialect] = fn
+        return fn
+    return deco
+
+
+def is_applied(name: str) -> bool:
+    return name in _APPLIED
+
+
+def has_table(conn: Connection, table: str) -> bool:
+    return inspect(conn).has_table(table)
+
+
+def has_column(conn: Connection, table: str, column: str) -> bool:
+    return any(c["name"] == column for c in inspect(conn).get_columns(table))
+
+
+def ensure_pg_unaccent(conn: Connection) -> None:
+    """
+    Extensão `unaccent` + wrapper IMMUTABLE `public.f_unaccent(text)`, que pode ser usado
+    em colunas geradas e índices (o `unaccent()` original é só STABLE).
+    """
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS unaccent"))
+    conn.execute(text(
+        "CREATE OR REPLACE FUNCTION public.f_unaccent(text) RETURNS text "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT "
+        "AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$"
+    ))
+
+
+async def apply_all(engine: AsyncEngine) -> None:
+    dialect = engine.dialect.name
+    for name, steps in _REGISTRY.items():
+        step = steps.get(dialect)
+        if step is None:
+            continue
+        try:
+            async with engine.begin() as conn:
+                ok = await conn.run_sync(step)
+            if ok is not False:
+                _APPLIED.add(name)
+        except Exception:
+            logger.exception("[DDL] %s falhou (%s)", name, dialect)
@@ -0,0 +1,18 @@
+# app/db/dialect.py
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def dialect_name(db: AsyncSession) -> str:
+    """Nome do dialeto da sessão ("postgresql" | "sqlite")."""
+    return db.get_bind().dialect.name
+
+
+def upsert_insert(db: AsyncSession, model):
+    """
+    insert() específico do dialeto, com suporte a
+    .on_conflict_do_update()/.on_conflict_do_nothing() tanto no Postgres quanto no SQLite.
+    """
+    if dialect_name(db) == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
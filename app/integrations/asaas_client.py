@@ -1,19 +1,106 @@
 # app/integrations/asaas_client.py
 from __future__ import annotations
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+import asyncio
+import unicodedata
 import httpx
 
+
+class RateLimiter:
+    """
+    Espaça as requisições para no máximo `per_second` por segundo (compartilhado entre
+    as tasks que usam o mesmo client). A concorrência é limitada por quem chama (Semaphore).
+    """
+    def __init__(self, per_second: float):
+        self._interval = 1.0 / per_second if per_second > 0 else 0.0
+        self._lock = asyncio.Lock()
+        self._next = 0.0
+
+    async def acquire(self) -> None:
+        if not self._interval:
+            return
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            wait = self._next - now
+            self._next = max(now, self._next) + self._interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+def billing_type_for(metodo: Optional[str]) -> str:
+    """'Boleto' | 'Cartão de Crédito' | 'PIX' (ou variações) -> billingType do Asaas."""
+    t = "".join(ch for ch in unicodedata.normalize("NFKD", metodo or "") if not unicodedata.combining(ch)).lower()
+    if "boleto" in t:
+        return "BOLETO"
+    if "pix" in t:
+        return "PIX"
+    if "cartao" in t or "credito" in t or "credit" in t or "card" in t:
+        return "CREDIT_CARD"
+    return "UNDEFINED"
+
+
 class AsaasClient:
-    def __init__(self, api_key: str, sandbox: bool = True, timeout: float = 20.0):
+    """
+    Client HTTP do Asaas. Use como `async with AsaasClient(...) as asaas:` para reaproveitar
+    uma única conexão (pool httpx) em operações em lote; fora do `async with` cada chamada
+    abre o seu próprio httpx.AsyncClient.
+    """
+    MAX_RETRIES_429 = 3
+
+    def __init__(self, api_key: str, sandbox: bool = True, timeout: float = 20.0,
+                 limiter: Optional[RateLimiter] = None):
         self.api_key = api_key
         self.base_url = "https://api-sandbox.asaas.com/v3" if sandbox else "https://api.asaas.com/v3"
         self._timeout = timeout
+        self._limiter = limiter
+        self._client: Optional[httpx.AsyncClient] = None
         self._headers = {
             "accept": "application/json",
             "content-type": "application/json",
             "access_token": self.api_key,
         }
 
+    async def __aenter__(self) -> "AsaasClient":
+        self._client = httpx.AsyncClient(timeout=self._timeout, limits=httpx.Limits(max_connections=20))
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        url = f"{self.base_url}{path}"
+        for attempt in range(self.MAX_RETRIES_429 + 1):
+            if self._limiter:
+                await self._limiter.acquire()
+            if self._client is not None:
+                r = await self._client.request(method, url, headers=self._headers, **kwargs)
+            else:
+                async with httpx.AsyncClient(timeout=self._timeout) as client:
+                    r = await client.request(method, url, headers=self._headers, **kwargs)
+            if r.status_code != 429 or attempt == self.MAX_RETRIES_429:
+                return r
+            # rate limit do Asaas: respeita Retry-After (ou backoff simples)
+            try:
+                delay = float(r.headers.get("Retry-After") or 0) or 2 ** attempt
+            except ValueError:
+                delay = 2 ** attempt
+            await asyncio.sleep(delay)
+        return r
+
+    @staticmethod
+    def _raise_for(r: httpx.Response, code: str) -> None:
+        if r.status_code >= 400:
+            # Tenta devolver o JSON de erro do Asaas
+            try:
+                data = r.json()
+            except Exception:
+                data = {"error": r.text}
+            data["_status_code"] = r.status_code
+            raise AsaasError(code, data)
+
     async def create_customer(self, *, name: str, cpf_cnpj: Optional[str] = None,
                               email: Optional[str] = None, mobile_phone: Optional[str] = None,
                               extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
@@ -26,18 +113,57 @@ class AsaasClient:
         if extra:
             payload |= {k: v for k, v in extra.items() if v not in (None, "", [])}
 
-        async with httpx.AsyncClient(timeout=self._timeout) as client:
-            r = await client.post(f"{self.base_url}/customers", json=payload, headers=self._headers)
-            # Se já existir, Asaas costuma retornar 409; devolvemos o corpo p/ você logar/decidir
-            if r.status_code >= 400:
-                # Tenta devolver o JSON de erro do Asaas
-                try:
-                    data = r.json()
-                except Exception:
-                    data = {"error": r.text}
-                data["_status_code"] = r.status_code
-                raise AsaasError("create_customer_failed", data)
-            return r.json()
+        r = await self._request("POST", "/customers", json=payload)
+        # Se já existir, Asaas costuma retornar 409; devolvemos o corpo p/ você logar/decidir
+        self._raise_for(r, "create_customer_failed")
+        return r.json()
+
+    async def find_customer(self, *, cpf_cnpj: Optional[str] = None,
+                            email: Optional[str] = None) -> Optional[str]:
+        for params in ({"cpfCnpj": cpf_cnpj} if cpf_cnpj else None, {"email": email} if email else None):
+            if not params:
+                continue
+            r = await self._request("GET", "/customers", params=params)
+            self._raise_for(r, "find_customer_failed")
+            data = r.json() or {}
+            items = data.get("data") or data.get("items") or []
+            if items:
+                return items[0].get("id")
+        return None
+
+    async def list_customers(self, *, offset: int = 0, limit: int = 100) -> Dict[str, Any]:
+        """Uma página de GET /customers (corpo completo: data, hasMore, totalCount...)."""
+        r = await self._request("GET", "/customers", params={"offset": offset, "limit": limit})
+        self._raise_for(r, "list_customers_failed")
+        return r.json() or {}
+
+    async def create_payment(self, *, customer_id: str, value: float, due_date: str, billing_type: str,
+                             description: Optional[str] = None,
+                             external_reference: Optional[str] = None) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {
+            "customer": customer_id,
+            "value": round(float(value), 2),
+            "dueDate": due_date,
+            "billingType": billing_type,
+        }
+        if description:
+            payload["description"] = description
+        if external_reference:
+            payload["externalReference"] = external_reference
+        r = await self._request("POST", "/payments", json=payload)
+        self._raise_for(r, "create_payment_failed")
+        return r.json()
+
+    async def list_payments(self, **params: Any) -> List[Dict[str, Any]]:
+        r = await self._request("GET", "/payments", params=params)
+        self._raise_for(r, "list_payments_failed")
+        data = r.json() or {}
+        return data.get("data") or data.get("items") or []
+
+    async def delete_customer(self, customer_id: str) -> None:
+        r = await self._request("DELETE", f"/customers/{customer_id}")
+        self._raise_for(r, "delete_customer_failed")
+
 
 class AsaasError(RuntimeError):
     def __init__(self, code: str, data: Any):
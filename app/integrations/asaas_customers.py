@@ -0,0 +1,135 @@
+# app/integrations/asaas_customers.py
+"""
+Índice local de customers do Asaas (cpfCnpj/email -> customer id) por API key.
+
+- Aquecido uma vez paginando GET /customers; expira após `ASAAS_CUSTOMER_INDEX_TTL_SECONDS`.
+- Miss no índice cai numa busca direta (cpfCnpj, depois email), cujo resultado entra no índice.
+- Aquecimento e buscas diretas usam single-flight: chamadas concorrentes para a mesma
+  chave compartilham uma única requisição.
+- Customers criados/excluídos pela aplicação são registrados com `remember`/`forget`.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from typing import Optional
+
+from app.core.config import settings
+from app.integrations.asaas_client import AsaasClient
+from app.utils.br import normalize_cpf_cnpj
+from app.utils.singleflight import SingleFlight
+
+logger = logging.getLogger("mentorpro.asaas")
+
+PAGE_SIZE = 100  # máximo aceito pelo Asaas
+
+
+class _Index:
+    __slots__ = ("by_cpf", "by_email", "loaded_at")
+
+    def __init__(self) -> None:
+        self.by_cpf: dict[str, str] = {}
+        self.by_email: dict[str, str] = {}
+        self.loaded_at = 0.0
+
+    def add(self, customer_id: str, cpf_cnpj: Optional[str], email: Optional[str]) -> None:
+        cpf = normalize_cpf_cnpj(cpf_cnpj)
+        mail = _norm_email(email)
+        if cpf:
+            self.by_cpf[cpf] = customer_id
+        if mail:
+            self.by_email[mail] = customer_id
+
+    def get(self, cpf_cnpj: Optional[str], email: Optional[str]) -> Optional[str]:
+        cpf = normalize_cpf_cnpj(cpf_cnpj)
+        if cpf and cpf in self.by_cpf:
+            return self.by_cpf[cpf]
+        mail = _norm_email(email)
+        if mail and mail in self.by_email:
+            return self.by_email[mail]
+        return None
+
+    def drop(self, customer_id: str) -> None:
+        for d in (self.by_cpf, self.by_email):
+            for k in [k for k, v in d.items() if v == customer_id]:
+                del d[k]
+
+
+_INDEXES: dict[tuple[str, bool], _Index] = {}
+_flight = SingleFlight()
+
+
+def _norm_email(email: Optional[str]) -> Optional[str]:
+    e = (email or "").strip().lower()
+    return e or None
+
+
+def _fresh(idx: Optional[_Index]) -> bool:
+    return idx is not None and time.monotonic() - idx.loaded_at < settings.ASAAS_CUSTOMER_INDEX_TTL_SECONDS
+
+
+async def _warm(api_key: str, sandbox: bool) -> _Index:
+    idx = _Index()
+    async with AsaasClient(api_key, sandbox=sandbox) as asaas:
+        offset = 0
+        for _ in range(settings.ASAAS_CUSTOMER_INDEX_MAX_PAGES):
+            data = await asaas.list_customers(offset=offset, limit=PAGE_SIZE)
+            items = data.get("data") or []
+            for c in items:
+                if c.get("id") and not c.get("deleted"):
+                    idx.add(c["id"], c.get("cpfCnpj"), c.get("email"))
+            if not data.get("hasMore") or not items:
+                break
+            offset += len(items)
+        else:
+            # conta muito grande: índice parcial, misses seguem para a busca direta
+            logger.info("[ASAAS] índice de customers parcial (%s páginas)", settings.ASAAS_CUSTOMER_INDEX_MAX_PAGES)
+    idx.loaded_at = time.monotonic()
+    _INDEXES[(api_key, sandbox)] = idx
+    return idx
+
+
+async def _get_index(api_key: str, sandbox: bool) -> _Index:
+    idx = _INDEXES.get((api_key, sandbox))
+    if _fresh(idx):
+        return idx
+    try:
+        return await _flight.do(("warm", api_key, sandbox), lambda: _warm(api_key, sandbox))
+    except Exception:
+        # sem índice: segue só com a busca direta
+        logger.exception("[ASAAS] falha ao aquecer índice de customers")
+        return idx if idx is not None else _Index()
+
+
+async def find_customer_id(*, api_key: str, sandbox: bool,
+                           cpf_cnpj: Optional[str] = None,
+                           email: Optional[str] = None) -> Optional[str]:
+    if not cpf_cnpj and not email:
+        return None
+    idx = await _get_index(api_key, sandbox)
+    hit = idx.get(cpf_cnpj, email)
+    if hit:
+        return hit
+
+    async def lookup() -> Optional[str]:
+        found = await AsaasClient(api_key, sandbox=sandbox).find_customer(cpf_cnpj=cpf_cnpj, email=email)
+        if found:
+            idx.add(found, cpf_cnpj, email)
+        return found
+
+    key = ("find", api_key, sandbox, normalize_cpf_cnpj(cpf_cnpj), _norm_email(email))
+    return await _flight.do(key, lookup)
+
+
+def remember(*, api_key: str, sandbox: bool, customer_id: Optional[str],
+             cpf_cnpj: Optional[str] = None, email: Optional[str] = None) -> None:
+    """Registra um customer recém-criado (só se o índice já existir; senão o warm o trará)."""
+    idx = _INDEXES.get((api_key, sandbox))
+    if idx is not None and customer_id:
+        idx.add(customer_id, cpf_cnpj, email)
+
+
+def forget(*, api_key: str, sandbox: bool, customer_id: Optional[str]) -> None:
+    idx = _INDEXES.get((api_key, sandbox))
+    if idx is not None and customer_id:
+        idx.drop(customer_id)
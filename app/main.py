@@ -13,9 +13,13 @@ from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.engine.url import make_url
 
 from app.core.config import settings
+from app.core.compression import CompressionMiddleware
 from app.api.v1.router import api_router
 from app.db.session import engine
 from app.db.base import Base
+from app.db import ddl
+from app.modules.sync import crud as sync_crud
+from app.services import scheduler, metrics_engine, overdue_sweeper, asaas_outbox, board_compaction, events
 
 
 def _normalize_origins(value) -> list[str]:
@@ -60,13 +64,39 @@ async def lifespan(app: FastAPI):
         if is_postgres:
             async with engine.begin() as conn:
                 await conn.run_sync(Base.metadata.create_all)
+
+    # DDL complementar idempotente (índices de busca etc.)
+    if settings.DB_APPLY_DDL_ON_STARTUP:
+        await ddl.apply_all(engine)
+
+    await events.start()
+
+    jobs = []
+    if settings.BACKGROUND_JOBS_ENABLED:
+        jobs = scheduler.start([
+            scheduler.PeriodicJob("mrr_snapshot", settings.MRR_SNAPSHOT_INTERVAL_SECONDS, metrics_engine.snapshot_job),
+            scheduler.PeriodicJob("overdue_sweep", settings.OVERDUE_SWEEP_INTERVAL_SECONDS, overdue_sweeper.sweep_job),
+            scheduler.PeriodicJob("asaas_outbox", settings.ASAAS_OUTBOX_INTERVAL_SECONDS, asaas_outbox.retry_job),
+            scheduler.PeriodicJob("board_compaction", settings.BOARD_COMPACTION_INTERVAL_SECONDS, board_compaction.compact_job),
+            scheduler.PeriodicJob("sync_tombstone_purge", settings.SYNC_TOMBSTONE_PURGE_INTERVAL_SECONDS, sync_crud.purge_job),
+        ])
     yield
-    # teardown se necessário
+    # teardown
+    await scheduler.stop(jobs)
+    await events.stop()
 
 
 # --- App ---
 app = FastAPI(title="MentorPro Backend (mínimo)", lifespan=lifespan)
 
+# --- Compressão (gzip/brotli); o CORS, adicionado depois, fica por fora ---
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_BYTES,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+)
+
 # --- CORS (colocado ANTES dos routers) ---
 origins = _normalize_origins(getattr(settings, "CORS_ORIGINS", None))
 
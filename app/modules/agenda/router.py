@@ -0,0 +1,143 @@
+# app/modules/agenda/router.py
+"""
+Agenda do mentor: vencimentos de atividades, datas de concursos (início/fim de
+inscrição e prova) e vencimentos de pagamentos num intervalo, em ordem de data.
+
+Cada fonte é uma consulta por intervalo no seu índice (owner/mentor, data) já ordenada
+pela data; as listas são intercaladas com `heapq.merge` e o JSON é enviado item a item.
+Cada fonte busca até `MAX_PER_SOURCE + 1` linhas: se alguma passar do limite, o
+intervalo é recusado (400) em vez de a lista sair cortada sem aviso.
+"""
+from __future__ import annotations
+
+import heapq
+import json
+from datetime import date
+from typing import Iterable, Iterator
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.dependencies import get_current_user, get_db
+from app.modules.atividades.models import Activity
+from app.modules.concursos.models import Concurso
+from app.modules.financeiro.models import Pagamento
+from app.modules.students.models import Student
+from app.modules.users.models import User
+
+router = APIRouter()
+
+MAX_DAYS = 366
+MAX_PER_SOURCE = 5000
+
+# (tipo, coluna de data) de cada data do concurso
+_CONCURSO_DATES = (
+    ("concurso.inscricao_inicio", Concurso.inscricao_inicio),
+    ("concurso.inscricao_fim", Concurso.inscricao_fim),
+    ("concurso.prova", Concurso.prova_data),
+)
+
+
+async def _activities(db: AsyncSession, owner_id: int, start: date, end: date) -> list[dict]:
+    # atividades em colunas "concluídas" ficam fora (índice parcial ix_activities_owner_due_open)
+    rows = (await db.execute(
+        select(Activity.id, Activity.data_vencimento, Activity.titulo, Activity.stage_id, Activity.prioridade)
+        .where(
+            Activity.owner_id == owner_id,
+            ~Activity.stage_done,
+            Activity.data_vencimento >= start,
+            Activity.data_vencimento <= end,
+        )
+        .order_by(Activity.data_vencimento.asc(), Activity.id.asc())
+        .limit(MAX_PER_SOURCE + 1)
+    )).all()
+    return [
+        {"date": r.data_vencimento, "type": "atividade", "id": r.id, "titulo": r.titulo,
+         "stage_id": r.stage_id, "prioridade": r.prioridade}
+        for r in rows
+    ]
+
+
+async def _concursos(db: AsyncSession, mentor_id: int, start: date, end: date) -> list[list[dict]]:
+    out = []
+    for type_, col in _CONCURSO_DATES:
+        rows = (await db.execute(
+            select(Concurso.id, col.label("dia"), Concurso.titulo, Concurso.orgao, Concurso.status)
+            .where(Concurso.mentor_id == mentor_id, col >= start, col <= end)
+            .order_by(col.asc(), Concurso.id.asc())
+            .limit(MAX_PER_SOURCE + 1)
+        )).all()
+        out.append([
+            {"date": r.dia, "type": type_, "id": r.id, "titulo": r.titulo,
+             "orgao": r.orgao, "status": r.status}
+            for r in rows
+        ])
+    return out
+
+
+async def _pagamentos(db: AsyncSession, mentor_id: int, start: date, end: date) -> list[dict]:
+    rows = (await db.execute(
+        select(
+            Pagamento.id, Pagamento.due_date, Pagamento.valor, Pagamento.status_pagamento,
+            Pagamento.competencia, Pagamento.student_id, Student.nome,
+        )
+        .join(Student, Student.id == Pagamento.student_id)
+        .where(
+            Pagamento.mentor_id == mentor_id,
+            Pagamento.due_date >= start,
+            Pagamento.due_date <= end,
+            Pagamento.status_pagamento != "cancelado",
+        )
+        .order_by(Pagamento.due_date.asc(), Pagamento.id.asc())
+        .limit(MAX_PER_SOURCE + 1)
+    )).all()
+    return [
+        {"date": r.due_date, "type": "pagamento", "id": r.id, "aluno_id": r.student_id, "aluno_nome": r.nome,
+         "competencia": r.competencia, "status": r.status_pagamento,
+         "valor": float(r.valor) if r.valor is not None else None}
+        for r in rows
+    ]
+
+
+def _json_array(items: Iterator[dict]) -> Iterable[str]:
+    sep = "["
+    for it in items:
+        it["date"] = it["date"].isoformat()
+        yield sep + json.dumps(it, ensure_ascii=False, separators=(",", ":"))
+        sep = ","
+    yield "[]" if sep == "[" else "]"
+
+
+@router.get("")
+async def agenda(
+    date_from: date = Query(..., alias="from", description="YYYY-MM-DD (inclusive)"),
+    date_to: date = Query(..., alias="to", description="YYYY-MM-DD (inclusive)"),
+    db: AsyncSession = Depends(get_db),
+    me: User = Depends(get_current_user),
+):
+    """
+    Lista JSON em ordem de data: `{"date", "type", "id", "titulo", ...}` com `type` em
+    `atividade` | `concurso.inscricao_inicio` | `concurso.inscricao_fim` |
+    `concurso.prova` | `pagamento`. No mesmo dia, segue essa ordem de tipos.
+    400 se o intervalo passar de `MAX_DAYS` dias ou de `MAX_PER_SOURCE` itens de um tipo.
+    """
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="'to' deve ser maior ou igual a 'from'")
+    if (date_to - date_from).days >= MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Intervalo máximo de {MAX_DAYS} dias")
+
+    # consultas feitas aqui: o stream não segura a sessão depois da resposta começar
+    sources = [
+        await _activities(db, me.id, date_from, date_to),
+        *await _concursos(db, me.id, date_from, date_to),
+        await _pagamentos(db, me.id, date_from, date_to),
+    ]
+    if any(len(src) > MAX_PER_SOURCE for src in sources):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Mais de {MAX_PER_SOURCE} itens de um mesmo tipo no intervalo; use um intervalo menor",
+        )
+    merged = heapq.merge(*sources, key=lambda it: it["date"])
+    return StreamingResponse(_json_array(merged), media_type="application/json")
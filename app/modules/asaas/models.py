@@ -1,6 +1,7 @@
 # app/models/asaas_config.py
+from datetime import datetime
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import String, Boolean, Integer, ForeignKey, UniqueConstraint
+from sqlalchemy import String, Boolean, Integer, ForeignKey, UniqueConstraint, DateTime, Text, func
 from app.db.base import Base
 
 class AsaasConfig(Base):
@@ -13,3 +14,26 @@ class AsaasConfig(Base):
     mentor_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
     api_key: Mapped[str] = mapped_column(String(200))
     sandbox: Mapped[bool] = mapped_column(Boolean, default=True)
+
+
+class AsaasCustomerDeletion(Base):
+    """
+    Outbox de exclusões de customers no Asaas: gravada na mesma transação que apaga o
+    aluno e processada depois (em paralelo, com retry/backoff em caso de falha).
+    """
+    __tablename__ = "asaas_customer_deletions"
+    __table_args__ = (
+        UniqueConstraint("mentor_id", "customer_id", name="uq_asaas_del_mentor_customer"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    mentor_id: Mapped[int] = mapped_column(Integer, index=True, nullable=False)
+    customer_id: Mapped[str] = mapped_column(String(64), nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    next_attempt_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=False), server_default=func.now(), nullable=False, index=True,
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=False), server_default=func.now(), nullable=False,
+    )
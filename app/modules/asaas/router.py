@@ -1,5 +1,7 @@
 from __future__ import annotations
-from fastapi import APIRouter, Depends, HTTPException, status
+import re
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, insert, update
 import httpx
@@ -7,7 +9,8 @@ import httpx
 from app.core.dependencies import get_db, get_current_user
 from app.modules.users.models import User
 from app.modules.asaas.models import AsaasConfig
-from app.modules.asaas.schemas import AsaasConfigIn, AsaasConfigOut, HealthOut
+from app.modules.asaas.schemas import AsaasConfigIn, AsaasConfigOut, HealthOut, ChargeBatchJobOut
+from app.services import asaas_charges, job_tracker
 
 router = APIRouter()
 
@@ -79,3 +82,55 @@ async def health_check(
         return HealthOut(ok=False, message=f"HTTP {e.response.status_code}: {e.response.text[:200]}")
     except Exception as e:
         return HealthOut(ok=False, message=str(e))
+
+
+def _job_out(job: job_tracker.Job) -> ChargeBatchJobOut:
+    return ChargeBatchJobOut(
+        job_id=job.id,
+        competencia=job.meta.get("competencia"),
+        status=job.status,
+        total=job.total,
+        processados=job.processados,
+        sucesso=job.sucesso,
+        falhas=job.falhas,
+        erro=job.erro,
+        resultados=job.resultados,
+    )
+
+@router.post("/charges/batch", response_model=ChargeBatchJobOut, status_code=status.HTTP_202_ACCEPTED)
+async def create_charges_batch(
+    background: BackgroundTasks,
+    competencia: str = Query(..., description="YYYY-MM"),
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """
+    Emite no Asaas as cobranças de todos os pagamentos pendentes/atrasados da competência
+    que ainda não têm cobrança. Roda em background; acompanhe por GET /charges/batch/{job_id}.
+    409 se já houver um lote da mesma competência em execução.
+    """
+    if not re.fullmatch(r"\d{4}-\d{2}", competencia):
+        raise HTTPException(status_code=400, detail="competencia deve estar em YYYY-MM")
+    if not await _get_config_for_mentor(db, user.id):
+        raise HTTPException(status_code=400, detail="Configuração Asaas não encontrada para este mentor")
+
+    # sem await entre a verificação e o create: dois cliques não passam os dois
+    running = job_tracker.find_active("asaas_charges_batch", user.id, competencia=competencia)
+    if running:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Já existe um lote de cobranças em execução para {competencia} (job {running.id})",
+        )
+    job = job_tracker.create("asaas_charges_batch", user.id, competencia=competencia)
+    background.add_task(asaas_charges.run_batch_job, job, user.id, competencia)
+    return _job_out(job)
+
+@router.get("/charges/batch/{job_id}", response_model=ChargeBatchJobOut)
+async def get_charges_batch(
+    job_id: str,
+    user: User = Depends(get_current_user),
+):
+    job = job_tracker.get(job_id, user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return _job_out(job)
@@ -14,3 +14,22 @@ class AsaasConfigOut(BaseModel):
 class HealthOut(BaseModel):
     ok: bool
     message: str | None = None
+
+# Emissão de cobranças em lote (job assíncrono)
+class ChargeBatchItemOut(BaseModel):
+    ok: bool
+    pagamento_id: int
+    aluno_id: int
+    asaas_payment_id: str | None = None
+    erro: str | None = None
+
+class ChargeBatchJobOut(BaseModel):
+    job_id: str
+    competencia: str | None = None
+    status: str
+    total: int = 0
+    processados: int = 0
+    sucesso: int = 0
+    falhas: int = 0
+    erro: str | None = None
+    resultados: list[ChargeBatchItemOut] = []
@@ -0,0 +1,104 @@
+# app/modules/atividades/crud.py
+"""
+Colunas padrão do quadro de atividades.
+
+As colunas são criadas no provisionamento do usuário (`seed_default_stages`), não na
+leitura: GET /atividades/funis é só um SELECT. O índice único (owner_id, nome) torna o
+seed idempotente (ON CONFLICT DO NOTHING) mesmo com chamadas concorrentes.
+O passo de DDL cria o índice em bancos antigos, juntando colunas duplicadas, e a cada
+startup semeia os usuários que continuam sem nenhuma coluna (criados por script ou
+inseridos direto no banco); o seed é idempotente, então repetir não custa nada.
+"""
+from __future__ import annotations
+
+import uuid
+from typing import Optional
+
+from sqlalchemy import inspect, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import etag
+from app.db import ddl
+from app.db.dialect import upsert_insert
+from app.modules.atividades.models import ActivityStage, is_done_stage_name
+from app.modules.users.models import User
+
+DEFAULT_STAGES = [
+    {"nome": "A Fazer",        "cor": "border-l-warning",   "ordem": 1},
+    {"nome": "Em Andamento",   "cor": "border-l-primary",   "ordem": 2},
+    {"nome": "Revisão",        "cor": "border-l-secondary", "ordem": 3},
+    {"nome": "Concluído",      "cor": "border-l-success",   "ordem": 4},
+]
+
+UNIQUE_INDEX = "uq_activity_stages_owner_nome"
+
+
+def _default_rows(owner_ids: list[int]) -> list[dict]:
+    return [
+        {"id": str(uuid.uuid4()), "owner_id": oid, "is_done": is_done_stage_name(st["nome"]), **st}
+        for oid in owner_ids
+        for st in DEFAULT_STAGES
+    ]
+
+
+async def seed_default_stages(db: AsyncSession, owner_id: int) -> None:
+    """Cria as colunas padrão do usuário (não faz commit; repetir não duplica)."""
+    stmt = upsert_insert(db, ActivityStage).values(_default_rows([owner_id]))
+    await db.execute(stmt.on_conflict_do_nothing(index_elements=["owner_id", "nome"]))
+    await etag.bump(db, "activity_stages", owner_id)
+
+
+# ---------------- DDL ----------------
+
+
+def _merge_duplicates(conn: Connection) -> None:
+    """Mantém a coluna mais antiga de cada (owner_id, nome) e move as atividades das demais."""
+    rows = conn.execute(text(
+        "SELECT id, owner_id, nome, is_done FROM activity_stages s "
+        "WHERE EXISTS (SELECT 1 FROM activity_stages d WHERE d.owner_id = s.owner_id "
+        "AND d.nome = s.nome AND d.id <> s.id) "
+        "ORDER BY owner_id, nome, created_at, id"
+    )).all()
+    keep: dict[tuple, tuple] = {}
+    for r in rows:
+        k = (r.owner_id, r.nome)
+        if k not in keep:
+            keep[k] = (r.id, r.is_done)
+            continue
+        keep_id, keep_done = keep[k]
+        # sem chave: vão para o fim da coluna e a compactação regera as chaves
+        conn.execute(
+            text("UPDATE activities SET stage_id = :keep, stage_done = :done, order_key = NULL WHERE stage_id = :dup"),
+            {"keep": keep_id, "done": keep_done, "dup": r.id},
+        )
+        conn.execute(text("DELETE FROM activity_stages WHERE id = :dup"), {"dup": r.id})
+
+
+def _seed_missing(conn: Connection) -> None:
+    owner_ids = conn.execute(
+        select(User.id).where(~select(ActivityStage.id).where(ActivityStage.owner_id == User.id).exists())
+    ).scalars().all()
+    if not owner_ids:
+        return
+    insert = postgresql.insert if conn.dialect.name == "postgresql" else sqlite.insert
+    conn.execute(
+        insert(ActivityStage.__table__).on_conflict_do_nothing(index_elements=["owner_id", "nome"]),
+        _default_rows(list(owner_ids)),
+    )
+
+
+@ddl.register("activity_stages_unique_nome", "postgresql")
+@ddl.register("activity_stages_unique_nome", "sqlite")
+def _unique_nome(conn: Connection) -> Optional[bool]:
+    if not (ddl.has_table(conn, "activity_stages") and ddl.has_table(conn, "activities")):
+        return False
+    if not any(ix["name"] == UNIQUE_INDEX for ix in inspect(conn).get_indexes("activity_stages")):
+        _merge_duplicates(conn)
+        conn.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS {UNIQUE_INDEX} ON activity_stages (owner_id, nome)"))
+        conn.execute(text("DROP INDEX IF EXISTS ix_activity_stages_owner_nome"))
+    # independente do índice: o create_all já cria o índice em bancos novos, e usuários
+    # criados fora do provisionamento (scripts, INSERT direto) também precisam das colunas
+    _seed_missing(conn)
+    return True
@@ -2,22 +2,33 @@ from __future__ import annotations
 
 import uuid
 from datetime import date, datetime
+from typing import Optional
 
 from sqlalchemy import (
+    Boolean,
     String,
     Integer,
     Text,
     Date,
     ForeignKey,
     DateTime,
+    false,
     func,
     Index,
+    text,
 )
+from sqlalchemy.engine import Connection
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import ARRAY
 
 # Ajuste estes imports conforme seu projeto
+from app.db import ddl
 from app.db.base import Base
+from app.services import ordering
+from app.utils.text import strip_accents_lower
+
+# predicado do índice parcial de vencimentos em aberto, como `~Activity.stage_done` compila
+_OPEN_PREDICATE = {"postgresql": "NOT stage_done", "sqlite": "stage_done = 0"}
 # Se você usa multi-tenant por coluna (tenant_id), você pode adicionar os campos abaixo:
 # from sqlalchemy import BigInteger
 # from app.modules.users.models import User  # opcional, se quiser relationship
@@ -41,6 +52,8 @@ class ActivityStage(Base):
     nome: Mapped[str] = mapped_column(String(120), index=True)
     cor: Mapped[str | None] = mapped_column(String(48), nullable=True)
     ordem: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # coluna de "concluídas": fora das contagens de vencimento (ver is_done_stage_name)
+    is_done: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False, server_default=false())
 
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -53,7 +66,8 @@ class ActivityStage(Base):
     )
 
     __table_args__ = (
-        Index("ix_activity_stages_owner_nome", "owner_id", "nome"),
+        # seed idempotente (ON CONFLICT) e nomes sem repetição por dono
+        Index("uq_activity_stages_owner_nome", "owner_id", "nome", unique=True),
     )
 
 
@@ -72,7 +86,10 @@ class Activity(Base):
         ForeignKey("activity_stages.id", ondelete="CASCADE"),
         index=True,
     )
+    # posição gravada no último move (só informativa); a ordem real é order_key
     order_index: Mapped[int] = mapped_column(Integer, default=0, index=True)
+    # chave fracionária (ver app/services/ordering.py): ORDER BY order_key, id
+    order_key: Mapped[str | None] = mapped_column(ordering.key_type(), nullable=True)
 
     titulo: Mapped[str] = mapped_column(String(200))
     descricao: Mapped[str | None] = mapped_column(Text, nullable=True)
@@ -86,11 +103,87 @@ class Activity(Base):
     # Supabase é Postgres → ARRAY funciona. Se quiser compatibilidade SQLite, troque por JSON.
     tags: Mapped[list[str] | None] = mapped_column(ARRAY(String), nullable=True)
 
+    # cópia de stage.is_done (mantida pelo router) para o índice parcial de vencimentos
+    stage_done: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False, server_default=false())
+
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     stage: Mapped["ActivityStage"] = relationship("ActivityStage", back_populates="atividades")
 
     __table_args__ = (
-        Index("ix_activities_owner_stage_order", "owner_id", "stage_id", "order_index"),
+        Index("ix_activities_owner_stage_key", "owner_id", "stage_id", "order_key"),
+        # GET /atividades/changes
+        Index("ix_activities_owner_updated", "owner_id", "updated_at"),
+        # GET /atividades/due/count: só atividades fora de colunas concluídas. O predicado
+        # precisa ser o mesmo que `~Activity.stage_done` gera em cada dialeto (no SQLite,
+        # sem boolean nativo, `stage_done = 0`), senão o planner não usa o índice parcial.
+        Index(
+            "ix_activities_owner_due_open", "owner_id", "data_vencimento",
+            postgresql_where=text(_OPEN_PREDICATE["postgresql"]),
+            sqlite_where=text(_OPEN_PREDICATE["sqlite"]),
+        ),
     )
+
+
+_DONE_MARKERS = ("conclu", "feito", "done")
+
+
+def is_done_stage_name(nome: str | None) -> bool:
+    """'Concluído', 'Feito', 'Done' -> True (mesma regra do antigo filtro LIKE)."""
+    n = strip_accents_lower(nome)
+    return any(m in n for m in _DONE_MARKERS)
+
+
+@ddl.register("activities_updated_index", "postgresql")
+@ddl.register("activities_updated_index", "sqlite")
+def _activities_updated_index(conn: Connection) -> Optional[bool]:
+    if not ddl.has_table(conn, "activities"):
+        return False
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_activities_owner_updated ON activities (owner_id, updated_at)"
+    ))
+    return True
+
+
+def _done_flags_step(bool_type: str, dialect: str):
+    open_predicate = _OPEN_PREDICATE[dialect]
+
+    def step(conn: Connection) -> Optional[bool]:
+        if not (ddl.has_table(conn, "activity_stages") and ddl.has_table(conn, "activities")):
+            return False
+        if not ddl.has_column(conn, "activity_stages", "is_done"):
+            conn.execute(text(f"ALTER TABLE activity_stages ADD COLUMN is_done {bool_type} NOT NULL DEFAULT false"))
+            like = " OR ".join(f"lower(nome) LIKE '%{m}%'" for m in _DONE_MARKERS)
+            conn.execute(text(f"UPDATE activity_stages SET is_done = true WHERE {like}"))
+        if not ddl.has_column(conn, "activities", "stage_done"):
+            conn.execute(text(f"ALTER TABLE activities ADD COLUMN stage_done {bool_type} NOT NULL DEFAULT false"))
+            conn.execute(text(
+                "UPDATE activities SET stage_done = COALESCE("
+                "(SELECT s.is_done FROM activity_stages s WHERE s.id = activities.stage_id), false)"
+            ))
+        if dialect == "sqlite":
+            # bancos criados com `WHERE NOT stage_done`, que o SQLite nunca usava
+            sql = conn.execute(text(
+                "SELECT sql FROM sqlite_master WHERE type = 'index' AND name = 'ix_activities_owner_due_open'"
+            )).scalar()
+            if sql and open_predicate not in sql:
+                conn.execute(text("DROP INDEX ix_activities_owner_due_open"))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_activities_owner_due_open "
+            f"ON activities (owner_id, data_vencimento) WHERE {open_predicate}"
+        ))
+        return True
+    return step
+
+
+ddl.register("activities_done_flags", "postgresql")(_done_flags_step("boolean", "postgresql"))
+ddl.register("activities_done_flags", "sqlite")(_done_flags_step("BOOLEAN", "sqlite"))
+
+
+ordering.register_order_key_ddl(
+    Activity.__table__,
+    ("owner_id", "stage_id"),
+    index_name="ix_activities_owner_stage_key",
+    drop_indexes=("ix_activities_owner_stage_order",),
+)
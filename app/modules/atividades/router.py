@@ -2,24 +2,24 @@ from __future__ import annotations
 
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy import select, func, and_
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Query
+from sqlalchemy import select, func, and_, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import date, timedelta
 from app.core.dependencies import get_current_user, get_db
 from app.modules.atividades import schemas as s
+from app.modules.atividades.crud import UNIQUE_INDEX
 from app.modules.users.models import User
-from app.modules.atividades.models import ActivityStage, Activity
+from app.core import cache, etag
+from app.core.config import settings
+from app.modules.atividades.models import ActivityStage, Activity, is_done_stage_name
+from app.modules.sync import crud as sync
+from app.modules.sync.models import Tombstone
+from app.services import events, ordering
 
 router = APIRouter()
-
-# =============== Defaults (seed) ===============
-DEFAULT_STAGES = [
-    {"nome": "A Fazer",        "cor": "border-l-warning",   "ordem": 1},
-    {"nome": "Em Andamento",   "cor": "border-l-primary",   "ordem": 2},
-    {"nome": "Revisão",        "cor": "border-l-secondary", "ordem": 3},
-    {"nome": "Concluído",      "cor": "border-l-success",   "ordem": 4},
-]
+etag.track(ActivityStage, "activity_stages", "owner_id")
 
 # =============== Helpers ===============
 async def _assert_stage_owner(db: AsyncSession, stage_id: str, owner_id: int) -> ActivityStage:
@@ -30,80 +30,38 @@ async def _assert_stage_owner(db: AsyncSession, stage_id: str, owner_id: int) ->
         raise HTTPException(status_code=404, detail="Funil não encontrado")
     return st
 
-async def _compact_order_indices(db: AsyncSession, owner_id: int, stage_id: str) -> None:
-    """
-    Reindexa as atividades de uma coluna para 0..n-1 (mantendo a ordem atual).
-    Útil após exclusões ou movimentos.
-    """
-    rows = (await db.execute(
-        select(Activity).where(
-            Activity.owner_id == owner_id,
-            Activity.stage_id == stage_id
-        ).order_by(Activity.order_index.asc(), Activity.id.asc())
-    )).scalars().all()
-
-    for idx, row in enumerate(rows):
-        if row.order_index != idx:
-            row.order_index = idx
-            db.add(row)
-
-async def _next_order_index(db: AsyncSession, owner_id: int, stage_id: str) -> int:
-    max_idx = await db.scalar(
-        select(func.max(Activity.order_index)).where(
-            Activity.owner_id == owner_id,
-            Activity.stage_id == stage_id
-        )
+async def _flush_stage(db: AsyncSession) -> None:
+    try:
+        await db.flush()
+    except IntegrityError as e:
+        await db.rollback()
+        if UNIQUE_INDEX in str(e.orig) or "activity_stages.owner_id, activity_stages.nome" in str(e.orig):
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Já existe um funil com esse nome.")
+        raise
+
+def _column_scope(owner_id: int, stage_id: str) -> list:
+    return [Activity.owner_id == owner_id, Activity.stage_id == stage_id]
+
+async def _publish_activity(user, item: Activity, op: str) -> None:
+    """Após o commit: invalida os contadores em cache e avisa o SSE."""
+    await cache.invalidate(item.owner_id, "atividades")
+    events.publish(
+        user.tenant_id, "atividades.activity", op=op, id=item.id, stage_id=item.stage_id,
+        order_key=item.order_key, owner_id=item.owner_id,
     )
-    return 0 if max_idx is None else int(max_idx) + 1
-
-async def _insert_at_index(
-    db: AsyncSession,
-    owner_id: int,
-    stage_id: str,
-    insert_index: int,
-    skip_activity_id: Optional[int] = None
-) -> None:
-    """
-    Abre espaço na coluna a partir de 'insert_index', empurrando os demais (+1).
-    skip_activity_id: não incrementa o item que está sendo movido.
-    """
-    rows = (await db.execute(
-        select(Activity).where(
-            Activity.owner_id == owner_id,
-            Activity.stage_id == stage_id,
-            Activity.id != (skip_activity_id or -1),
-            Activity.order_index >= insert_index
-        ).order_by(Activity.order_index.desc())
-    )).scalars().all()
-
-    # Atualiza de trás pra frente para evitar conflitos únicos temporários
-    for row in rows:
-        row.order_index = row.order_index + 1
-        db.add(row)
 
 # =============== FUNIS (STAGES) ===============
-@router.get("/funis", response_model=List[s.StageOut])
+@router.get("/funis", response_model=List[s.StageOut], dependencies=[Depends(etag.conditional("activity_stages"))])
 async def list_funis(
     db: AsyncSession = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
+    # as colunas padrão são criadas no provisionamento do usuário (crud.seed_default_stages)
     rows = (await db.execute(
         select(ActivityStage)
         .where(ActivityStage.owner_id == current_user.id)
         .order_by(ActivityStage.ordem.asc().nulls_last(), ActivityStage.created_at.asc())
     )).scalars().all()
-
-    # Seed automático para o mentor, se vazio
-    if not rows:
-        for st in DEFAULT_STAGES:
-            db.add(ActivityStage(owner_id=current_user.id, **st))
-        await db.commit()
-        rows = (await db.execute(
-            select(ActivityStage)
-            .where(ActivityStage.owner_id == current_user.id)
-            .order_by(ActivityStage.ordem.asc().nulls_last(), ActivityStage.created_at.asc())
-        )).scalars().all()
-
     return rows
 
 @router.post("/funis", response_model=s.StageOut, status_code=status.HTTP_201_CREATED)
@@ -117,9 +75,12 @@ async def create_funil(
         nome=payload.nome,
         cor=payload.cor,
         ordem=payload.ordem,
+        is_done=is_done_stage_name(payload.nome) if payload.is_done is None else payload.is_done,
     )
     db.add(stage)
+    await _flush_stage(db)
     await db.commit()
+    events.publish(current_user.tenant_id, "atividades.stage", op="upsert", id=stage.id, owner_id=current_user.id)
     await db.refresh(stage)
     return stage
 
@@ -132,15 +93,32 @@ async def update_funil(
 ):
     st = await _assert_stage_owner(db, stage_id, current_user.id)
 
+    was_done = st.is_done
     if payload.nome is not None:
         st.nome = payload.nome
+        st.is_done = is_done_stage_name(payload.nome)
     if payload.cor is not None:
         st.cor = payload.cor
     if payload.ordem is not None:
         st.ordem = payload.ordem
+    if payload.is_done is not None:
+        st.is_done = payload.is_done
 
     db.add(st)
+    await _flush_stage(db)
+    flipped = st.is_done != was_done
+    if flipped:
+        # mantém a cópia usada pelo índice parcial de vencimentos
+        await db.execute(
+            update(Activity)
+            .where(*_column_scope(current_user.id, st.id))
+            .values(stage_done=st.is_done)
+            .execution_options(synchronize_session=False)
+        )
     await db.commit()
+    if flipped:
+        await cache.invalidate(current_user.id, "atividades")
+    events.publish(current_user.tenant_id, "atividades.stage", op="upsert", id=st.id, owner_id=current_user.id)
     await db.refresh(st)
     return st
 
@@ -151,8 +129,12 @@ async def delete_funil(
     current_user=Depends(get_current_user),
 ):
     st = await _assert_stage_owner(db, stage_id, current_user.id)
+    ids = (await db.execute(select(Activity.id).where(*_column_scope(current_user.id, st.id)))).scalars().all()
+    await sync.record_deletions(db, "activity", ids, owner_id=current_user.id)
     await db.delete(st)  # cascade apaga atividades
     await db.commit()
+    await cache.invalidate(current_user.id, "atividades")
+    events.publish(current_user.tenant_id, "atividades.stage", op="delete", id=stage_id, owner_id=current_user.id)
     return None
 
 # =============== ATIVIDADES (ITEMS) ===============
@@ -165,9 +147,34 @@ async def list_atividades(
     rows = (await db.execute(
         select(Activity)
         .where(Activity.owner_id == current_user.id)
-        .order_by(Activity.stage_id.asc(), Activity.order_index.asc())
+        .order_by(Activity.stage_id.asc(), Activity.order_key.asc(), Activity.id.asc())
     )).scalars().all()
-    return rows
+    return ordering.with_positions(rows, s.ActivityOut, lambda r: r.stage_id)
+
+@router.get("/changes", response_model=s.ActivityChangesOut)
+async def atividade_changes(
+    since: Optional[str] = Query(None, description="cursor devolvido pela chamada anterior"),
+    limit: int = Query(500, ge=1, le=2000),
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """Atividades criadas/alteradas e ids apagados desde o cursor (ver GET /crm/changes)."""
+    try:
+        ch = await sync.changes_since(
+            db,
+            model=Activity,
+            scope=[Activity.owner_id == current_user.id],
+            entity="activity",
+            tombstone_scope=[Tombstone.owner_id == current_user.id],
+            since=since,
+            limit=limit,
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    return s.ActivityChangesOut(
+        cursor=ch.cursor, reset=ch.reset, has_more=ch.has_more,
+        upserts=[s.ActivityOut.model_validate(a) for a in ch.upserts], deleted=ch.deleted,
+    )
 
 @router.post("", response_model=s.ActivityOut, status_code=status.HTTP_201_CREATED)
 async def create_atividade(
@@ -176,15 +183,19 @@ async def create_atividade(
     current_user=Depends(get_current_user),
 ):
     # valida stage
-    await _assert_stage_owner(db, payload.stage_id, current_user.id)
+    stage = await _assert_stage_owner(db, payload.stage_id, current_user.id)
 
-    # order_index vai para o final da coluna
-    oi = await _next_order_index(db, current_user.id, payload.stage_id)
+    # vai para o final da coluna
+    scope = _column_scope(current_user.id, payload.stage_id)
+    last = await ordering.last_key(db, Activity.order_key, scope)
+    oi = await db.scalar(select(func.count(Activity.id)).where(*scope))
 
     item = Activity(
         owner_id=current_user.id,
         stage_id=payload.stage_id,
         order_index=oi,
+        order_key=ordering.key_between(last, None),
+        stage_done=stage.is_done,
         titulo=payload.titulo,
         descricao=payload.descricao,
         prioridade=payload.prioridade,
@@ -194,6 +205,7 @@ async def create_atividade(
     )
     db.add(item)
     await db.commit()
+    await _publish_activity(current_user, item, "upsert")
     await db.refresh(item)
     return item
 
@@ -201,6 +213,7 @@ async def create_atividade(
 async def update_atividade(
     atividade_id: int,
     payload: s.ActivityUpdate,
+    background: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
@@ -224,52 +237,29 @@ async def update_atividade(
     if payload.tags is not None:
         item.tags = payload.tags
 
-    # Movimentação / ordenação
-    new_stage_id = payload.stage_id or item.stage_id
-    new_index = payload.order_index
-
-    # Caso 1: mudando de coluna
-    if payload.stage_id and payload.stage_id != item.stage_id:
-        # valida novo stage do owner
-        await _assert_stage_owner(db, payload.stage_id, current_user.id)
-
-        old_stage = item.stage_id
-
-        # "Move" item de coluna: primeiro compacta a antiga
-        item.stage_id = payload.stage_id
-        await _compact_order_indices(db, current_user.id, old_stage)
-
-        # Define posição na nova coluna
-        if new_index is None:
-            new_index = await _next_order_index(db, current_user.id, new_stage_id)
-        else:
-            await _insert_at_index(db, current_user.id, new_stage_id, new_index, skip_activity_id=item.id)
-
-        item.order_index = new_index
-
-    # Caso 2: mesma coluna, apenas reordena
-    elif new_index is not None:
-        if new_index < 0:
-            new_index = 0
-
-        rows = (await db.execute(
-            select(Activity).where(
-                Activity.owner_id == current_user.id,
-                Activity.stage_id == item.stage_id
-            ).order_by(Activity.order_index.asc(), Activity.id.asc())
-        )).scalars().all()
-
-        rows = [r for r in rows if r.id != item.id]
-        if new_index > len(rows):
-            new_index = len(rows)
-        rows.insert(new_index, item)
-
-        for idx, r in enumerate(rows):
-            r.order_index = idx
-            db.add(r)
+    # Movimentação / ordenação: só a atividade movida é gravada (chave entre os
+    # vizinhos da posição alvo); mudar de coluna sem índice = fim da coluna destino
+    moving = payload.stage_id is not None and payload.stage_id != item.stage_id
+    if moving:
+        target = await _assert_stage_owner(db, payload.stage_id, current_user.id)
+        item.stage_done = target.is_done
+
+    if moving or payload.order_index is not None:
+        stage_id = payload.stage_id if moving else item.stage_id
+        new_index = None if payload.order_index is None else max(payload.order_index, 0)
+        scope = _column_scope(current_user.id, stage_id)
+        key = await ordering.move_key(db, Activity, scope, new_index, exclude_id=item.id)
+
+        item.stage_id = stage_id
+        item.order_key = key
+        size = await db.scalar(select(func.count(Activity.id)).where(*scope, Activity.id != item.id))
+        item.order_index = size if new_index is None else min(new_index, size)
+        if ordering.needs_rebalance(key):
+            background.add_task(ordering.rebalance_column, Activity, {"owner_id": current_user.id, "stage_id": stage_id})
 
     db.add(item)
     await db.commit()
+    await _publish_activity(current_user, item, "upsert")
     await db.refresh(item)
     return item
 
@@ -285,13 +275,11 @@ async def delete_atividade(
     if not item:
         raise HTTPException(status_code=404, detail="Atividade não encontrada")
 
-    stage_id = item.stage_id
+    # as demais chaves continuam válidas: nada a reindexar
+    await sync.record_deletions(db, "activity", [item.id], owner_id=current_user.id)
     await db.delete(item)
     await db.commit()
-
-    # Compacta índices após exclusão
-    await _compact_order_indices(db, current_user.id, stage_id)
-    await db.commit()
+    await _publish_activity(current_user, item, "delete")
     return None
 
 @router.get("/due/count")
@@ -303,39 +291,25 @@ async def count_due_activities(
 ):
     """
     Conta atividades com data_vencimento ∈ [hoje .. hoje+days], do owner atual.
-    Por padrão exclui colunas/funís 'concluídas' (nome contendo 'conclu'|'feito'|'done').
+    Por padrão exclui colunas/funís 'concluídas' (`ActivityStage.is_done`).
     """
     today = date.today()
     end = today + timedelta(days=days)
-
-    stmt = select(func.count(Activity.id)).where(
-        and_(
-            Activity.owner_id == me.id,
-            Activity.data_vencimento.is_not(None),
-            Activity.data_vencimento >= today,
-            Activity.data_vencimento <= end,
-        )
-    )
-
+    conds = [
+        Activity.owner_id == me.id,
+        Activity.data_vencimento.is_not(None),
+        Activity.data_vencimento >= today,
+        Activity.data_vencimento <= end,
+    ]
     if exclude_done:
-        # Exclui estágios cujo nome sugira "concluído"
-        stmt = (
-            select(func.count(Activity.id))
-            .select_from(Activity)
-            .join(ActivityStage, Activity.stage_id == ActivityStage.id)
-            .where(
-                and_(
-                    Activity.owner_id == me.id,
-                    Activity.data_vencimento.is_not(None),
-                    Activity.data_vencimento >= today,
-                    Activity.data_vencimento <= end,
-                    ~func.lower(ActivityStage.nome).like("%conclu%"),
-                    ~func.lower(ActivityStage.nome).like("%feito%"),
-                    ~func.lower(ActivityStage.nome).like("%done%"),
-                )
-            )
-        )
+        # mesmo predicado do índice parcial ix_activities_owner_due_open (sem join; ver _OPEN_PREDICATE)
+        conds.append(~Activity.stage_done)
 
-    res = await db.execute(stmt)
-    (count,) = res.one()
-    return {"count": int(count)}
\ No newline at end of file
+    async def load(db: AsyncSession) -> dict:
+        count = await db.scalar(select(func.count(Activity.id)).where(and_(*conds)))
+        return {"count": int(count or 0)}
+
+    return await cache.cached(
+        db, mentor_id=me.id, route="atividades.due_count", params=[days, exclude_done, today],
+        tags=["atividades"], ttl=settings.DASHBOARD_CACHE_TTL_SECONDS, loader=load,
+    )
@@ -13,13 +13,16 @@ class StageBase(BaseModel):
 
 
 class StageCreate(StageBase):
-    pass
+    # None = deduz pelo nome ("Concluído", "Feito", "Done")
+    is_done: Optional[bool] = None
 
 
 class StageUpdate(BaseModel):
     nome: Optional[str] = Field(None, max_length=120)
     cor: Optional[str] = Field(None, max_length=48)
     ordem: Optional[int] = None
+    # None = mantém; ao renomear sem informar, é deduzido do novo nome
+    is_done: Optional[bool] = None
 
 
 class StageOut(BaseModel):
@@ -27,6 +30,7 @@ class StageOut(BaseModel):
     nome: str
     cor: Optional[str] = None
     ordem: Optional[int] = None
+    is_done: bool = False
     created_at: datetime
     updated_at: datetime
 
@@ -68,6 +72,7 @@ class ActivityOut(BaseModel):
     id: int
     stage_id: str
     order_index: int
+    order_key: Optional[str] = None
 
     titulo: str
     descricao: Optional[str] = None
@@ -81,3 +86,13 @@ class ActivityOut(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+# ====================== SYNC ======================
+
+class ActivityChangesOut(BaseModel):
+    cursor: str                     # passe como ?since= no próximo poll
+    reset: bool = False             # True: recarregue o quadro inteiro e use o cursor
+    has_more: bool = False          # True: chame de novo já com o cursor (mais páginas)
+    upserts: List[ActivityOut] = []
+    deleted: List[int] = []
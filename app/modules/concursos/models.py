@@ -2,15 +2,24 @@
 from __future__ import annotations
 from datetime import date, datetime
 from decimal import Decimal
+from typing import Optional
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import String, Text, Date, Integer, Numeric, Boolean, func
+from sqlalchemy import String, Text, Date, Integer, Numeric, Boolean, Index, func
+from sqlalchemy.engine import Connection
 from sqlalchemy.dialects.postgresql import JSONB
+from app.db import ddl
 from app.db.base import Base
 from sqlalchemy.sql import text as sqltext
 from sqlalchemy.dialects.postgresql import ARRAY
 
 class Concurso(Base):
     __tablename__ = "concursos"
+    __table_args__ = (
+        # GET /agenda: uma busca por intervalo para cada data do concurso
+        Index("ix_concursos_mentor_prova", "mentor_id", "prova_data"),
+        Index("ix_concursos_mentor_insc_inicio", "mentor_id", "inscricao_inicio"),
+        Index("ix_concursos_mentor_insc_fim", "mentor_id", "inscricao_fim"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
 
@@ -43,3 +52,13 @@ ARRAY(String), nullable=False, server_default=sqltext("'{}'::text[]")
 
     created_at: Mapped[datetime] = mapped_column(server_default=func.now())
     updated_at: Mapped[datetime | None] = mapped_column(onupdate=func.now())
+
+
+@ddl.register("concursos_agenda_indexes", "postgresql")
+@ddl.register("concursos_agenda_indexes", "sqlite")
+def _agenda_indexes(conn: Connection) -> Optional[bool]:
+    if not ddl.has_table(conn, "concursos"):
+        return False
+    for name, col in (("insc_inicio", "inscricao_inicio"), ("insc_fim", "inscricao_fim")):
+        conn.execute(sqltext(f"CREATE INDEX IF NOT EXISTS ix_concursos_mentor_{name} ON concursos (mentor_id, {col})"))
+    return True
@@ -1,17 +1,21 @@
 from typing import List, Optional
 from fastapi import APIRouter, Depends, Query, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_
+from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
+from app.db.dialect import dialect_name
+from app.modules.concursos import search
 from app.modules.concursos.models import Concurso
 from app.modules.concursos.schemas import ConcursoOut, ConcursoCreate, ConcursoUpdate
 from app.modules.users.models import User
 from app.core.security import decode_token  # se precisar em deps
+from app.core import etag
 from app.core.dependencies import get_db, get_current_user
 
 router = APIRouter()
+etag.track(Concurso, "concursos", "mentor_id")
 
-@router.get("", response_model=List[ConcursoOut])
+@router.get("", response_model=List[ConcursoOut], dependencies=[Depends(etag.conditional("concursos"))])
 async def list_concursos(
     q: Optional[str] = Query(None),
     uf: Optional[str] = Query(None, max_length=2),
@@ -26,21 +30,15 @@ async def list_concursos(
         conds.append(Concurso.uf == uf)
     if status:
         conds.append(Concurso.status == status)
-    if q:
-        like = f"%{q}%"
-        conds.append(or_(
-            Concurso.titulo.ilike(like),
-            Concurso.orgao.ilike(like),
-            Concurso.cidade.ilike(like),
-            Concurso.banca.ilike(like),
-            Concurso.cargo.ilike(like),
-            Concurso.escolaridade.ilike(like),
-            Concurso.uf.ilike(like),
-        ))
+
+    stmt = select(Concurso).where(*conds)
+    if q and q.strip():
+        # índice textual (tsvector/FTS5) ranqueado; sem índice, cai no ILIKE
+        searched = search.apply_search(stmt, dialect_name(db), q)
+        stmt = searched if searched is not None else stmt.where(search.ilike_filter(q))
 
     stmt = (
-        select(Concurso)
-        .where(*conds)
+        stmt
         .order_by(Concurso.prova_data.asc().nulls_last())
         .limit(limit)
         .offset(offset)
@@ -116,7 +114,7 @@ async def update_concurso(
     for k, v in data.items():
         setattr(obj, k, v)
 
-    await db.flush()
+    await db.commit()
     await db.refresh(obj)
     return obj
 
@@ -0,0 +1,127 @@
+# app/modules/concursos/search.py
+"""
+Busca textual de concursos, sem acento e ranqueada.
+
+- Postgres: coluna gerada `search_tsv` (tsvector com `unaccent`, pesos A/B/C) + índice GIN.
+- SQLite: tabela FTS5 `concursos_fts` (external content) mantida por triggers.
+
+Termos viram prefixos ("concurso policia" -> concurso:* & policia:*), o que mantém o
+comportamento "contém o começo da palavra" da busca antiga com ILIKE.
+Se o DDL não pôde ser aplicado, `apply_search` devolve None e o router usa o ILIKE.
+"""
+from __future__ import annotations
+
+from typing import Optional
+
+from sqlalchemy import Select, column, func, literal_column, or_, table, text
+from sqlalchemy.engine import Connection
+
+from app.db import ddl
+from app.modules.concursos.models import Concurso
+from app.utils.text import search_terms
+
+FTS_NAME = "concursos_fts"
+
+# ---------------- DDL ----------------
+
+_PG_TSV_COLUMN = """
+ALTER TABLE concursos ADD COLUMN IF NOT EXISTS search_tsv tsvector
+GENERATED ALWAYS AS (
+    setweight(to_tsvector('simple', public.f_unaccent(coalesce(titulo, ''))), 'A') ||
+    setweight(to_tsvector('simple', public.f_unaccent(coalesce(orgao, '') || ' ' || coalesce(cargo, ''))), 'B') ||
+    setweight(to_tsvector('simple', public.f_unaccent(
+        coalesce(banca, '') || ' ' || coalesce(cidade, '') || ' ' ||
+        coalesce(uf, '') || ' ' || coalesce(escolaridade, '')
+    )), 'C')
+) STORED
+"""
+
+
+@ddl.register(FTS_NAME, "postgresql")
+def _pg_fts(conn: Connection) -> Optional[bool]:
+    if not ddl.has_table(conn, "concursos"):
+        return False
+    ddl.ensure_pg_unaccent(conn)
+    conn.execute(text(_PG_TSV_COLUMN))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_concursos_search_tsv ON concursos USING gin (search_tsv)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_concursos_mentor_prova ON concursos (mentor_id, prova_data)"))
+    return True
+
+
+_FTS_COLS = "titulo, orgao, cargo, banca, cidade, uf, escolaridade"
+_FTS_NEW = ", ".join(f"new.{c.strip()}" for c in _FTS_COLS.split(","))
+_FTS_OLD = ", ".join(f"old.{c.strip()}" for c in _FTS_COLS.split(","))
+
+
+@ddl.register(FTS_NAME, "sqlite")
+def _sqlite_fts(conn: Connection) -> Optional[bool]:
+    if not ddl.has_table(conn, "concursos"):
+        return False
+    created = not ddl.has_table(conn, FTS_NAME)
+    conn.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_NAME} USING fts5("
+        f"{_FTS_COLS}, content='concursos', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2')"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS concursos_fts_ai AFTER INSERT ON concursos BEGIN "
+        f"INSERT INTO {FTS_NAME}(rowid, {_FTS_COLS}) VALUES (new.id, {_FTS_NEW}); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS concursos_fts_ad AFTER DELETE ON concursos BEGIN "
+        f"INSERT INTO {FTS_NAME}({FTS_NAME}, rowid, {_FTS_COLS}) VALUES ('delete', old.id, {_FTS_OLD}); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS concursos_fts_au AFTER UPDATE ON concursos BEGIN "
+        f"INSERT INTO {FTS_NAME}({FTS_NAME}, rowid, {_FTS_COLS}) VALUES ('delete', old.id, {_FTS_OLD}); "
+        f"INSERT INTO {FTS_NAME}(rowid, {_FTS_COLS}) VALUES (new.id, {_FTS_NEW}); END"
+    ))
+    if created:
+        # indexa as linhas que já existiam
+        conn.execute(text(f"INSERT INTO {FTS_NAME}({FTS_NAME}) VALUES ('rebuild')"))
+    return True
+
+
+# ---------------- Consulta ----------------
+
+_fts = table(FTS_NAME, column("rowid"))
+
+
+def apply_search(stmt: Select, dialect: str, q: str) -> Optional[Select]:
+    """
+    Aplica o filtro do índice textual e a ordenação por relevância em `stmt`
+    (um select de Concurso). None se o índice não estiver disponível neste banco.
+    """
+    terms = search_terms(q)
+    if not terms or not ddl.is_applied(FTS_NAME):
+        return None
+
+    if dialect == "postgresql":
+        tsv = literal_column("concursos.search_tsv")
+        query = func.to_tsquery("simple", " & ".join(f"{t}:*" for t in terms))
+        return stmt.where(tsv.op("@@")(query)).order_by(func.ts_rank_cd(tsv, query).desc())
+
+    if dialect == "sqlite":
+        fts = literal_column(FTS_NAME)
+        match = " ".join(f'"{t}"*' for t in terms)
+        # bm25: menor = mais relevante; pesos na ordem das colunas do FTS
+        return (
+            stmt.join(_fts, _fts.c.rowid == Concurso.id)
+            .where(fts.op("MATCH")(match))
+            .order_by(func.bm25(fts, 10.0, 5.0, 5.0, 2.0, 2.0, 1.0, 1.0))
+        )
+
+    return None
+
+
+def ilike_filter(q: str):
+    like = f"%{q}%"
+    return or_(
+        Concurso.titulo.ilike(like),
+        Concurso.orgao.ilike(like),
+        Concurso.cidade.ilike(like),
+        Concurso.banca.ilike(like),
+        Concurso.cargo.ilike(like),
+        Concurso.escolaridade.ilike(like),
+        Concurso.uf.ilike(like),
+    )
@@ -0,0 +1,174 @@
+# app/modules/crm/lead_import.py
+"""
+Importação em lote de leads (planilhas de landing pages, CSV ou JSON).
+
+- Cabeçalhos do CSV são reconhecidos por apelido (nome/titulo, celular/whatsapp/telefone,
+  uf/estado...), com separador `,` ou `;` detectado automaticamente.
+- Estado aceita sigla ou nome por extenso (sem diferenciar acentos) e é gravado como
+  UF; valor que não é uma das 27 UFs invalida a linha, em vez de ser truncado.
+- CPF/telefone/email são normalizados (`models.dedupe_keys`) e comparados com os leads
+  já existentes do dono pelos índices `*_norm` e com as linhas anteriores do arquivo;
+  qualquer chave repetida descarta a linha como duplicada.
+- As chaves de ordenação do lote são geradas de uma vez no fim da coluna e os INSERTs
+  vão em blocos de `INSERT_BATCH`, numa única transação.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import re
+from itertools import count
+from typing import Any, Iterable
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import etag
+from app.modules.crm.models import CRMLead, dedupe_keys
+from app.modules.crm.schemas import LeadImportError, LeadImportResult
+from app.services import ordering
+from app.utils.br import normalize_uf
+from app.utils.text import strip_accents_lower
+
+MAX_ROWS = 20_000
+INSERT_BATCH = 2_000
+LOOKUP_CHUNK = 1_000
+MAX_ERRORS = 100
+
+FIELDS = (
+    "titulo", "cpf", "telefone", "email", "estado", "cidade",
+    "planoDesejado", "concursoDesejado", "descricao",
+)
+_LIMITS = {
+    "titulo": 150, "cpf": 20, "telefone": 20, "email": 255,
+    "cidade": 120, "planoDesejado": 120, "concursoDesejado": 120,
+}
+_ALIASES = {
+    "titulo": ("titulo", "nome", "name", "lead", "nomecompleto"),
+    "cpf": ("cpf", "documento", "cpfcnpj"),
+    "telefone": ("telefone", "celular", "whatsapp", "phone", "fone", "tel"),
+    "email": ("email", "mail"),
+    "estado": ("estado", "uf"),
+    "cidade": ("cidade", "city", "municipio"),
+    "planoDesejado": ("planodesejado", "plano"),
+    "concursoDesejado": ("concursodesejado", "concurso"),
+    "descricao": ("descricao", "observacao", "observacoes", "obs", "mensagem"),
+}
+_HEADER = {alias: field for field, aliases in _ALIASES.items() for alias in aliases}
+
+
+def _header_key(h: str | None) -> str:
+    return re.sub(r"[^a-z0-9]", "", strip_accents_lower(h))
+
+
+def parse_csv(data: bytes) -> list[dict[str, Any]]:
+    """CSV (UTF-8 com/sem BOM ou Latin-1) -> lista de dicts com os campos de FIELDS."""
+    try:
+        content = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        content = data.decode("latin-1")
+    try:
+        dialect = csv.Sniffer().sniff(content[:4096], delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.DictReader(io.StringIO(content), dialect=dialect)
+    mapping = {h: _HEADER[_header_key(h)] for h in (reader.fieldnames or []) if _header_key(h) in _HEADER}
+    return [{field: row.get(h) for h, field in mapping.items()} for row in reader]
+
+
+def _clean(raw: dict[str, Any]) -> dict[str, Any]:
+    item: dict[str, Any] = {}
+    for f in FIELDS:
+        v = raw.get(f)
+        v = str(v).strip() if v is not None else ""
+        if f in _LIMITS:
+            v = v[: _LIMITS[f]]
+        item[f] = v or None
+    return item
+
+
+async def _existing_keys(
+    db: AsyncSession, scope: list, wanted: dict[str, set[str]]
+) -> dict[str, set[str]]:
+    found: dict[str, set[str]] = {k: set() for k in wanted}
+    for k, values in wanted.items():
+        col = getattr(CRMLead, k)
+        vals = list(values)
+        for i in range(0, len(vals), LOOKUP_CHUNK):
+            res = await db.execute(select(col).where(*scope, col.in_(vals[i:i + LOOKUP_CHUNK])))
+            found[k].update(res.scalars())
+    return found
+
+
+async def import_leads(
+    db: AsyncSession,
+    *,
+    tenant_id: str,
+    owner_id: int,
+    stage_id: str,
+    items: Iterable[dict[str, Any]],
+    first_line: int = 1,
+) -> LeadImportResult:
+    erros: list[LeadImportError] = []
+    recebidos = invalidos = duplicados = 0
+
+    candidates = []
+    for linha, raw in enumerate(items, start=first_line):
+        recebidos += 1
+        item = _clean(raw)
+        if not item["titulo"]:
+            invalidos += 1
+            if len(erros) < MAX_ERRORS:
+                erros.append(LeadImportError(linha=linha, motivo="titulo/nome ausente"))
+            continue
+        if item["estado"]:
+            uf = normalize_uf(item["estado"])
+            if uf is None:
+                invalidos += 1
+                if len(erros) < MAX_ERRORS:
+                    erros.append(LeadImportError(linha=linha, motivo=f"estado inválido ({item['estado'][:40]})"))
+                continue
+            item["estado"] = uf
+        candidates.append((linha, item, dedupe_keys(item["cpf"], item["email"], item["telefone"])))
+
+    owner_scope = [CRMLead.tenant_id == tenant_id, CRMLead.owner_user_id == owner_id]
+    wanted: dict[str, set[str]] = {"cpf_norm": set(), "email_norm": set(), "telefone_norm": set()}
+    for _, _, keys in candidates:
+        for k, v in keys.items():
+            if v:
+                wanted[k].add(v)
+    seen = await _existing_keys(db, owner_scope, wanted)
+
+    rows = []
+    for linha, item, keys in candidates:
+        dup = next((k for k, v in keys.items() if v and v in seen[k]), None)
+        if dup:
+            duplicados += 1
+            if len(erros) < MAX_ERRORS:
+                erros.append(LeadImportError(linha=linha, motivo=f"duplicado ({dup.removesuffix('_norm')})"))
+            continue
+        for k, v in keys.items():
+            if v:
+                seen[k].add(v)
+        rows.append({**item, **keys})
+
+    if rows:
+        column = [*owner_scope, CRMLead.stage_id == stage_id]
+        last = await ordering.last_key(db, CRMLead.order_key, column)
+        size = (await db.execute(select(func.count()).select_from(CRMLead).where(*column))).scalar_one()
+        keys = ordering.keys_between(last, None, len(rows))
+        for row, key, idx in zip(rows, keys, count(size)):
+            row.update(tenant_id=tenant_id, owner_user_id=owner_id, stage_id=stage_id, order_key=key, order_index=idx)
+        for i in range(0, len(rows), INSERT_BATCH):
+            await db.execute(insert(CRMLead), rows[i:i + INSERT_BATCH])
+        await etag.bump(db, "crm_leads", tenant_id)
+        await db.commit()
+
+    erros.sort(key=lambda e: e.linha)
+    return LeadImportResult(
+        recebidos=recebidos,
+        importados=len(rows),
+        duplicados=duplicados,
+        invalidos=invalidos,
+        erros=erros,
+    )
@@ -1,8 +1,14 @@
 # app/modules/crm/models.py
+from datetime import datetime
+from typing import Optional
 from uuid import uuid4
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import String, Integer, Text, Index  # (DateTime/func se quiser timestamps)
+from sqlalchemy import String, Integer, Text, DateTime, Index, bindparam, event, func, select, text, update
+from sqlalchemy.engine import Connection
+from app.db import ddl
 from app.db.base import Base
+from app.services import ordering
+from app.utils.br import normalize_cpf_cnpj, normalize_mobile_phone
 
 class CRMFunil(Base):
     __tablename__ = "crm_funis"
@@ -26,7 +32,10 @@ class CRMLead(Base):
     owner_user_id: Mapped[int] = mapped_column(Integer, index=True, nullable=False)  # FK no banco
 
     stage_id: Mapped[str] = mapped_column(String, index=True, nullable=False)  # id do funil
+    # posição gravada no último move (só informativa); a ordem real é order_key
     order_index: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # chave fracionária (ver app/services/ordering.py): ORDER BY order_key, id
+    order_key: Mapped[str | None] = mapped_column(ordering.key_type(), nullable=True)
 
     # 🔽 Campos que estavam faltando
     titulo: Mapped[str] = mapped_column(String(150), nullable=False)
@@ -39,6 +48,117 @@ class CRMLead(Base):
     concursoDesejado: Mapped[str | None] = mapped_column(String(120), nullable=True)
     descricao: Mapped[str | None] = mapped_column(Text, nullable=True)
 
+    # chaves normalizadas para deduplicação (ver dedupe_keys); preenchidas pelo ORM
+    cpf_norm: Mapped[str | None] = mapped_column(String(14), nullable=True)
+    email_norm: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    telefone_norm: Mapped[str | None] = mapped_column(String(20), nullable=True)
+
+    # default também no ORM: em SQLite antigo a coluna entra via ALTER TABLE, sem DEFAULT
+    created_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), default=func.now(), nullable=True
+    )
+    updated_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), default=func.now(), onupdate=func.now(), nullable=True
+    )
+
     __table_args__ = (
-        Index("ix_crm_leads_tenant_owner_stage_idx", "tenant_id", "owner_user_id", "stage_id", "order_index"),
+        Index("ix_crm_leads_tenant_owner_stage_key", "tenant_id", "owner_user_id", "stage_id", "order_key"),
+        # só igualdade/IN: hash no Postgres (btree nos demais)
+        Index("ix_crm_leads_cpf_norm", "cpf_norm", postgresql_using="hash"),
+        Index("ix_crm_leads_email_norm", "email_norm", postgresql_using="hash"),
+        Index("ix_crm_leads_telefone_norm", "telefone_norm", postgresql_using="hash"),
+        # GET /crm/changes
+        Index("ix_crm_leads_tenant_updated", "tenant_id", "updated_at"),
     )
+
+
+def phone_key(value: str | None) -> str | None:
+    """'+55 (11) 98765-4321' -> '11987654321'; None se não tiver DDD + número."""
+    digits = normalize_mobile_phone(value)
+    if digits and len(digits) in (12, 13) and digits.startswith("55"):
+        digits = digits[2:]
+    return digits if digits and len(digits) >= 10 else None
+
+
+def dedupe_keys(cpf: str | None, email: str | None, telefone: str | None) -> dict:
+    return {
+        "cpf_norm": normalize_cpf_cnpj(cpf),
+        "email_norm": (email or "").strip().lower() or None,
+        "telefone_norm": phone_key(telefone),
+    }
+
+
+@event.listens_for(CRMLead, "before_insert")
+@event.listens_for(CRMLead, "before_update")
+def _fill_dedupe_keys(mapper, connection, target: CRMLead) -> None:
+    for k, v in dedupe_keys(target.cpf, target.email, target.telefone).items():
+        setattr(target, k, v)
+
+
+# bancos existentes: cria order_key, preenche a partir de order_index e troca o índice da coluna
+ordering.register_order_key_ddl(
+    CRMLead.__table__,
+    ("tenant_id", "owner_user_id", "stage_id"),
+    index_name="ix_crm_leads_tenant_owner_stage_key",
+    drop_indexes=("ix_crm_leads_tenant_owner_stage_idx",),
+)
+
+
+_DEDUPE_COLS = {"cpf_norm": "VARCHAR(14)", "email_norm": "VARCHAR(255)", "telefone_norm": "VARCHAR(20)"}
+_BACKFILL_BATCH = 1000
+
+
+def _backfill_dedupe_keys(conn: Connection) -> None:
+    t = CRMLead.__table__
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            select(t.c.id, t.c.cpf, t.c.email, t.c.telefone)
+            .where(t.c.id > last_id).order_by(t.c.id).limit(_BACKFILL_BATCH)
+        ).all()
+        if not rows:
+            return
+        conn.execute(
+            update(t).where(t.c.id == bindparam("b_id")),
+            [{"b_id": r.id, **dedupe_keys(r.cpf, r.email, r.telefone)} for r in rows],
+        )
+        last_id = rows[-1].id
+
+
+def _dedupe_step(using: str):
+    def step(conn: Connection) -> Optional[bool]:
+        if not ddl.has_table(conn, "crm_leads"):
+            return False
+        missing = [c for c in _DEDUPE_COLS if not ddl.has_column(conn, "crm_leads", c)]
+        for c in missing:
+            conn.execute(text(f"ALTER TABLE crm_leads ADD COLUMN {c} {_DEDUPE_COLS[c]}"))
+        if missing:
+            _backfill_dedupe_keys(conn)
+        for c in _DEDUPE_COLS:
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_crm_leads_{c} ON crm_leads {using}({c})"))
+        return True
+    return step
+
+
+ddl.register("crm_leads_dedupe", "postgresql")(_dedupe_step("USING hash "))
+ddl.register("crm_leads_dedupe", "sqlite")(_dedupe_step(""))
+
+
+def _timestamps_step(col_type: str, col_default: str):
+    def step(conn: Connection) -> Optional[bool]:
+        if not ddl.has_table(conn, "crm_leads"):
+            return False
+        for c in ("created_at", "updated_at"):
+            if not ddl.has_column(conn, "crm_leads", c):
+                conn.execute(text(f"ALTER TABLE crm_leads ADD COLUMN {c} {col_type}{col_default}"))
+                conn.execute(text(f"UPDATE crm_leads SET {c} = CURRENT_TIMESTAMP WHERE {c} IS NULL"))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_crm_leads_tenant_updated ON crm_leads (tenant_id, updated_at)"
+        ))
+        return True
+    return step
+
+
+# SQLite não aceita DEFAULT CURRENT_TIMESTAMP em ADD COLUMN (o ORM preenche)
+ddl.register("crm_leads_timestamps", "postgresql")(_timestamps_step("timestamptz", " DEFAULT now()"))
+ddl.register("crm_leads_timestamps", "sqlite")(_timestamps_step("DATETIME", ""))
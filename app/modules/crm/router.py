@@ -2,23 +2,47 @@
 from __future__ import annotations
 from typing import List, Sequence
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select, func, text
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response, status
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import and_, or_, select, func, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core import etag
 from app.core.dependencies import get_current_user, get_db
+from app.core.responses import fast_json, row_serializer
+from app.modules.crm import lead_import
 from app.modules.crm.models import CRMFunil, CRMLead
 from app.modules.crm.schemas import (
     FunilCreate, FunilOut, FunilUpdate,
-    LeadCreate, LeadOut, LeadUpdate
+    LeadCreate, LeadOut, LeadUpdate,
+    BoardColumn, BoardOut, LeadCard, LeadCardPage,
+    LeadImportItem, LeadImportResult, LeadChangesOut,
 )
+from app.modules.sync import crud as sync
+from app.modules.sync.models import Tombstone
+from app.services import events, ordering
+from app.utils.cursor import decode_cursor, encode_cursor
 
 router = APIRouter()
+etag.track(CRMLead, "crm_leads", "tenant_id")
 
 # -------- Helpers --------
 def is_staff(user) -> bool:
     return getattr(user, "role", None) in {"admin", "staff"}
 
+def _column_scope(tenant_id: str, owner_id: int, stage_id: str) -> list:
+    return [
+        CRMLead.tenant_id == tenant_id,
+        CRMLead.owner_user_id == owner_id,
+        CRMLead.stage_id == stage_id,
+    ]
+
+def _publish_lead(lead: CRMLead, op: str) -> None:
+    events.publish(
+        lead.tenant_id, "crm.lead", op=op, id=lead.id, stage_id=lead.stage_id,
+        order_key=lead.order_key, owner_id=lead.owner_user_id,
+    )
+
 async def _ensure_funil_belongs(
     db: AsyncSession,
     tenant_id: str,
@@ -75,6 +99,7 @@ async def create_funil(
     db.add(funil)
     await db.flush()
     await db.commit()
+    events.publish(user.tenant_id, "crm.funil", op="upsert", id=funil.id, owner_id=funil.owner_user_id)
     await db.refresh(funil)
     return funil
 
@@ -98,6 +123,7 @@ async def update_funil(
 
     await db.flush()
     await db.commit()
+    events.publish(user.tenant_id, "crm.funil", op="upsert", id=funil.id, owner_id=funil.owner_user_id)
     return {"ok": True}
 
 @router.delete("/funis/{funil_id}", status_code=204)
@@ -108,32 +134,180 @@ async def delete_funil(
 ):
     funil = await _ensure_funil_belongs(db, user.tenant_id, user.id, funil_id, can_see_all=is_staff(user))
 
-    # apaga leads do mesmo dono naquele funil
+    # apaga leads do mesmo dono naquele funil (com tombstones para o sync)
+    lead_ids = (await db.execute(
+        select(CRMLead.id).where(*_column_scope(user.tenant_id, user.id, funil.id))
+    )).scalars().all()
+    await sync.record_deletions(db, "crm_lead", lead_ids, tenant_id=user.tenant_id, owner_id=user.id)
     await db.execute(
         text("DELETE FROM crm_leads WHERE tenant_id = :t AND owner_user_id = :u AND stage_id = :s"),
         {"t": user.tenant_id, "u": user.id, "s": funil.id},
     )
+    if lead_ids:
+        await etag.bump(db, "crm_leads", user.tenant_id)
     await db.delete(funil)
     await db.flush()
     await db.commit()
+    events.publish(user.tenant_id, "crm.funil", op="delete", id=funil_id, owner_id=user.id)
     return None
 
+# -------- BOARD --------
+# colunas do card (tudo menos `descricao`, que pode ser longa)
+_CARD_COLS = (
+    CRMLead.id, CRMLead.stage_id, CRMLead.order_key, CRMLead.titulo, CRMLead.cpf,
+    CRMLead.telefone, CRMLead.email, CRMLead.estado, CRMLead.cidade,
+    CRMLead.planoDesejado, CRMLead.concursoDesejado,
+)
+_CARD_FIELDS = tuple(c.key for c in _CARD_COLS)
+
+def _card(row, position: int) -> LeadCard:
+    m = row._mapping
+    return LeadCard(order_index=position, **{f: m[f] for f in _CARD_FIELDS})
+
+def _page_cursor(last: LeadCard) -> str:
+    # (order_key, id) do último card + quantos cards a coluna já entregou
+    return encode_cursor(last.order_key, last.id, last.order_index + 1)
+
+@router.get("/board", response_model=BoardOut)
+async def get_board(
+    limit: int = Query(20, ge=1, le=100, description="Cards por coluna"),
+    db: AsyncSession = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """
+    Quadro em uma ida ao banco para os cards: os `limit` primeiros de cada coluna
+    (row_number() por stage) e o total da coluna (count(*) over), mais a lista de funis.
+    """
+    fq = (
+        select(CRMFunil.id, CRMFunil.nome)
+        .where(CRMFunil.tenant_id == user.tenant_id)
+        .order_by(CRMFunil.ordem.nulls_last(), CRMFunil.id)
+    )
+    lq = select(
+        *_CARD_COLS,
+        func.row_number().over(
+            partition_by=CRMLead.stage_id, order_by=(CRMLead.order_key, CRMLead.id)
+        ).label("rn"),
+        func.count().over(partition_by=CRMLead.stage_id).label("total"),
+    ).where(CRMLead.tenant_id == user.tenant_id)
+    if not is_staff(user):
+        fq = fq.where(CRMFunil.owner_user_id == user.id)
+        lq = lq.where(CRMLead.owner_user_id == user.id)
+    ranked = lq.subquery()
+
+    funis = (await db.execute(fq)).all()
+    rows = (await db.execute(
+        select(ranked).where(ranked.c.rn <= limit).order_by(ranked.c.stage_id, ranked.c.rn)
+    )).all()
+
+    cards: dict[str, list[LeadCard]] = {}
+    totals: dict[str, int] = {}
+    for r in rows:
+        cards.setdefault(r.stage_id, []).append(_card(r, r.rn - 1))
+        totals[r.stage_id] = r.total
+
+    columns = []
+    for f in funis:
+        col = cards.get(f.id, [])
+        total = totals.get(f.id, 0)
+        columns.append(BoardColumn(
+            stage_id=f.id,
+            nome=f.nome,
+            total=total,
+            cards=col,
+            next_cursor=_page_cursor(col[-1]) if total > len(col) else None,
+        ))
+    return BoardOut(columns=columns)
+
+@router.get("/board/{stage_id}", response_model=LeadCardPage)
+async def get_board_column(
+    stage_id: str,
+    cursor: str | None = Query(None, description="next_cursor da página anterior"),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """"Carregar mais" de uma coluna: keyset em (order_key, id) a partir do cursor."""
+    await _ensure_funil_belongs(db, user.tenant_id, user.id, stage_id, can_see_all=is_staff(user))
+
+    q = select(*_CARD_COLS).where(CRMLead.tenant_id == user.tenant_id, CRMLead.stage_id == stage_id)
+    if not is_staff(user):
+        q = q.where(CRMLead.owner_user_id == user.id)
+
+    start = 0
+    if cursor:
+        try:
+            last_key, last_id, start = decode_cursor(cursor, 3, types=(str, int, int))
+            if start < 0:
+                raise ValueError("cursor inválido")
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+        q = q.where(or_(
+            CRMLead.order_key > last_key,
+            and_(CRMLead.order_key == last_key, CRMLead.id > last_id),
+        ))
+
+    rows = (await db.execute(q.order_by(CRMLead.order_key, CRMLead.id).limit(limit + 1))).all()
+    cards = [_card(r, start + i) for i, r in enumerate(rows[:limit])]
+    return LeadCardPage(
+        cards=cards,
+        next_cursor=_page_cursor(cards[-1]) if len(rows) > limit else None,
+    )
+
+# -------- SYNC --------
+@router.get("/changes", response_model=LeadChangesOut)
+async def lead_changes(
+    since: str | None = Query(None, description="cursor devolvido pela chamada anterior"),
+    limit: int = Query(500, ge=1, le=2000),
+    db: AsyncSession = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """
+    Leads criados/alterados e ids apagados desde o cursor. Sem `since` devolve só o
+    cursor (reset=True): pegue o cursor, carregue o quadro e faça polling com ele.
+    """
+    scope = [CRMLead.tenant_id == user.tenant_id]
+    tomb_scope = [Tombstone.tenant_id == user.tenant_id]
+    if not is_staff(user):
+        scope.append(CRMLead.owner_user_id == user.id)
+        tomb_scope.append(Tombstone.owner_id == user.id)
+    try:
+        ch = await sync.changes_since(
+            db, model=CRMLead, scope=scope, entity="crm_lead",
+            tombstone_scope=tomb_scope, since=since, limit=limit,
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    return LeadChangesOut(
+        cursor=ch.cursor, reset=ch.reset, has_more=ch.has_more,
+        upserts=[LeadOut.model_validate(l) for l in ch.upserts], deleted=ch.deleted,
+    )
+
 # -------- LEADS --------
-@router.get("/leads", response_model=List[LeadOut])
+@router.get("/leads", response_model=List[LeadOut], dependencies=[Depends(etag.conditional("crm_leads", lambda u: u.tenant_id))])
 async def list_leads(
+    response: Response,
     db: AsyncSession = Depends(get_db),
     user=Depends(get_current_user),
 ):
+    # colunas do LeadOut como tuplas + dono no fim (só para a posição na coluna)
+    ser = row_serializer(LeadOut, CRMLead)
     q = (
-        select(CRMLead)
+        select(*ser.columns, CRMLead.owner_user_id)
         .where(CRMLead.tenant_id == user.tenant_id)
-        .order_by(CRMLead.stage_id, CRMLead.order_index, CRMLead.id)
+        .order_by(CRMLead.stage_id, CRMLead.order_key, CRMLead.id)
     )
     if not is_staff(user):
         q = q.where(CRMLead.owner_user_id == user.id)
 
-    res = await db.execute(q)
-    return res.scalars().all()
+    rows = (await db.execute(q)).all()
+    leads = ser.dicts(rows)
+    pos: dict[tuple, int] = {}
+    for row, lead in zip(rows, leads):
+        col = (row.owner_user_id, lead["stage_id"])
+        lead["order_index"] = pos.get(col, 0)
+        pos[col] = lead["order_index"] + 1
+    return fast_json(leads, response)
 
 @router.post("/leads", response_model=LeadOut, status_code=status.HTTP_201_CREATED)
 async def create_lead(
@@ -144,21 +318,17 @@ async def create_lead(
     # só permite criar no funil do próprio usuário (ou staff)
     await _ensure_funil_belongs(db, user.tenant_id, user.id, payload.stage_id, can_see_all=is_staff(user))
 
-    # último índice na coluna do próprio dono
-    q = await db.execute(
-        select(func.max(CRMLead.order_index)).where(
-            CRMLead.tenant_id == user.tenant_id,
-            CRMLead.owner_user_id == user.id,
-            CRMLead.stage_id == payload.stage_id,
-        )
-    )
-    idx = (q.scalar() or -1) + 1
+    # entra no fim da coluna do próprio dono
+    scope = _column_scope(user.tenant_id, user.id, payload.stage_id)
+    last = await ordering.last_key(db, CRMLead.order_key, scope)
+    idx = (await db.execute(select(func.count()).select_from(CRMLead).where(*scope))).scalar_one()
 
     lead = CRMLead(
         tenant_id=user.tenant_id,
         owner_user_id=user.id,
         stage_id=payload.stage_id,
         order_index=idx,
+        order_key=ordering.key_between(last, None),
         titulo=payload.titulo.strip(),
         cpf=payload.cpf,
         telefone=payload.telefone,
@@ -172,13 +342,69 @@ async def create_lead(
     db.add(lead)
     await db.flush()
     await db.commit()
+    _publish_lead(lead, "upsert")
     await db.refresh(lead)
     return lead
 
+_IMPORT_ITEMS = TypeAdapter(list[LeadImportItem])
+
+@router.post("/leads/import", response_model=LeadImportResult)
+async def import_leads(
+    request: Request,
+    stage_id: str = Query(..., description="Funil de destino dos leads"),
+    db: AsyncSession = Depends(get_db),
+    user=Depends(get_current_user),
+):
+    """
+    Importa leads em lote no fim da coluna `stage_id`.
+    Aceita CSV (multipart com campo `file`, ou corpo text/csv) ou JSON (lista de leads
+    ou {"leads": [...]}). Duplicados por CPF/email/telefone são ignorados.
+    """
+    await _ensure_funil_belongs(db, user.tenant_id, user.id, stage_id, can_see_all=is_staff(user))
+
+    ctype = request.headers.get("content-type", "").lower()
+    if ctype.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Envie o CSV no campo 'file'")
+        items, first_line = lead_import.parse_csv(await upload.read()), 2
+    elif "csv" in ctype or ctype.startswith("text/plain"):
+        items, first_line = lead_import.parse_csv(await request.body()), 2
+    else:
+        try:
+            body = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="JSON inválido")
+        if isinstance(body, dict):
+            body = body.get("leads")
+        try:
+            parsed = _IMPORT_ITEMS.validate_python(body)
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+        items, first_line = [i.model_dump() for i in parsed], 1
+
+    if len(items) > lead_import.MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"Máximo de {lead_import.MAX_ROWS} leads por importação")
+
+    result = await lead_import.import_leads(
+        db,
+        tenant_id=user.tenant_id,
+        owner_id=user.id,
+        stage_id=stage_id,
+        items=items,
+        first_line=first_line,
+    )
+    if result.importados:
+        # um evento só para o lote: o cliente recarrega a coluna
+        events.publish(user.tenant_id, "crm.lead.import", stage_id=stage_id, count=result.importados, owner_id=user.id)
+    return result
+
 @router.patch("/leads/{lead_id}")
 async def update_lead(
     lead_id: int,
     payload: LeadUpdate,
+    background: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     user=Depends(get_current_user),
 ):
@@ -199,82 +425,31 @@ async def update_lead(
     move_stage = payload.stage_id
     target_index = payload.order_index
 
-    # helper: reindex da coluna (por dono)
-    async def reindex(stage: str, owner_id: str):
-        r = await db.execute(
-            select(CRMLead)
-            .where(
-                CRMLead.tenant_id == user.tenant_id,
-                CRMLead.owner_user_id == owner_id,
-                CRMLead.stage_id == stage,
-            )
-            .order_by(CRMLead.order_index, CRMLead.id)
-        )
-        arr = list(r.scalars().all())
-        for i, l in enumerate(arr):
-            l.order_index = i
-
     # se mover de coluna, garantir que a coluna destino pertence ao mesmo dono (ou staff)
     if move_stage is not None:
         await _ensure_funil_belongs(db, user.tenant_id, user.id, move_stage, can_see_all=is_staff(user))
 
     owner_for_ops = lead.owner_user_id  # staff mantém o dono do lead
 
-    if move_stage is None and target_index is not None:
-        await reindex(lead.stage_id, owner_for_ops)
-        r = await db.execute(
-            select(CRMLead)
-            .where(
-                CRMLead.tenant_id == user.tenant_id,
-                CRMLead.owner_user_id == owner_for_ops,
-                CRMLead.stage_id == lead.stage_id,
-            )
-            .order_by(CRMLead.order_index, CRMLead.id)
-        )
-        lst = [l for l in r.scalars().all() if l.id != lead.id]
-        insert_at = max(0, min(target_index, len(lst)))
-        lst.insert(insert_at, lead)
-        for i, l in enumerate(lst):
-            l.order_index = i
-
-    if move_stage is not None:
-        old_stage = lead.stage_id
-        await reindex(old_stage, owner_for_ops)
-
-        # source (remove)
-        rsrc = await db.execute(
-            select(CRMLead)
-            .where(
-                CRMLead.tenant_id == user.tenant_id,
-                CRMLead.owner_user_id == owner_for_ops,
-                CRMLead.stage_id == old_stage,
-            )
-            .order_by(CRMLead.order_index, CRMLead.id)
-        )
-        src = [l for l in rsrc.scalars().all() if l.id != lead.id]
-        for i, l in enumerate(src):
-            l.order_index = i
-
-        # destino (insere)
-        rdst = await db.execute(
-            select(CRMLead)
-            .where(
-                CRMLead.tenant_id == user.tenant_id,
-                CRMLead.owner_user_id == owner_for_ops,
-                CRMLead.stage_id == move_stage,
-            )
-            .order_by(CRMLead.order_index, CRMLead.id)
-        )
-        dst = list(rdst.scalars().all())
-        insert_at = target_index if (target_index is not None and 0 <= target_index <= len(dst)) else len(dst)
-
-        lead.stage_id = move_stage
-        dst.insert(insert_at, lead)
-        for i, l in enumerate(dst):
-            l.order_index = i
+    # move: só o lead movido é gravado (chave entre os vizinhos da posição alvo);
+    # mudar de coluna sem índice = fim da coluna destino
+    if move_stage is not None or target_index is not None:
+        stage = move_stage if move_stage is not None else lead.stage_id
+        scope = _column_scope(user.tenant_id, owner_for_ops, stage)
+        key = await ordering.move_key(db, CRMLead, scope, target_index, exclude_id=lead.id)
+
+        lead.stage_id = stage
+        lead.order_key = key
+        if target_index is not None:
+            lead.order_index = max(target_index, 0)
+        if ordering.needs_rebalance(key):
+            background.add_task(ordering.rebalance_column, CRMLead, {
+                "tenant_id": user.tenant_id, "owner_user_id": owner_for_ops, "stage_id": stage,
+            })
 
     await db.flush()
     await db.commit()
+    _publish_lead(lead, "upsert")
     return {"ok": True}
 
 @router.delete("/leads/{lead_id}", status_code=204)
@@ -291,26 +466,9 @@ async def delete_lead(
     if not lead:
         raise HTTPException(status_code=404, detail="Lead não encontrado")
 
-    stage = lead.stage_id
-    owner_for_ops = lead.owner_user_id
-
+    # gap-tolerant: as chaves dos demais leads continuam ordenadas, nada a renumerar
+    await sync.record_deletions(db, "crm_lead", [lead.id], tenant_id=lead.tenant_id, owner_id=lead.owner_user_id)
     await db.delete(lead)
-    await db.flush()
-
-    # reindex da coluna do mesmo dono
-    await db.execute(
-        text("""
-        WITH ordered AS (
-          SELECT id, ROW_NUMBER() OVER (ORDER BY order_index, id) - 1 AS rn
-          FROM crm_leads
-          WHERE tenant_id = :t AND owner_user_id = :u AND stage_id = :s
-        )
-        UPDATE crm_leads l
-        SET order_index = o.rn
-        FROM ordered o
-        WHERE l.id = o.id
-        """),
-        {"t": user.tenant_id, "u": owner_for_ops, "s": stage},
-    )
     await db.commit()
+    _publish_lead(lead, "delete")
     return None
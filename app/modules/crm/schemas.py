@@ -66,8 +66,77 @@ class LeadOut(LeadBase):
     id: int
     stage_id: str
     order_index: int
+    order_key: str | None = None
     created_at: datetime | None = None
     updated_at: datetime | None = None
 
     class Config:
         from_attributes = True
+
+
+# ===================== BOARD =====================
+class LeadCard(BaseModel):
+    """Projeção enxuta do lead para o quadro (sem `descricao`)."""
+    id: int
+    stage_id: str
+    order_index: int
+    order_key: str | None = None
+    titulo: str
+    cpf: str | None = None
+    telefone: str | None = None
+    email: str | None = None
+    estado: str | None = None
+    cidade: str | None = None
+    planoDesejado: str | None = None
+    concursoDesejado: str | None = None
+
+
+class LeadCardPage(BaseModel):
+    cards: list[LeadCard]
+    next_cursor: str | None = None  # None = fim da coluna
+
+
+class BoardColumn(LeadCardPage):
+    stage_id: str
+    nome: str
+    total: int
+
+
+class BoardOut(BaseModel):
+    columns: list[BoardColumn]
+
+
+# ===================== IMPORTAÇÃO =====================
+class LeadImportItem(BaseModel):
+    # titulo obrigatório é validado linha a linha (linha inválida não derruba o lote)
+    titulo: str | None = None
+    cpf: str | None = None
+    telefone: str | None = None
+    email: str | None = None
+    estado: str | None = None
+    cidade: str | None = None
+    planoDesejado: str | None = None
+    concursoDesejado: str | None = None
+    descricao: str | None = None
+
+
+class LeadImportError(BaseModel):
+    linha: int
+    motivo: str
+
+
+class LeadImportResult(BaseModel):
+    recebidos: int
+    importados: int
+    duplicados: int
+    invalidos: int
+    erros: list[LeadImportError] = []
+
+
+# ===================== SYNC =====================
+class LeadChangesOut(BaseModel):
+    cursor: str                 # passe como ?since= no próximo poll
+    reset: bool = False         # True: recarregue o quadro inteiro e use o cursor
+    has_more: bool = False      # True: chame de novo já com o cursor (mais páginas)
+    upserts: list[LeadOut] = []
+    deleted: list[int] = []
@@ -0,0 +1,74 @@
+# app/modules/events/router.py
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, Optional
+
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.core.dependencies import user_from_token
+from app.db.session import AsyncSessionLocal
+from app.services import events
+
+router = APIRouter()
+
+
+def _sse(event: str, data: Any, id_: Optional[int] = None) -> str:
+    head = f"id: {id_}\n" if id_ is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, separators=(',', ':'), default=str)}\n\n"
+
+
+def _visible(ev: dict, user_id: int, see_all: bool) -> bool:
+    """Mesma regra das listagens de cada módulo."""
+    owner = ev.get("owner_id")
+    if ev["type"].startswith("crm."):
+        # CRM: staff/admin veem o tenant inteiro; os demais, só o que é seu
+        return see_all or owner in (None, user_id)
+    # atividades, financeiro e o resto são sempre do próprio usuário, qualquer que seja o papel
+    return owner == user_id
+
+
+@router.get("/stream")
+async def stream(
+    request: Request,
+    token: Optional[str] = Query(None, description="JWT (EventSource não envia Authorization)"),
+):
+    """
+    Server-Sent Events do tenant: `crm.lead`, `crm.funil`, `atividades.activity`,
+    `atividades.stage`, `financeiro.pagamento`... (`data` = JSON compacto do evento).
+    `resync` = eventos foram descartados; recarregue via GET .../changes.
+    """
+    if not token:
+        auth = request.headers.get("authorization", "")
+        token = auth[7:] if auth.lower().startswith("bearer ") else None
+    # sessão só para autenticar: a conexão SSE não segura conexão do pool
+    async with AsyncSessionLocal() as db:
+        user = await user_from_token(db, token)
+    tenant_id, user_id = user.tenant_id, user.id
+    see_all = getattr(user, "role", None) in {"admin", "staff"}
+
+    async def gen():
+        with events.subscribe(tenant_id) as sub:
+            yield "retry: 5000\n\n"
+            yield _sse("ready", {"tenant_id": tenant_id})
+            while not await request.is_disconnected():
+                if sub.overflow:
+                    sub.overflow = False
+                    yield _sse("resync", {})
+                try:
+                    ev = await asyncio.wait_for(sub.queue.get(), timeout=settings.EVENTS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if not _visible(ev, user_id, see_all):
+                    continue
+                yield _sse(ev["type"], ev, ev.get("seq"))
+
+    return StreamingResponse(
+        gen(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
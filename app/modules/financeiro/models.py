@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime, date
 from decimal import Decimal
+from typing import Optional
 
 from sqlalchemy import (
     Integer,
@@ -14,9 +15,12 @@ from sqlalchemy import (
     CheckConstraint,
     Index,
     func,
+    text,
 )
+from sqlalchemy.engine import Connection
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
+from app.db import ddl
 from app.db.base import Base
 from app.modules.students.models import Student as StudentModel
 
@@ -43,6 +47,24 @@ class Pagamento(Base):
         Index("ix_pagto_mentor_student", "mentor_id", "student_id"),
         Index("ix_pagto_external_reference", "external_reference"),
         Index("ix_pagto_asaas_payment_id", "asaas_payment_id"),
+        # GET /agenda: vencimentos do mentor num intervalo
+        Index("ix_pagto_mentor_due", "mentor_id", "due_date"),
+        # índices parciais da inadimplência: o sweeper varre só as pendentes vencidas
+        # e a listagem de inadimplentes lê só as atrasadas do mentor
+        Index(
+            "ix_pagto_pendente_due",
+            "status_pagamento",
+            "due_date",
+            postgresql_where=text("status_pagamento = 'pendente'"),
+            sqlite_where=text("status_pagamento = 'pendente'"),
+        ),
+        Index(
+            "ix_pagto_atrasado_mentor_due",
+            "mentor_id",
+            "due_date",
+            postgresql_where=text("status_pagamento = 'atrasado'"),
+            sqlite_where=text("status_pagamento = 'atrasado'"),
+        ),
     )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
@@ -83,6 +105,10 @@ class Pagamento(Base):
     # id da cobrança no Asaas
     asaas_payment_id: Mapped[str | None] = mapped_column(String(64), nullable=True)
 
+    # reserva do lote de cobranças: preenchido (commit próprio) antes da chamada ao Asaas,
+    # para que outro lote/retentativa não emita a mesma cobrança
+    asaas_claimed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=False), nullable=True)
+
     # metadados de quitação
     # >>> ATENÇÃO: agora é Date (não DateTime) para casar com clientPaymentDate/paymentDate
     paid_at: Mapped[date | None] = mapped_column(Date, nullable=True)
@@ -104,3 +130,43 @@ class Pagamento(Base):
 
     # relacionamento (navegação a partir do aluno)
     student = relationship("Student", backref="pagamentos", lazy="joined")
+
+
+# índices parciais da inadimplência para bancos criados antes deles (create_all só roda
+# em dev e não acrescenta índices a tabelas existentes)
+@ddl.register("pagamentos_overdue_indexes", "postgresql")
+@ddl.register("pagamentos_overdue_indexes", "sqlite")
+def _overdue_indexes(conn: Connection) -> Optional[bool]:
+    if not ddl.has_table(conn, "pagamentos"):
+        return False
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_pagto_pendente_due ON pagamentos (status_pagamento, due_date) "
+        "WHERE status_pagamento = 'pendente'"
+    ))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_pagto_atrasado_mentor_due ON pagamentos (mentor_id, due_date) "
+        "WHERE status_pagamento = 'atrasado'"
+    ))
+    return True
+
+
+# índice de intervalo para bancos criados antes dele existir no modelo
+@ddl.register("pagamentos_due_index", "postgresql")
+@ddl.register("pagamentos_due_index", "sqlite")
+def _due_index(conn: Connection) -> Optional[bool]:
+    if not ddl.has_table(conn, "pagamentos"):
+        return False
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_pagto_mentor_due ON pagamentos (mentor_id, due_date)"))
+    return True
+
+
+# coluna de reserva do lote Asaas em bancos criados antes dela
+@ddl.register("pagamentos_asaas_claim", "postgresql")
+@ddl.register("pagamentos_asaas_claim", "sqlite")
+def _asaas_claim(conn: Connection) -> Optional[bool]:
+    if not ddl.has_table(conn, "pagamentos"):
+        return False
+    if not ddl.has_column(conn, "pagamentos", "asaas_claimed_at"):
+        col_type = "TIMESTAMP" if conn.dialect.name == "postgresql" else "DATETIME"
+        conn.execute(text(f"ALTER TABLE pagamentos ADD COLUMN asaas_claimed_at {col_type}"))
+    return True
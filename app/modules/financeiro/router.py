@@ -1,26 +1,40 @@
 # app/modules/financeiro/router.py
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Path, Body, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Path, Body, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func
+from sqlalchemy import select, delete, and_, or_, func, tuple_
 from datetime import date, datetime
 import calendar as _cal
 from pydantic import BaseModel, Field
 
+from app.core import cache
 from app.core.dependencies import get_db, get_current_user
+from app.core.responses import Shape, negotiated, row_serializer
 from app.modules.users.models import User
 from app.modules.products.models import Product
 from app.modules.students.models import Student
+from app.db.dialect import upsert_insert
+from app.services import events
 from .models import Pagamento
 from .schemas import (
     PagamentoOut, PagamentoUpdate, PagamentoListOut,
-    SyncCompetenciasIn, SyncCompetenciasOut
+    SyncCompetenciasIn, SyncCompetenciasOut,
+    InadimplenteOut, InadimplentesListOut,
+    PagamentoBulkIn, PagamentoBulkOut, PagamentoBulkItemOut,
 )
 
 router = APIRouter(tags=["Financeiro - Pagamentos"])
+# rotas montadas direto em "/financeiro" (ex.: /financeiro/inadimplentes)
+root_router = APIRouter(tags=["Financeiro - Inadimplência"])
 
 # ---------- helpers ----------
+def _publish_pagamento(me: User, aluno_id: int, ym: str, op: str, status_: str | None = None) -> None:
+    events.publish(
+        me.tenant_id, "financeiro.pagamento", op=op, aluno_id=aluno_id,
+        competencia=ym, status=status_, owner_id=me.id,
+    )
+
 def _ym_to_year_month(ym: str) -> tuple[int, int]:
     y, m = ym.split("-")
     yi = int(y); mi = int(m)
@@ -92,6 +106,7 @@ def _due_for(competencia: str, st) -> date | None:
 # ---------- rotas ----------
 @router.get("", response_model=PagamentoListOut)
 async def list_pagamentos(
+    request: Request,
     student_id: int | None = Query(None),
     competencia: str | None = Query(None, description="YYYY-MM"),
     status_pagamento: str | None = Query(None),
@@ -103,12 +118,16 @@ async def list_pagamentos(
     end: str | None = Query(None, alias="end"),
     aluno_id: int | None = Query(None, alias="aluno_id"),
 
+    shape: Shape = Query("rows", description='"columnar": items como {campo: [valores]}'),
+
     db: AsyncSession = Depends(get_db),
     me: User = Depends(get_current_user),
 ):
     _student_id = aluno_id if aluno_id is not None else student_id
 
-    stmt = select(Pagamento).where(Pagamento.mentor_id == me.id)
+    # colunas do PagamentoOut como tuplas (sem o JOIN do relacionamento nem validação por linha)
+    ser = row_serializer(PagamentoOut, Pagamento)
+    stmt = select(*ser.columns).where(Pagamento.mentor_id == me.id)
 
     if _student_id:
         stmt = stmt.where(Pagamento.student_id == _student_id)
@@ -129,11 +148,9 @@ async def list_pagamentos(
 
     total = await db.scalar(select(func.count()).select_from(stmt.subquery()))
     stmt = stmt.order_by(Pagamento.competencia.asc()).limit(limit).offset(offset)
-    res = await db.execute(stmt)
-    items_orm = res.scalars().all()
-
-    items = [PagamentoOut.model_validate(obj) for obj in items_orm]
-    return PagamentoListOut(items=items, total=int(total or 0))
+    rows = (await db.execute(stmt)).all()
+    items = ser.columnar(rows) if shape == "columnar" else ser.dicts(rows)
+    return negotiated(request, {"items": items, "total": int(total or 0)})
 
 
 @router.post("/sync/{student_id}", response_model=SyncCompetenciasOut)
@@ -197,6 +214,7 @@ async def sync_competencias_for_student(
         created += 1
 
     await db.commit()
+    await cache.invalidate(me.id, "pagamentos")
     return SyncCompetenciasOut(created=created, skipped=skipped)
 
 # ---------- marcar como pago ----------
@@ -247,6 +265,8 @@ async def mark_paid_upsert(
         existing.source = existing.source or "manual"
         db.add(existing)
         await db.commit()
+        await cache.invalidate(me.id, "pagamentos")
+        _publish_pagamento(me, body.aluno_id, ym, "upsert", "pago")
         await db.refresh(existing)
         return PagamentoOut.model_validate(existing)
 
@@ -265,9 +285,131 @@ async def mark_paid_upsert(
     )
     db.add(novo)
     await db.commit()
+    await cache.invalidate(me.id, "pagamentos")
+    _publish_pagamento(me, body.aluno_id, ym, "upsert", "pago")
     await db.refresh(novo)
     return PagamentoOut.model_validate(novo)
 
+# ---------- baixa em lote ----------
+_BULK_CHUNK = 500
+
+@router.post("/bulk", response_model=PagamentoBulkOut)
+@router.post("/pagamentos/bulk", response_model=PagamentoBulkOut)  # alias caso o prefixo seja apenas "/financeiro"
+async def bulk_mark_paid(
+    body: PagamentoBulkIn,
+    db: AsyncSession = Depends(get_db),
+    me: User = Depends(get_current_user),
+):
+    """
+    Aplica várias operações "pagar" (upsert como em POST "") e "desfazer" (como o DELETE
+    by-aluno) numa única transação: 1 SELECT de alunos, 1 SELECT das competências
+    existentes, upserts em lote e 1 DELETE. Resultado individual por item (mesma ordem).
+    Operações repetidas para o mesmo (aluno, competência): vale a última.
+    """
+    results: list[PagamentoBulkItemOut] = []
+    valid: dict[tuple[int, str], int] = {}  # (aluno_id, ym) -> índice da operação vencedora
+
+    for i, op in enumerate(body.operacoes):
+        item = PagamentoBulkItemOut(index=i, acao=op.acao, aluno_id=op.aluno_id, competencia=op.competencia, ok=False)
+        results.append(item)
+        try:
+            ym = _normalize_competencia(op.competencia)
+        except ValueError as e:
+            item.erro = str(e) or "competencia inválida (use YYYY-MM)"
+            continue
+        item.competencia = ym
+        if op.acao == "pagar" and (op.valor is None or op.data_pagamento is None):
+            item.erro = "valor e data_pagamento são obrigatórios para 'pagar'"
+            continue
+        key = (op.aluno_id, ym)
+        if key in valid:
+            results[valid[key]].erro = f"Substituída pela operação {i}"
+        valid[key] = i
+
+    if valid:
+        aluno_ids = {k[0] for k in valid}
+        yms = {k[1] for k in valid}
+
+        rs = await db.execute(
+            select(Student.id, Student.dia_vencimento).where(
+                Student.mentor_id == me.id, Student.id.in_(aluno_ids)
+            )
+        )
+        students = {row.id: row for row in rs.all()}
+
+        re_ = await db.execute(
+            select(Pagamento.student_id, Pagamento.competencia).where(
+                Pagamento.mentor_id == me.id,
+                Pagamento.student_id.in_(aluno_ids),
+                Pagamento.competencia.in_(yms),
+            )
+        )
+        existing = set(re_.all())
+
+        to_upsert: list[dict] = []
+        to_delete: list[tuple[int, str]] = []
+        for key, i in valid.items():
+            op, item = body.operacoes[i], results[i]
+            st = students.get(key[0])
+            if st is None:
+                item.erro = "Aluno não encontrado"
+                continue
+            if op.acao == "desfazer":
+                if key not in existing:
+                    item.erro = "Pagamento não encontrado"
+                    continue
+                to_delete.append(key)
+                item.ok = True
+            else:
+                to_upsert.append(dict(
+                    mentor_id=me.id,
+                    student_id=key[0],
+                    competencia=key[1],
+                    due_date=_due_for(key[1], st),
+                    valor=op.valor,
+                    status_pagamento="pago",
+                    source="manual",
+                    external_reference=op.referencia,
+                    paid_at=op.data_pagamento,
+                    method=op.meio,
+                ))
+                item.ok = True
+                item.status_pagamento = "pago"
+
+        for n in range(0, len(to_upsert), _BULK_CHUNK):
+            stmt = upsert_insert(db, Pagamento).values(to_upsert[n:n + _BULK_CHUNK])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Pagamento.mentor_id, Pagamento.student_id, Pagamento.competencia],
+                set_={
+                    "valor": stmt.excluded.valor,
+                    "status_pagamento": "pago",
+                    "paid_at": stmt.excluded.paid_at,
+                    "method": stmt.excluded.method,
+                    "external_reference": func.coalesce(stmt.excluded.external_reference, Pagamento.external_reference),
+                    "source": func.coalesce(Pagamento.source, "manual"),
+                    "updated_at": func.now(),
+                },
+            )
+            await db.execute(stmt)
+
+        for n in range(0, len(to_delete), _BULK_CHUNK):
+            await db.execute(
+                delete(Pagamento).where(
+                    Pagamento.mentor_id == me.id,
+                    tuple_(Pagamento.student_id, Pagamento.competencia).in_(to_delete[n:n + _BULK_CHUNK]),
+                )
+            )
+
+        await db.commit()
+        await cache.invalidate(me.id, "pagamentos")
+        events.publish(
+            me.tenant_id, "financeiro.pagamentos", op="bulk",
+            pagos=len(to_upsert), desfeitos=len(to_delete), owner_id=me.id,
+        )
+
+    ok = sum(1 for r in results if r.ok)
+    return PagamentoBulkOut(ok=ok, falhas=len(results) - ok, resultados=results)
+
 # ---------- desfazer (DELETE by aluno/competencia) ----------
 @router.delete("/by-aluno/{aluno_id}/{competencia}")
 @router.delete("/pagamentos/by-aluno/{aluno_id}/{competencia}")  # alias caso o prefixo seja apenas "/financeiro"
@@ -292,4 +434,59 @@ async def delete_pagamento_by_aluno_competencia(
 
     await db.delete(row)
     await db.commit()
+    await cache.invalidate(me.id, "pagamentos")
+    _publish_pagamento(me, aluno_id, ym, "delete")
     return {"ok": True}
+
+# ---------- inadimplência ----------
+@root_router.get("/inadimplentes", response_model=InadimplentesListOut)
+async def list_inadimplentes(
+    limit: int = Query(100, le=1000),
+    offset: int = 0,
+    db: AsyncSession = Depends(get_db),
+    me: User = Depends(get_current_user),
+):
+    """
+    Competências vencidas e não pagas do mentor, da mais antiga para a mais recente.
+    Lê as "atrasado" (índice parcial ix_pagto_atrasado_mentor_due) e também as "pendente"
+    já vencidas que o sweeper ainda não marcou (ix_pagto_pendente_due).
+    """
+    today = date.today()
+    overdue = and_(
+        Pagamento.mentor_id == me.id,
+        Pagamento.due_date.is_not(None),
+        or_(
+            Pagamento.status_pagamento == "atrasado",
+            and_(Pagamento.status_pagamento == "pendente", Pagamento.due_date < today),
+        ),
+    )
+
+    total, valor_total = (await db.execute(
+        select(func.count(Pagamento.id), func.coalesce(func.sum(Pagamento.valor), 0)).where(overdue)
+    )).one()
+
+    res = await db.execute(
+        select(
+            Pagamento.id, Pagamento.student_id, Student.nome, Pagamento.competencia,
+            Pagamento.due_date, Pagamento.valor, Pagamento.status_pagamento,
+        )
+        .join(Student, Student.id == Pagamento.student_id)
+        .where(overdue)
+        .order_by(Pagamento.due_date.asc(), Pagamento.id.asc())
+        .limit(limit)
+        .offset(offset)
+    )
+    items = [
+        InadimplenteOut(
+            pagamento_id=pid,
+            aluno_id=sid,
+            aluno_nome=nome,
+            competencia=comp,
+            due_date=due,
+            valor=float(valor) if valor is not None else None,
+            status_pagamento=st,
+            dias_atraso=(today - due).days,
+        )
+        for pid, sid, nome, comp, due, valor, st in res.all()
+    ]
+    return InadimplentesListOut(items=items, total=int(total or 0), valor_total=float(valor_total or 0))
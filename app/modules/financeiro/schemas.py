@@ -1,6 +1,6 @@
 # app/modules/financeiro/schemas.py
 from __future__ import annotations
-from typing import Optional, List
+from typing import Optional, List, Literal
 from datetime import date, datetime  # date é o que será usado
 from decimal import Decimal
 from pydantic import BaseModel, Field, ConfigDict, field_serializer
@@ -75,3 +75,46 @@ class SyncCompetenciasIn(BaseModel):
 class SyncCompetenciasOut(BaseModel):
     created: int
     skipped: int
+
+class InadimplenteOut(BaseModel):
+    pagamento_id: int
+    aluno_id: int
+    aluno_nome: Optional[str] = None
+    competencia: str
+    due_date: date
+    valor: Optional[float] = None
+    status_pagamento: str
+    dias_atraso: int
+
+class InadimplentesListOut(BaseModel):
+    items: List[InadimplenteOut]
+    total: int
+    valor_total: float
+
+# ---------- baixa em lote (marcar pago / desfazer) ----------
+class PagamentoBulkOp(BaseModel):
+    acao: Literal["pagar", "desfazer"] = "pagar"
+    aluno_id: int = Field(..., gt=0)
+    competencia: str  # "YYYY-MM" ou "YYYY-MM-01"
+    # obrigatórios quando acao == "pagar"
+    valor: Optional[float] = Field(None, gt=0)
+    data_pagamento: Optional[date] = None
+    meio: Optional[str] = None
+    referencia: Optional[str] = None
+
+class PagamentoBulkIn(BaseModel):
+    operacoes: List[PagamentoBulkOp] = Field(..., min_length=1, max_length=5000)
+
+class PagamentoBulkItemOut(BaseModel):
+    index: int
+    acao: str
+    aluno_id: int
+    competencia: str
+    ok: bool
+    status_pagamento: Optional[str] = None  # "pago" | None (removido)
+    erro: Optional[str] = None
+
+class PagamentoBulkOut(BaseModel):
+    ok: int
+    falhas: int
+    resultados: List[PagamentoBulkItemOut]
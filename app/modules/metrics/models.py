@@ -0,0 +1,51 @@
+# app/modules/metrics/models.py
+from __future__ import annotations
+
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import Integer, Date, DateTime, Numeric, UniqueConstraint, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class MrrCounter(Base):
+    """
+    Contador materializado de MRR/assinantes por mentor.
+    Mantido incrementalmente nas escritas de alunos/produtos (ver services/metrics_engine.py).
+    """
+    __tablename__ = "metrics_mrr_counters"
+
+    mentor_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    mrr: Mapped[Decimal] = mapped_column(Numeric(14, 2), nullable=False, default=0)
+    assinantes: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+        nullable=False,
+    )
+
+
+class MrrSnapshot(Base):
+    """Série temporal diária (1 linha por mentor/dia) gerada a partir de MrrCounter."""
+    __tablename__ = "metrics_mrr_snapshots"
+
+    __table_args__ = (
+        # também serve de índice para o histórico (mentor_id, dia)
+        UniqueConstraint("mentor_id", "dia", name="uq_mrr_snapshot_mentor_dia"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    mentor_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    dia: Mapped[date] = mapped_column(Date, nullable=False)
+    mrr: Mapped[Decimal] = mapped_column(Numeric(14, 2), nullable=False, default=0)
+    assinantes: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+    )
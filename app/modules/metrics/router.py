@@ -1,12 +1,13 @@
 # app/api/v1/routes/metrics.py
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select
 from datetime import date
-from decimal import Decimal
+from app.core import cache
+from app.core.config import settings
 from app.core.dependencies import get_db, get_current_user
-from app.modules.students.models import Student
-from app.modules.products.models import Product
+from app.modules.metrics.models import MrrSnapshot
+from app.services import metrics_engine, cohorts
 
 router = APIRouter()
 
@@ -19,36 +20,51 @@ async def get_mrr(
     MRR estimado = soma dos valores dos produtos recorrentes (mensal/recorrente)
     para alunos ATIVOS do mentor atual. 
     Não inclui planos trimestrais/semestrais/anuais pagos à vista.
+
+    Lido do contador incremental (metrics_mrr_counters), mantido nas escritas de alunos/produtos.
     """
-    # Durações consideradas "recorrentes":
-    DURACOES_RECORRENTES = ["recorrente", "mensal"]
+    async def load(db: AsyncSession) -> dict:
+        mrr, assinantes = await metrics_engine.current_mrr(db, current_user.id)
+        return {"mrr": mrr, "assinantes": assinantes}
 
-    # Join por nome do plano (Student.plano == Product.nome) e pelo mentor_id
-    stmt = (
-        select(
-            func.coalesce(func.sum(Product.valor), 0),
-            func.count()
-        )
-        .select_from(Student)
-        .join(
-            Product,
-            (Product.nome == Student.plano) & (Product.mentor_id == Student.mentor_id),
-            isouter=False,
-        )
-        .where(
-            Student.mentor_id == current_user.id,
-            Student.status == "Ativo",
-            Product.duracao.in_(DURACOES_RECORRENTES),
-            # Se quiser garantir que a assinatura ainda está válida:
-            # (Student.data_fim.is_(None)) | (Student.data_fim >= date.today())
-        )
+    return await cache.cached(
+        db, mentor_id=current_user.id, route="metrics.mrr", tags=["students", "products"],
+        ttl=settings.DASHBOARD_CACHE_TTL_SECONDS, stale=settings.DASHBOARD_CACHE_STALE_SECONDS, loader=load,
     )
 
-    res = await db.execute(stmt)
-    total_valor, qtd_assinantes = res.one_or_none() or (0, 0)
+@router.get("/mrr/history")
+async def get_mrr_history(
+    meses: int = Query(12, ge=1, le=60, description="Quantos meses para trás (inclui o mês atual)"),
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """
+    Série diária de MRR/assinantes (snapshots gravados pelo job diário), do 1º dia
+    de (mês atual - meses + 1) até hoje. Leitura única pelo índice (mentor_id, dia).
+    """
+    today = date.today()
+    idx = today.year * 12 + (today.month - 1) - (meses - 1)
+    start = date(idx // 12, idx % 12 + 1, 1)
 
-    # Garantir tipos serializáveis
-    if isinstance(total_valor, Decimal):
-        total_valor = float(total_valor)
+    res = await db.execute(
+        select(MrrSnapshot.dia, MrrSnapshot.mrr, MrrSnapshot.assinantes)
+        .where(MrrSnapshot.mentor_id == current_user.id, MrrSnapshot.dia >= start)
+        .order_by(MrrSnapshot.dia.asc())
+    )
+    items = [
+        {"dia": dia.isoformat(), "mrr": float(mrr or 0), "assinantes": int(qtd or 0)}
+        for dia, mrr, qtd in res.all()
+    ]
+    return {"inicio": start.isoformat(), "items": items}
 
-    return {"mrr": float(total_valor or 0), "assinantes": int(qtd_assinantes or 0)}
\ No newline at end of file
+@router.get("/cohorts")
+async def get_cohorts(
+    meses: int = Query(24, ge=1, le=60, description="Horizonte máximo (meses de vida) da matriz"),
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """
+    Retenção, churn e LTV por coorte de compra (mês de data_compra).
+    Matriz coorte × mês de vida; fica em cache até a próxima escrita de pagamento/aluno.
+    """
+    return await cohorts.get_cohorts(db, current_user.id, max_meses=meses)
@@ -2,15 +2,19 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, update, delete
+from app.core import cache, etag
+from app.core.config import settings
 from app.core.dependencies import get_db, get_current_user
 from app.modules.users.models import User
+from app.services import metrics_engine
 from .models import Product
 from .schemas import ProductOut, ProductCreate, ProductUpdate
 
 router = APIRouter()  # será incluído com prefix "/products"
+etag.track(Product, "products", "mentor_id")
 
 # LIST
-@router.get("", response_model=list[ProductOut])
+@router.get("", response_model=list[ProductOut], dependencies=[Depends(etag.conditional("products"))])
 async def list_products(
     db: AsyncSession = Depends(get_db),
     me: User = Depends(get_current_user),
@@ -24,8 +28,14 @@ async def list_products(
         .limit(limit)
         .offset(offset)
     )
-    res = await db.execute(stmt)
-    return res.scalars().all()
+
+    async def load(db: AsyncSession) -> list[ProductOut]:
+        return [ProductOut.model_validate(p) for p in (await db.execute(stmt)).scalars()]
+
+    return await cache.cached(
+        db, mentor_id=me.id, route="products.list", params=[limit, offset],
+        tags=["products"], ttl=settings.DASHBOARD_CACHE_TTL_SECONDS, loader=load,
+    )
 
 # CREATE
 @router.post("", response_model=ProductOut, status_code=status.HTTP_201_CREATED)
@@ -37,7 +47,10 @@ async def create_product(
     # troque model_dict() -> model_dump()
     obj = Product(**payload.model_dump(), mentor_id=me.id)
     db.add(obj)
+    await db.flush()
+    await metrics_engine.recompute_mrr(db, me.id)
     await db.commit()
+    await cache.invalidate(me.id, "products")
     await db.refresh(obj)
     return obj
 
@@ -58,7 +71,10 @@ async def update_product(
     for k, v in payload.model_dump(exclude_unset=True).items():
         setattr(obj, k, v)
 
+    await db.flush()
+    await metrics_engine.recompute_mrr(db, me.id)
     await db.commit()
+    await cache.invalidate(me.id, "products")
     await db.refresh(obj)
     return obj
 
@@ -76,6 +92,7 @@ async def toggle_product(
 
     obj.ativo = not obj.ativo
     await db.commit()
+    await cache.invalidate(me.id, "products")
     await db.refresh(obj)
     return obj
 
@@ -90,5 +107,8 @@ async def delete_product(
     if not res.scalar_one_or_none():
         raise HTTPException(status_code=404, detail="Produto não encontrado")
     await db.execute(delete(Product).where(Product.id == product_id))
+    await etag.bump(db, "products", me.id)
+    await metrics_engine.recompute_mrr(db, me.id)
     await db.commit()
+    await cache.invalidate(me.id, "products")
     return
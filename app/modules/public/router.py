@@ -5,6 +5,7 @@ from app.core.dependencies import get_db
 from app.core.security import hash_password
 from app.modules.users.models import User
 from app.modules.tenants.models import Tenant
+from app.modules.atividades.crud import seed_default_stages
 from .schemas import PublicRegisterIn, PublicRegisterOut
 
 router = APIRouter(prefix="/public", tags=["Public"])
@@ -35,6 +36,8 @@ async def public_register(body: PublicRegisterIn, db: AsyncSession = Depends(get
         is_active=False,      # fica pendente até o admin aprovar
     )
     db.add(u)
+    await db.flush()
+    await seed_default_stages(db, u.id)
     await db.commit()
     await db.refresh(u)
 
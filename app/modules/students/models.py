@@ -1,6 +1,8 @@
 from sqlalchemy.orm import Mapped, mapped_column
-from sqlalchemy import String, Integer, Date, ForeignKey, Boolean
+from sqlalchemy import String, Integer, Date, ForeignKey, Boolean, Text, event
 from app.db.base import Base, TimestampMixin
+from app.utils.br import only_digits
+from app.utils.text import strip_accents_lower
 
 class Student(Base, TimestampMixin):
     __tablename__ = "alunos"
@@ -27,3 +29,22 @@ class Student(Base, TimestampMixin):
 
     # ✅ NOVO CAMPO
     metodo_pagamento: Mapped[str | None] = mapped_column(String(30), nullable=True)
+
+    # nome/email sem acento + cpf/telefone só dígitos (busca por trigram em /students/search)
+    search_text: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+
+def build_search_text(nome: str | None, email: str | None, cpf: str | None, telefone: str | None) -> str:
+    parts = (
+        strip_accents_lower(nome).strip(),
+        (email or "").strip().lower(),
+        only_digits(cpf),
+        only_digits(telefone),
+    )
+    return " ".join(p for p in parts if p)
+
+
+@event.listens_for(Student, "before_insert")
+@event.listens_for(Student, "before_update")
+def _fill_search_text(mapper, connection, target: Student) -> None:
+    target.search_text = build_search_text(target.nome, target.email, target.cpf, target.telefone)
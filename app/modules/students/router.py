@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Body, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Body, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, date
 from sqlalchemy import select, delete, and_, func
 from typing import Optional, Any, Dict, List
+import asyncio
 import httpx
 import re
 import unicodedata
@@ -10,18 +11,26 @@ import calendar
 from app.modules.financeiro.models import Pagamento
 from app.modules.financeiro.schemas import SyncCompetenciasIn, SyncCompetenciasOut
 from app.modules.asaas.models import AsaasConfig
+from app.integrations import asaas_customers
+from app.core.config import settings
 from app.modules.products.models import Product
+from app.core import cache, etag
 from app.core.dependencies import get_db, get_current_user
+from app.core.responses import Shape, negotiated, row_serializer
 from app.modules.users.models import User
 from app.modules.financeiro.models import Pagamento, STATUS_CHOICES
+from app.services import metrics_engine, asaas_outbox
+from app.db.dialect import dialect_name
 from .models import Student
+from . import search as student_search
 from .schemas import (
-    StudentOut, StudentCreate, StudentUpdate,
+    StudentOut, StudentCreate, StudentUpdate, StudentSearchItem,
     BulkUpsertItem, BulkDeleteIn, BulkUpsertIn, BulkDeleteOut,
     RevenueByCreatedOut, ChargeCreateIn, ChargeCreateOut
 )
 
 router = APIRouter()
+etag.track(Student, "students", "mentor_id")
 
 # ==== Helpers comuns ====
 def _ym_to_year_month(ym: str) -> tuple[int, int]:
@@ -231,6 +240,33 @@ def _extract_method(item: Dict[str, Any]) -> str | None:
         return "debito"
     return bt  # fallback
 
+_BILLING_TYPE_FROM_METHOD = {"boleto": "BOLETO", "pix": "PIX", "cartao": "CREDIT_CARD", "debito": "DEBIT_CARD"}
+
+def _local_payments_response(pg: Pagamento) -> Dict[str, Any]:
+    """Mesmo formato da listagem do Asaas, montado a partir da linha local já conciliada."""
+    paid_at = pg.paid_at.isoformat()[:10] if pg.paid_at else None
+    item = {
+        "object": "payment",
+        "id": pg.asaas_payment_id,
+        "status": "RECEIVED",
+        "value": float(pg.valor) if pg.valor is not None else None,
+        "dueDate": pg.due_date.isoformat() if pg.due_date else None,
+        "paymentDate": paid_at,
+        "billingType": _BILLING_TYPE_FROM_METHOD.get(pg.method or ""),
+        "externalReference": pg.external_reference,
+        "isPaid": True,
+        "paidAt": paid_at,
+    }
+    return {
+        "object": "list",
+        "source": "local",
+        "hasMore": False,
+        "totalCount": 1,
+        "limit": 100,
+        "offset": 0,
+        "data": [item],
+    }
+
 def _billing_type_from_student_method(metodo: Optional[str]) -> str:
     m = _norm_pagto(metodo)
     if m == "boleto":
@@ -254,7 +290,10 @@ async def _asaas_create_customer(*, api_key: str, sandbox: bool, name: str,
     async with httpx.AsyncClient(timeout=20.0) as client:
         r = await client.post(f"{base}/customers", json=payload, headers=headers)
         r.raise_for_status()
-        return r.json()
+        data = r.json()
+    asaas_customers.remember(api_key=api_key, sandbox=sandbox, customer_id=data.get("id"),
+                             cpf_cnpj=cpf_cnpj, email=email)
+    return data
 
 async def _asaas_update_customer(
     *, api_key: str, sandbox: bool, customer_id: str,
@@ -278,24 +317,10 @@ async def _asaas_update_customer(
 async def _asaas_find_customer(*, api_key: str, sandbox: bool,
                                cpf_cnpj: Optional[str] = None,
                                email: Optional[str] = None) -> Optional[str]:
-    base = "https://api-sandbox.asaas.com/v3" if sandbox else "https://api.asaas.com/v3"
-    headers = {"accept": "application/json", "content-type": "application/json", "access_token": api_key}
-    async with httpx.AsyncClient(timeout=20.0) as client:
-        if cpf_cnpj:
-            r = await client.get(f"{base}/customers", params={"cpfCnpj": cpf_cnpj}, headers=headers)
-            r.raise_for_status()
-            data = r.json() or {}
-            items = data.get("data") or data.get("items") or []
-            if items:
-                return items[0].get("id")
-        if email:
-            r = await client.get(f"{base}/customers", params={"email": email}, headers=headers)
-            r.raise_for_status()
-            data = r.json() or {}
-            items = data.get("data") or data.get("items") or []
-            if items:
-                return items[0].get("id")
-    return None
+    # índice local por API key (TTL + single-flight); miss cai na busca direta por cpfCnpj/email
+    return await asaas_customers.find_customer_id(
+        api_key=api_key, sandbox=sandbox, cpf_cnpj=cpf_cnpj, email=email,
+    )
 
 async def _asaas_create_payment(
     *, api_key: str, sandbox: bool, customer_id: str,
@@ -336,16 +361,21 @@ async def _asaas_create_payment(
 
 # ======================= ROTAS =======================
 
-@router.get("", response_model=list[StudentOut])
+@router.get("", response_model=list[StudentOut], dependencies=[Depends(etag.conditional("students"))])
 async def list_students(
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
     me: User = Depends(get_current_user),
     limit: int = Query(1000, le=100000),
     offset: int = 0,
     data_compra_ini: str | None = Query(None, description="YYYY-MM-DD"),
     data_compra_fim: str | None = Query(None, description="YYYY-MM-DD"),
+    shape: Shape = Query("rows", description='"columnar": {campo: [valores]} em vez de lista de objetos'),
 ):
-    stmt = select(Student).where(Student.mentor_id == me.id)
+    # até 100k linhas: colunas do StudentOut como tuplas, sem validar linha a linha
+    ser = row_serializer(StudentOut, Student)
+    stmt = select(*ser.columns).where(Student.mentor_id == me.id)
 
     from datetime import datetime as _dt
     if data_compra_ini:
@@ -362,8 +392,23 @@ async def list_students(
             raise HTTPException(status_code=400, detail="data_compra_fim inválida (use YYYY-MM-DD)")
 
     stmt = stmt.order_by(Student.nome.asc()).limit(limit).offset(offset)
+    rows = (await db.execute(stmt)).all()
+    data = ser.columnar(rows) if shape == "columnar" else ser.dicts(rows)
+    return negotiated(request, data, response)
+
+@router.get("/search", response_model=list[StudentSearchItem])
+async def search_students(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_db),
+    me: User = Depends(get_current_user),
+):
+    """Typeahead por nome/email/cpf/telefone, sem acento; ordenado por similaridade."""
+    stmt = student_search.build_search(me.id, q, limit, dialect_name(db))
+    if stmt is None:
+        return []
     res = await db.execute(stmt)
-    return res.scalars().all()
+    return [row._asdict() for row in res.all()]
 
 @router.get("/created/count")
 async def count_created_students(
@@ -378,16 +423,22 @@ async def count_created_students(
     except Exception:
         raise HTTPException(status_code=400, detail="Parâmetros ini/fim inválidos. Use YYYY-MM-DD.")
 
-    q = await db.execute(
-        select(func.count(Student.id)).where(
-            and_(
-                Student.mentor_id == me.id,
-                Student.created_at >= dt_ini,
-                Student.created_at <= dt_fim,
+    async def load(db: AsyncSession) -> dict:
+        q = await db.execute(
+            select(func.count(Student.id)).where(
+                and_(
+                    Student.mentor_id == me.id,
+                    Student.created_at >= dt_ini,
+                    Student.created_at <= dt_fim,
+                )
             )
         )
+        return {"count": q.scalar_one()}
+
+    return await cache.cached(
+        db, mentor_id=me.id, route="students.created_count", params=[ini, fim], tags=["students"],
+        ttl=settings.DASHBOARD_CACHE_TTL_SECONDS, stale=settings.DASHBOARD_CACHE_STALE_SECONDS, loader=load,
     )
-    return {"count": q.scalar_one()}
 
 @router.post("/{student_id}/payments/sync", response_model=SyncCompetenciasOut)
 async def sync_payments_competencias(
@@ -450,6 +501,7 @@ async def sync_payments_competencias(
         created += 1
 
     await db.commit()
+    await cache.invalidate(me.id, "pagamentos")
     return SyncCompetenciasOut(created=created, skipped=skipped)
 
 
@@ -465,8 +517,10 @@ async def update_student(
     if not obj:
         raise HTTPException(status_code=404, detail="Aluno não encontrado")
 
+    before = metrics_engine.student_state(obj)
     for k, v in payload.model_dump(exclude_unset=True).items():
         setattr(obj, k, v)
+    await metrics_engine.apply_student_change(db, me.id, before, metrics_engine.student_state(obj))
 
     if obj.asaas_customer_id:
         cfg = await _get_asaas_config(db, mentor_id=me.id)
@@ -490,6 +544,7 @@ async def update_student(
                     print("[ASAAS][PUT] Falha desconhecida ao atualizar cliente")
 
     await db.commit()
+    await cache.invalidate(me.id, "students")
     await db.refresh(obj)
     return obj
 
@@ -504,6 +559,7 @@ async def create_student(
     obj = Student(**payload.model_dump(), mentor_id=me.id)
     db.add(obj)
     await db.flush()  # ganha obj.id
+    await metrics_engine.apply_student_change(db, me.id, None, metrics_engine.student_state(obj))
 
     # opcional: cria customer na Asaas se já tiver config e dados (mesma lógica do bulk_upsert)
     cfg = await _get_asaas_config(db, mentor_id=me.id)
@@ -566,6 +622,7 @@ async def create_student(
             # você pode logar created se quiser
 
     await db.commit()
+    await cache.invalidate(me.id, "students")
     await db.refresh(obj)
     return obj
 
@@ -612,11 +669,15 @@ async def bulk_upsert(
                 except Exception:
                     pass
 
+    await db.flush()
+    await metrics_engine.recompute_mrr(db, me.id)
     await db.commit()
+    await cache.invalidate(me.id, "students")
     return {"count": created}
 
 @router.delete("/bulk", response_model=BulkDeleteOut)
 async def bulk_delete(
+    background: BackgroundTasks,
     inp: BulkDeleteIn = Body(...),
     db: AsyncSession = Depends(get_db),
     me: User = Depends(get_current_user),
@@ -631,33 +692,26 @@ async def bulk_delete(
     if not students:
         return {"count": 0}
 
-    cfg = await _get_asaas_config(db, mentor_id=me.id)
-    if cfg:
-        base = "https://api-sandbox.asaas.com/v3" if cfg.sandbox else "https://api.asaas.com/v3"
-        headers = {"accept": "application/json", "access_token": cfg.api_key}
-        try:
-            async with httpx.AsyncClient(timeout=20.0) as client:
-                for st in students:
-                    if not st.asaas_customer_id:
-                        continue
-                    url = f"{base}/customers/{st.asaas_customer_id}"
-                    try:
-                        r = await client.delete(url, headers=headers)
-                        if r.status_code >= 400:
-                            print(f"[ASAAS] Falha ao excluir cliente {st.asaas_customer_id}: "
-                                  f"{r.status_code} {r.text}")
-                    except Exception as e:
-                        print(f"[ASAAS] Erro ao chamar API de exclusão ({st.asaas_customer_id}): {e}")
-        except Exception as e:
-            print(f"[ASAAS] Erro geral no bulk delete: {e}")
+    # exclusões no Asaas vão para o outbox (mesma transação) e rodam após o commit local
+    enqueued = 0
+    if await _get_asaas_config(db, mentor_id=me.id):
+        enqueued = await asaas_outbox.enqueue_customer_deletions(
+            db, me.id, (st.asaas_customer_id for st in students)
+        )
 
     await db.execute(delete(Student).where(and_(Student.mentor_id == me.id, Student.id.in_(inp.ids))))
+    await etag.bump(db, "students", me.id)
+    await metrics_engine.recompute_mrr(db, me.id)
     await db.commit()
+    await cache.invalidate(me.id, "students", "pagamentos")
+    if enqueued:
+        background.add_task(asaas_outbox.drain_for_mentor, me.id)
     return {"count": len(students)}
 
 @router.delete("/{student_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_student(
     student_id: int,
+    background: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     me: User = Depends(get_current_user),
 ):
@@ -666,22 +720,17 @@ async def delete_student(
     if not student:
         raise HTTPException(status_code=404, detail="Aluno não encontrado")
 
-    if student.asaas_customer_id:
-        cfg = await _get_asaas_config(db, mentor_id=me.id)
-        if cfg:
-            base = "https://api-sandbox.asaas.com/v3" if cfg.sandbox else "https://api.asaas.com/v3"
-            headers = {"accept": "application/json", "access_token": cfg.api_key}
-            url = f"{base}/customers/{student.asaas_customer_id}"
-            try:
-                async with httpx.AsyncClient(timeout=20.0) as client:
-                    r = await client.delete(url, headers=headers)
-                    if r.status_code >= 400:
-                        print(f"[ASAAS] Falha ao excluir cliente {student.asaas_customer_id}: {r.status_code} {r.text}")
-            except Exception as e:
-                print(f"[ASAAS] Erro ao chamar API de exclusão: {e}")
+    enqueued = 0
+    if student.asaas_customer_id and await _get_asaas_config(db, mentor_id=me.id):
+        enqueued = await asaas_outbox.enqueue_customer_deletions(db, me.id, [student.asaas_customer_id])
 
     await db.execute(delete(Student).where(Student.id == student_id))
+    await etag.bump(db, "students", me.id)
+    await metrics_engine.apply_student_change(db, me.id, metrics_engine.student_state(student), None)
     await db.commit()
+    await cache.invalidate(me.id, "students", "pagamentos")
+    if enqueued:
+        background.add_task(asaas_outbox.drain_for_mentor, me.id)
     return
 
 @router.get("/revenue/purchases", response_model=RevenueByCreatedOut)
@@ -723,9 +772,15 @@ async def revenue_by_purchases(
             )
         )
     )
-    res = await db.execute(stmt)
-    total, count = res.one_or_none() or (0, 0)
-    return RevenueByCreatedOut(total=float(total or 0), count=int(count or 0))
+    async def load(db: AsyncSession) -> RevenueByCreatedOut:
+        total, count = (await db.execute(stmt)).one_or_none() or (0, 0)
+        return RevenueByCreatedOut(total=float(total or 0), count=int(count or 0))
+
+    return await cache.cached(
+        db, mentor_id=me.id, route="students.revenue_purchases", params=[ini, fim],
+        tags=["students", "products"], ttl=settings.DASHBOARD_CACHE_TTL_SECONDS,
+        stale=settings.DASHBOARD_CACHE_STALE_SECONDS, loader=load,
+    )
 
 @router.post("/{student_id}/asaas/charge", response_model=ChargeCreateOut, status_code=201)
 async def create_asaas_charge_for_student(
@@ -859,6 +914,7 @@ async def create_asaas_charge_for_student(
     pg.paid_at = None
 
     await db.commit()
+    await cache.invalidate(me.id, "students", "pagamentos")
     await db.refresh(pg)
 
     return ChargeCreateOut(
@@ -914,6 +970,7 @@ async def list_asaas_payments_for_student(
     student_id: int,
     competencia: str = Query(..., description="YYYY-MM"),
     reconcile: bool = Query(True, description="Se true, ajusta o status_pagamento local conforme status do Asaas"),
+    fresh: bool = Query(False, description="Se true, ignora dados locais/cache e consulta o Asaas"),
     db: AsyncSession = Depends(get_db),
     me: User = Depends(get_current_user),
 ):
@@ -938,6 +995,49 @@ async def list_asaas_payments_for_student(
     if not cfg:
         raise HTTPException(status_code=400, detail="Configuração Asaas não encontrada para este mentor")
 
+    # tags: escritas em pagamentos (pagar/desfazer/cobrar/excluir) e no aluno (customer) invalidam;
+    # `fresh` consulta o Asaas direto e atualiza o cache
+    return await cache.cached(
+        db,
+        mentor_id=me.id,
+        route="students/asaas/payments",
+        params=[st.id, competencia, reconcile],
+        tags=("pagamentos", "students"),
+        ttl=settings.ASAAS_PAYMENTS_CACHE_TTL_SECONDS,
+        loader=lambda s: _load_asaas_payments(
+            s, me, st, cfg, competencia, reconcile, dt_ini, dt_fim, skip_local=fresh
+        ),
+        refresh=fresh,
+    )
+
+
+async def _load_asaas_payments(
+    db: AsyncSession,
+    me: User,
+    st: Student,
+    cfg: AsaasConfig,
+    competencia: str,
+    reconcile: bool,
+    dt_ini: date,
+    dt_fim: date,
+    skip_local: bool = False,
+) -> Dict[str, Any]:
+    """Pagamentos da competência no Asaas (ou a linha local já paga), com conciliação opcional."""
+    if not skip_local:
+        # fast path: competência já conciliada como paga (estado final no Asaas)
+        rpg = await db.execute(
+            select(Pagamento).where(
+                and_(
+                    Pagamento.mentor_id == me.id,
+                    Pagamento.student_id == st.id,
+                    Pagamento.competencia == competencia,
+                )
+            )
+        )
+        pg_local = rpg.scalar_one_or_none()
+        if pg_local and pg_local.status_pagamento == "pago" and pg_local.asaas_payment_id:
+            return _local_payments_response(pg_local)
+
     base = "https://api-sandbox.asaas.com/v3" if cfg.sandbox else "https://api.asaas.com/v3"
     headers = {
         "accept": "application/json",
@@ -954,62 +1054,48 @@ async def list_asaas_payments_for_student(
             enriched.append(it2)
         return enriched
 
+    # Estratégias em ordem de prioridade; disparadas juntas, vence a primeira (na ordem) com itens
+    strategies: List[tuple[str, Dict[str, Any]]] = [
+        ("xref", {"externalReference": f"student:{st.id}:{competencia}"}),
+        ("gen", {
+            "externalReference": f"student:{st.id}",
+            "dueDate[ge]": dt_ini.isoformat(),
+            "dueDate[le]": dt_fim.isoformat(),
+        }),
+    ]
+    if st.asaas_customer_id:
+        strategies.append(("customer", {
+            "customer": st.asaas_customer_id,
+            "dueDate[ge]": dt_ini.isoformat(),
+            "dueDate[le]": dt_fim.isoformat(),
+        }))
+
     items: List[Dict[str, Any]] = []
     source: str = "none"
 
     async with httpx.AsyncClient(timeout=30.0) as client:
-        # 1) Busca exata por externalReference da competência
-        params_xref = {
-            "externalReference": f"student:{st.id}:{competencia}",
-            "limit": 100,
-            "offset": 0,
-        }
-        r_xref = await client.get(f"{base}/payments", params=params_xref, headers=headers)
-        if r_xref.status_code >= 400:
-            raise HTTPException(status_code=502, detail={"asaas": r_xref.text, "status": r_xref.status_code})
-        data_xref = r_xref.json() or {}
-        items_xref = data_xref.get("data") or data_xref.get("items") or []
-        if items_xref:
-            items = _enrich(items_xref)
-            source = "xref"
-
-        # 2) Busca por externalReference do aluno, limitada ao mês, se não achou na #1
-        if not items:
-            params_gen = {
-                "externalReference": f"student:{st.id}",
-                "limit": 100,
-                "offset": 0,
-                "dueDate[ge]": dt_ini.isoformat(),
-                "dueDate[le]": dt_fim.isoformat(),
-            }
-            r_gen = await client.get(f"{base}/payments", params=params_gen, headers=headers)
-            if r_gen.status_code >= 400:
-                raise HTTPException(status_code=502, detail={"asaas": r_gen.text, "status": r_gen.status_code})
-            data_gen = r_gen.json() or {}
-            items_gen = data_gen.get("data") or data_gen.get("items") or []
-            if items_gen:
-                items = _enrich(items_gen)
-                source = "gen"
-
-        # 3) Fallback por customer (janela do mês)
-        if not items:
-            if not st.asaas_customer_id:
-                raise HTTPException(status_code=404, detail="Aluno sem customer vinculado na Asaas")
-            params_cust = {
-                "customer": st.asaas_customer_id,
-                "limit": 100,
-                "offset": 0,
-                "dueDate[ge]": dt_ini.isoformat(),
-                "dueDate[le]": dt_fim.isoformat(),
-            }
-            r_cust = await client.get(f"{base}/payments", params=params_cust, headers=headers)
-            if r_cust.status_code >= 400:
-                raise HTTPException(status_code=502, detail={"asaas": r_cust.text, "status": r_cust.status_code})
-            data_cust = r_cust.json() or {}
-            items_cust = data_cust.get("data") or data_cust.get("items") or []
-            if items_cust:
-                items = _enrich(items_cust)
-                source = "customer"
+        async def _fetch(params: Dict[str, Any]) -> List[Dict[str, Any]]:
+            r = await client.get(f"{base}/payments", params={**params, "limit": 100, "offset": 0}, headers=headers)
+            if r.status_code >= 400:
+                raise HTTPException(status_code=502, detail={"asaas": r.text, "status": r.status_code})
+            data = r.json() or {}
+            return data.get("data") or data.get("items") or []
+
+        tasks = [(name, asyncio.create_task(_fetch(params))) for name, params in strategies]
+        try:
+            for name, task in tasks:
+                found = await task
+                if found:
+                    items = _enrich(found)
+                    source = name
+                    break
+        finally:
+            for _, task in tasks:
+                task.cancel()
+            await asyncio.gather(*(t for _, t in tasks), return_exceptions=True)
+
+    if not items and not st.asaas_customer_id:
+        raise HTTPException(status_code=404, detail="Aluno sem customer vinculado na Asaas")
 
     if not items:
         # nada encontrado no mês
@@ -1039,9 +1125,9 @@ async def list_asaas_payments_for_student(
                 paid_at_iso = paid_item.get("paidAt")  # 'YYYY-MM-DD'
                 if paid_at_iso:
                     try:
-                        pg.paid_at = datetime.strptime(paid_at_iso, "%Y-%m-%d")
+                        pg.paid_at = datetime.strptime(paid_at_iso, "%Y-%m-%d").date()
                     except Exception:
-                        pg.paid_at = datetime.fromisoformat(paid_at_iso)
+                        pg.paid_at = datetime.fromisoformat(paid_at_iso).date()
                 # method
                 m = _extract_method(paid_item)
                 if m:
@@ -1076,10 +1162,13 @@ async def list_asaas_payments_for_student(
                 if m and not pg.method:
                     pg.method = m
 
+            # só invalida se algo mudou: senão a própria resposta em cache nunca seria reaproveitada
+            changed = db.is_modified(pg)
             await db.commit()
-            await db.refresh(pg)
+            if changed:
+                await cache.invalidate(me.id, "pagamentos")
 
-    return {
+    out = {
         "object": "list",
         "source": source,
         "hasMore": False,
@@ -1087,4 +1176,5 @@ async def list_asaas_payments_for_student(
         "limit": 100,
         "offset": 0,
         "data": items,
-    }
\ No newline at end of file
+    }
+    return out
\ No newline at end of file
@@ -41,6 +41,17 @@ class StudentOut(StudentBase):
     asaas_customer_id: str | None = None
     model_config = ConfigDict(from_attributes=True)
 
+# Busca (typeahead) — projeção enxuta
+class StudentSearchItem(BaseModel):
+    id: int
+    nome: str
+    email: str
+    cpf: str | None = None
+    telefone: str | None = None
+    status: str | None = None
+    plano: str | None = None
+    score: float | None = None
+
 # Bulk
 class BulkUpsertItem(StudentCreate):
     pass
@@ -0,0 +1,122 @@
+# app/modules/students/search.py
+"""
+Busca de alunos por nome/email/cpf/telefone (typeahead).
+
+`alunos.search_text` guarda nome/email sem acento e cpf/telefone só com dígitos; é
+preenchido pelo ORM (ver `models.build_search_text`). No Postgres há um índice GIN
+`pg_trgm` na coluna: termos viram `ILIKE '%termo%'` (acelerado pelo índice) e o
+resultado é ordenado por `word_similarity`. Sem o índice (SQLite), usa LIKE.
+"""
+from __future__ import annotations
+
+import re
+from typing import Optional
+
+from sqlalchemy import Select, and_, bindparam, func, null, or_, select, text, update
+from sqlalchemy.engine import Connection
+
+from app.db import ddl
+from app.modules.students.models import Student, build_search_text
+from app.utils.br import only_digits
+from app.utils.text import strip_accents_lower
+
+TRGM_NAME = "alunos_search_trgm"
+BACKFILL_BATCH = 1000
+
+# ---------------- DDL ----------------
+
+
+def _ensure_column(conn: Connection, sql_type: str) -> None:
+    if not ddl.has_column(conn, "alunos", "search_text"):
+        conn.execute(text(f"ALTER TABLE alunos ADD COLUMN search_text {sql_type}"))
+
+
+def _backfill(conn: Connection) -> None:
+    """Preenche search_text das linhas antigas (mesma normalização do ORM)."""
+    while True:
+        rows = conn.execute(
+            select(Student.id, Student.nome, Student.email, Student.cpf, Student.telefone)
+            .where(Student.search_text.is_(None))
+            .limit(BACKFILL_BATCH)
+        ).all()
+        if not rows:
+            return
+        conn.execute(
+            update(Student.__table__).where(Student.__table__.c.id == bindparam("b_id")),
+            [{"b_id": r.id, "search_text": build_search_text(r.nome, r.email, r.cpf, r.telefone)} for r in rows],
+        )
+        if len(rows) < BACKFILL_BATCH:
+            return
+
+
+@ddl.register(TRGM_NAME, "postgresql")
+def _pg_trgm(conn: Connection) -> Optional[bool]:
+    if not ddl.has_table(conn, "alunos"):
+        return False
+    _ensure_column(conn, "text")
+    _backfill(conn)
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_alunos_search_trgm ON alunos USING gin (search_text gin_trgm_ops)"
+    ))
+    return True
+
+
+@ddl.register("alunos_search_text", "sqlite")
+def _sqlite_search_text(conn: Connection) -> Optional[bool]:
+    if not ddl.has_table(conn, "alunos"):
+        return False
+    _ensure_column(conn, "TEXT")
+    _backfill(conn)
+    return True
+
+
+# ---------------- Consulta ----------------
+
+_DIGITS_ONLY = re.compile(r"[\d\s().\-/+]+")
+
+
+def normalize_query(q: str) -> str:
+    """'123.456.789-0' -> '1234567890'; 'José Silva' -> 'jose silva'."""
+    q = q.strip()
+    if _DIGITS_ONLY.fullmatch(q):
+        return only_digits(q)
+    return " ".join(strip_accents_lower(q).split())
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def build_search(mentor_id: int, q: str, limit: int, dialect: str) -> Optional[Select]:
+    norm = normalize_query(q)
+    terms = norm.split()
+    if not terms:
+        return None
+
+    cols = (
+        Student.id, Student.nome, Student.email, Student.cpf,
+        Student.telefone, Student.status, Student.plano,
+    )
+    # todos os termos precisam aparecer (prefixo/substring) — GIN trgm atende ILIKE
+    contains = and_(*(Student.search_text.ilike(f"%{_escape_like(t)}%", escape="\\") for t in terms))
+
+    if dialect == "postgresql" and ddl.is_applied(TRGM_NAME):
+        score = func.word_similarity(norm, Student.search_text)
+        return (
+            select(*cols, score.label("score"))
+            .where(
+                Student.mentor_id == mentor_id,
+                # erro de digitação: "joao slva" ainda casa por similaridade
+                or_(contains, Student.search_text.op("%>")(norm)),
+            )
+            .order_by(score.desc(), Student.nome.asc())
+            .limit(limit)
+        )
+
+    return (
+        select(*cols, null().label("score"))
+        .where(Student.mentor_id == mentor_id, contains)
+        .order_by(Student.nome.asc())
+        .limit(limit)
+    )
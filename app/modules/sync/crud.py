@@ -0,0 +1,139 @@
+# app/modules/sync/crud.py
+"""
+Sync incremental ("changes since") dos quadros.
+
+Cursor opaco = (updated_at, id, em_dia):
+- página intermediária (`has_more`): keyset estrito em (updated_at, id);
+- em dia: o cursor é o `now()` do banco e o próximo poll relê a partir de
+  `cursor - SYNC_CLOCK_SKEW_SECONDS`. `now()` no Postgres é o início da transação, então
+  um UPDATE de uma transação longa pode aparecer com updated_at "no passado"; a janela
+  de sobreposição cobre isso (o cliente aplica upserts/deletes de forma idempotente).
+"""
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Iterable, Optional, Sequence
+
+from sqlalchemy import and_, delete, func, insert, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.dialect import dialect_name
+from app.db.session import AsyncSessionLocal
+from app.modules.sync.models import Tombstone
+from app.utils.cursor import decode_cursor, encode_cursor
+
+logger = logging.getLogger("mentorpro.sync")
+
+
+async def record_deletions(
+    db: AsyncSession,
+    entity: str,
+    ids: Iterable[int],
+    *,
+    tenant_id: Optional[str] = None,
+    owner_id: Optional[int] = None,
+) -> None:
+    """Grava tombstones na mesma transação do DELETE (não faz commit)."""
+    rows = [{"entity": entity, "entity_id": i, "tenant_id": tenant_id, "owner_id": owner_id} for i in ids]
+    if rows:
+        await db.execute(insert(Tombstone), rows)
+
+
+@dataclass
+class Changes:
+    cursor: str
+    reset: bool = False
+    has_more: bool = False
+    upserts: Sequence[Any] = ()
+    deleted: list[int] = field(default_factory=list)
+
+
+async def _db_now(db: AsyncSession) -> datetime:
+    return (await db.execute(select(func.now()))).scalar_one()
+
+
+def _as_datetime(value: Any) -> datetime:
+    # SQLite devolve CURRENT_TIMESTAMP como texto
+    return value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+
+
+def _comparable(db: AsyncSession, col: Any, ts: datetime) -> tuple[Any, Any]:
+    """
+    SQLite guarda timestamps como texto em formatos diferentes (CURRENT_TIMESTAMP sem
+    fração; parâmetros com microssegundos): compara os dois via datetime().
+    """
+    if dialect_name(db) == "sqlite":
+        return func.datetime(col), ts.strftime("%Y-%m-%d %H:%M:%S")
+    return col, ts
+
+
+async def changes_since(
+    db: AsyncSession,
+    *,
+    model: Any,
+    scope: Sequence[Any],
+    entity: str,
+    tombstone_scope: Sequence[Any],
+    since: Optional[str],
+    limit: int,
+) -> Changes:
+    """
+    Linhas de `model` (filtradas por `scope`) alteradas desde o cursor + ids apagados.
+    Sem cursor (ou cursor mais velho que a retenção): `reset=True` e só o cursor atual;
+    o cliente recarrega o quadro e passa a usar o cursor.
+    """
+    now = _as_datetime(await _db_now(db))
+    if not since:
+        return Changes(cursor=encode_cursor(now.isoformat(), 0, 1), reset=True)
+    try:
+        ts_raw, last_id, caught_up = decode_cursor(since, 3)
+        ts = datetime.fromisoformat(ts_raw)
+    except (ValueError, TypeError):
+        raise ValueError("cursor inválido")
+
+    if ts < now - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS):
+        return Changes(cursor=encode_cursor(now.isoformat(), 0, 1), reset=True)
+
+    if caught_up:
+        lower = ts - timedelta(seconds=settings.SYNC_CLOCK_SKEW_SECONDS)
+        col, val = _comparable(db, model.updated_at, lower)
+        cond = col >= val
+    else:
+        lower = ts
+        col, val = _comparable(db, model.updated_at, ts)
+        cond = or_(col > val, and_(col == val, model.id > last_id))
+
+    rows = (await db.execute(
+        select(model).where(*scope, cond).order_by(model.updated_at, model.id).limit(limit + 1)
+    )).scalars().all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    tcol, tlower = _comparable(db, Tombstone.deleted_at, lower)
+    tq = select(Tombstone.entity_id).where(Tombstone.entity == entity, *tombstone_scope, tcol >= tlower)
+    if has_more:
+        last = rows[-1]
+        tq = tq.where(tcol <= _comparable(db, Tombstone.deleted_at, _as_datetime(last.updated_at))[1])
+        cursor = encode_cursor(_as_datetime(last.updated_at).isoformat(), last.id, 0)
+    else:
+        cursor = encode_cursor(now.isoformat(), 0, 1)
+    deleted = list(dict.fromkeys((await db.execute(tq)).scalars()))
+
+    return Changes(cursor=cursor, has_more=has_more, upserts=rows, deleted=deleted)
+
+
+async def purge_tombstones(db: AsyncSession) -> int:
+    cutoff = _as_datetime(await _db_now(db)) - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    res = await db.execute(delete(Tombstone).where(Tombstone.deleted_at < cutoff))
+    await db.commit()
+    return res.rowcount or 0
+
+
+async def purge_job() -> None:
+    async with AsyncSessionLocal() as db:
+        n = await purge_tombstones(db)
+    if n:
+        logger.info("[SYNC] %s tombstone(s) removido(s)", n)
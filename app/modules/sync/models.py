@@ -0,0 +1,45 @@
+# app/modules/sync/models.py
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, Index, Integer, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class Tombstone(Base):
+    """
+    Registro de exclusão para o sync incremental (`GET .../changes`): a linha apagada
+    some da tabela de origem, então o "delete" precisa ficar guardado aqui até a
+    retenção (`SYNC_TOMBSTONE_RETENTION_DAYS`).
+    """
+    __tablename__ = "sync_tombstones"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    entity: Mapped[str] = mapped_column(String(32), nullable=False)   # "crm_lead" | "activity"
+    entity_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    tenant_id: Mapped[str | None] = mapped_column(String, nullable=True)
+    owner_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    deleted_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), default=func.now(), nullable=False
+    )
+
+    __table_args__ = (
+        Index("ix_sync_tombstones_entity_tenant", "entity", "tenant_id", "deleted_at"),
+        Index("ix_sync_tombstones_entity_owner", "entity", "owner_id", "deleted_at"),
+        Index("ix_sync_tombstones_deleted_at", "deleted_at"),
+    )
+
+
+class ResourceVersion(Base):
+    """
+    Contador de versão por recurso e escopo (mentor/tenant), incrementado na mesma
+    transação das escritas; base do ETag das listagens (ver `app/core/etag.py`).
+    """
+    __tablename__ = "resource_versions"
+
+    resource: Mapped[str] = mapped_column(String(32), primary_key=True)   # "students" | "crm_leads" ...
+    scope: Mapped[str] = mapped_column(String(64), primary_key=True)      # mentor_id ou tenant_id
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=1)
@@ -9,6 +9,7 @@ from sqlalchemy import select
 
 from app.core.dependencies import get_db, get_current_user, get_tenant
 from app.modules.tenants.models import Tenant
+from app.modules.atividades.crud import seed_default_stages
 from app.core.security import hash_password
 from .models import User
 from .schemas import (
@@ -72,6 +73,8 @@ async def create_user(
         is_active=_status_to_active(payload.status),
     )
     db.add(u)
+    await db.flush()
+    await seed_default_stages(db, u.id)
     await db.commit()
     await db.refresh(u)
     return u
@@ -0,0 +1,258 @@
+# app/services/asaas_charges.py
+"""
+Emissão de cobranças Asaas em lote para uma competência.
+
+1. Seleciona os pagamentos pendentes/atrasados do mentor sem `asaas_payment_id` e
+   sem reserva ativa.
+2. Reserva (`asaas_claimed_at`, UPDATE com commit próprio) os que passaram nas
+   validações locais; o que outro lote já reservou fica de fora.
+3. Provisiona (cria ou localiza) os customers que faltam, em paralelo.
+4. Cria as cobranças em paralelo; cada `asaas_payment_id` é gravado e commitado assim
+   que a chamada volta, então um lote que cai no meio não emite de novo o que já foi.
+Tudo limitado por `ASAAS_MAX_CONCURRENCY` requisições simultâneas e
+`ASAAS_REQUESTS_PER_SECOND`. Os customers novos são gravados com um UPDATE em lote
+por PK no fim e o progresso fica no `job_tracker`.
+
+Reservas só são desfeitas quando o Asaas recusa a cobrança (AsaasError). Timeout ou
+queda durante a chamada deixam a reserva até `ASAAS_CHARGE_CLAIM_TTL_SECONDS`: a
+cobrança pode ter sido criada, e o webhook/reconciliação a vincula pelo
+`external_reference` antes que outro lote tente de novo.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import date, datetime, timedelta
+from typing import Any, Optional
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import cache, etag
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.integrations import asaas_customers
+from app.integrations.asaas_client import AsaasClient, AsaasError, RateLimiter, billing_type_for
+from app.modules.asaas.models import AsaasConfig
+from app.modules.financeiro.models import Pagamento
+from app.modules.students.models import Student
+from app.services.job_tracker import Job
+from app.utils.br import normalize_cpf_cnpj, normalize_mobile_phone
+
+logger = logging.getLogger("mentorpro.asaas")
+
+STATUS_COBRAVEIS = ("pendente", "atrasado")
+
+_METHOD_TXT = {"BOLETO": "boleto", "PIX": "pix", "CREDIT_CARD": "cartao"}
+
+
+def _erro_msg(e: Exception) -> str:
+    if isinstance(e, AsaasError) and isinstance(e.data, dict):
+        errors = e.data.get("errors") or []
+        if errors and isinstance(errors[0], dict) and errors[0].get("description"):
+            return str(errors[0]["description"])
+        return f"{e.code} (HTTP {e.data.get('_status_code')})"
+    return str(e) or e.__class__.__name__
+
+
+def _sem_reserva(now: datetime):
+    cutoff = now - timedelta(seconds=settings.ASAAS_CHARGE_CLAIM_TTL_SECONDS)
+    return or_(Pagamento.asaas_claimed_at.is_(None), Pagamento.asaas_claimed_at < cutoff)
+
+
+async def _select_cobraveis(db: AsyncSession, mentor_id: int, competencia: str, now: datetime) -> list[Any]:
+    stmt = (
+        select(
+            Pagamento.id,
+            Pagamento.student_id,
+            Pagamento.valor,
+            Pagamento.due_date,
+            Student.nome,
+            Student.email,
+            Student.cpf,
+            Student.telefone,
+            Student.metodo_pagamento,
+            Student.asaas_customer_id,
+        )
+        .join(Student, Student.id == Pagamento.student_id)
+        .where(
+            Pagamento.mentor_id == mentor_id,
+            Pagamento.competencia == competencia,
+            Pagamento.status_pagamento.in_(STATUS_COBRAVEIS),
+            Pagamento.asaas_payment_id.is_(None),
+            _sem_reserva(now),
+        )
+        .order_by(Pagamento.id)
+    )
+    return (await db.execute(stmt)).all()
+
+
+async def _claim(db: AsyncSession, ids: list[int], now: datetime) -> set[int]:
+    """Reserva os pagamentos ainda livres; devolve os ids reservados (com commit)."""
+    if not ids:
+        return set()
+    stmt = (
+        update(Pagamento)
+        .where(Pagamento.id.in_(ids), Pagamento.asaas_payment_id.is_(None), _sem_reserva(now))
+        .values(asaas_claimed_at=now)
+        .returning(Pagamento.id)
+        .execution_options(synchronize_session=False)
+    )
+    claimed = set((await db.execute(stmt)).scalars().all())
+    await db.commit()
+    return claimed
+
+
+async def _ensure_customer(asaas: AsaasClient, cfg: AsaasConfig, row: Any) -> str:
+    cpf_cnpj = normalize_cpf_cnpj(row.cpf)
+    try:
+        resp = await asaas.create_customer(
+            name=row.nome, cpf_cnpj=cpf_cnpj, email=row.email,
+            mobile_phone=normalize_mobile_phone(row.telefone),
+        )
+        if resp.get("id"):
+            asaas_customers.remember(api_key=cfg.api_key, sandbox=cfg.sandbox, customer_id=resp["id"],
+                                     cpf_cnpj=cpf_cnpj, email=row.email)
+            return resp["id"]
+    except AsaasError:
+        pass
+    existing = await asaas_customers.find_customer_id(
+        api_key=cfg.api_key, sandbox=cfg.sandbox, cpf_cnpj=cpf_cnpj, email=row.email,
+    )
+    if not existing:
+        raise RuntimeError("Falha ao criar/obter cliente no Asaas")
+    return existing
+
+
+async def issue_charges(
+    db: AsyncSession,
+    job: Job,
+    cfg: AsaasConfig,
+    mentor_id: int,
+    competencia: str,
+    today: Optional[date] = None,
+) -> None:
+    today = today or date.today()
+    now = datetime.utcnow()
+    rows = await _select_cobraveis(db, mentor_id, competencia, now)
+    job.total = len(rows)
+    job.status = "executando"
+    if not rows:
+        return
+
+    sem = asyncio.Semaphore(max(1, settings.ASAAS_MAX_CONCURRENCY))
+    limiter = RateLimiter(settings.ASAAS_REQUESTS_PER_SECOND)
+
+    # validações locais antes de qualquer chamada externa
+    pendentes = []
+    for r in rows:
+        billing_type = billing_type_for(r.metodo_pagamento)
+        if billing_type == "UNDEFINED":
+            job.add_result(False, pagamento_id=r.id, aluno_id=r.student_id, erro="Método de pagamento inválido/ausente")
+        elif r.valor is None or float(r.valor) <= 0:
+            job.add_result(False, pagamento_id=r.id, aluno_id=r.student_id, erro="Competência sem valor")
+        else:
+            pendentes.append((r, billing_type))
+
+    claimed = await _claim(db, [r.id for r, _ in pendentes], now)
+    for r, _ in pendentes:
+        if r.id not in claimed:
+            job.add_result(False, pagamento_id=r.id, aluno_id=r.student_id, erro="Cobrança já em emissão por outro lote")
+    pendentes = [(r, bt) for r, bt in pendentes if r.id in claimed]
+
+    customers: dict[int, str] = {r.student_id: r.asaas_customer_id for r, _ in pendentes if r.asaas_customer_id}
+    customer_erros: dict[int, str] = {}
+    novos: list[dict[str, Any]] = []
+    liberar: list[int] = []  # reservas a desfazer (cobrança certamente não criada)
+    db_lock = asyncio.Lock()  # a sessão é compartilhada pelas tarefas
+
+    async with AsaasClient(cfg.api_key, sandbox=cfg.sandbox, limiter=limiter) as asaas:
+
+        async def provision(row: Any) -> None:
+            async with sem:
+                try:
+                    cid = await _ensure_customer(asaas, cfg, row)
+                except Exception as e:
+                    customer_erros[row.student_id] = _erro_msg(e)
+                    return
+            customers[row.student_id] = cid
+            novos.append({"id": row.student_id, "asaas_customer_id": cid})
+
+        # um customer por aluno (o mesmo aluno não se repete na competência, mas por garantia)
+        faltantes = {r.student_id: r for r, _ in pendentes if r.student_id not in customers}
+        await asyncio.gather(*(provision(r) for r in faltantes.values()))
+
+        async def charge(row: Any, billing_type: str) -> None:
+            cid = customers.get(row.student_id)
+            if not cid:
+                liberar.append(row.id)
+                job.add_result(False, pagamento_id=row.id, aluno_id=row.student_id,
+                               erro=customer_erros.get(row.student_id, "Cliente Asaas ausente"))
+                return
+            due = max(row.due_date or today, today)
+            ext_ref = f"student:{row.student_id}:{competencia}"
+            async with sem:
+                try:
+                    raw = await asaas.create_payment(
+                        customer_id=cid,
+                        value=float(row.valor),
+                        due_date=due.isoformat(),
+                        billing_type=billing_type,
+                        description=f"Cobrança {row.nome} ({competencia})",
+                        external_reference=ext_ref,
+                    )
+                except AsaasError as e:
+                    liberar.append(row.id)
+                    job.add_result(False, pagamento_id=row.id, aluno_id=row.student_id, erro=_erro_msg(e))
+                    return
+                except Exception as e:
+                    # timeout/conexão: a cobrança pode existir no Asaas; a reserva fica
+                    job.add_result(False, pagamento_id=row.id, aluno_id=row.student_id, erro=_erro_msg(e))
+                    return
+            # grava já: se o lote cair depois daqui, esta cobrança não é emitida de novo
+            async with db_lock:
+                await db.execute(
+                    update(Pagamento).where(Pagamento.id == row.id).values(
+                        asaas_payment_id=raw.get("id"),
+                        asaas_claimed_at=None,
+                        status_pagamento="pendente",
+                        external_reference=ext_ref,
+                        method=_METHOD_TXT.get(billing_type),
+                        due_date=due,
+                        source="asaas",
+                        paid_at=None,
+                    ).execution_options(synchronize_session=False)
+                )
+                await db.commit()
+            job.add_result(True, pagamento_id=row.id, aluno_id=row.student_id, asaas_payment_id=raw.get("id"))
+
+        await asyncio.gather(*(charge(r, bt) for r, bt in pendentes))
+
+    # write-back dos customers: UPDATE em lote por PK (executemany)
+    if novos:
+        await db.execute(update(Student), novos)
+        await etag.bump(db, "students", mentor_id)
+    if liberar:
+        await db.execute(
+            update(Pagamento).where(Pagamento.id.in_(liberar)).values(asaas_claimed_at=None)
+            .execution_options(synchronize_session=False)
+        )
+    await db.commit()
+    await cache.invalidate(mentor_id, "students", "pagamentos")
+
+
+async def run_batch_job(job: Job, mentor_id: int, competencia: str) -> None:
+    """Ponto de entrada da BackgroundTask: sessão própria, erros vão para o job."""
+    try:
+        async with AsyncSessionLocal() as db:
+            cfg = (await db.execute(
+                select(AsaasConfig).where(AsaasConfig.mentor_id == mentor_id)
+            )).scalar_one_or_none()
+            if not cfg:
+                job.finish("Configuração Asaas não encontrada para este mentor")
+                return
+            await issue_charges(db, job, cfg, mentor_id, competencia)
+        job.finish()
+    except Exception as e:
+        logger.exception("[ASAAS] lote %s falhou", job.id)
+        job.finish(str(e) or e.__class__.__name__)
@@ -0,0 +1,148 @@
+# app/services/asaas_outbox.py
+"""
+Exclusão de customers no Asaas fora da transação do aluno.
+
+- `enqueue_customer_deletions` grava a intenção no outbox (mesma transação do DELETE local).
+- `process_customer_deletions` envia os DELETEs em paralelo (limitados por
+  `ASAAS_MAX_CONCURRENCY`/`ASAAS_REQUESTS_PER_SECOND`); sucesso (ou 404) remove a linha,
+  falha incrementa `attempts`, guarda o erro e reagenda com backoff exponencial.
+- `retry_job` reprocessa periodicamente o que ficou pendente.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import select, delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.dialect import upsert_insert
+from app.db.session import AsyncSessionLocal
+from app.integrations import asaas_customers
+from app.integrations.asaas_client import AsaasClient, AsaasError, RateLimiter
+from app.modules.asaas.models import AsaasConfig, AsaasCustomerDeletion
+
+logger = logging.getLogger("mentorpro.asaas")
+
+MAX_ATTEMPTS = 8
+BATCH_SIZE = 500
+
+
+def _backoff(attempts: int) -> timedelta:
+    # 1min, 2min, 4min ... até 6h
+    return timedelta(seconds=min(60 * 2 ** max(attempts - 1, 0), 6 * 3600))
+
+
+async def enqueue_customer_deletions(db: AsyncSession, mentor_id: int, customer_ids: Iterable[Optional[str]]) -> int:
+    """Registra as exclusões pendentes (não faz commit)."""
+    now = datetime.utcnow()
+    rows = [
+        {"mentor_id": mentor_id, "customer_id": cid, "attempts": 0, "next_attempt_at": now}
+        for cid in dict.fromkeys(c for c in customer_ids if c)
+    ]
+    if not rows:
+        return 0
+    stmt = upsert_insert(db, AsaasCustomerDeletion).values(rows)
+    await db.execute(stmt.on_conflict_do_nothing(index_elements=["mentor_id", "customer_id"]))
+    return len(rows)
+
+
+async def _delete_remote(asaas: AsaasClient, sem: asyncio.Semaphore, customer_id: str) -> Optional[str]:
+    """None em caso de sucesso; mensagem de erro caso contrário."""
+    async with sem:
+        try:
+            await asaas.delete_customer(customer_id)
+        except AsaasError as e:
+            if isinstance(e.data, dict) and e.data.get("_status_code") == 404:
+                return None  # já não existe no Asaas
+            return f"{e.code}: {str(e.data)[:500]}"
+        except Exception as e:
+            return str(e) or e.__class__.__name__
+    return None
+
+
+async def process_customer_deletions(
+    db: AsyncSession,
+    mentor_id: Optional[int] = None,
+    limit: int = BATCH_SIZE,
+) -> tuple[int, int]:
+    """Processa as exclusões vencidas (de um mentor ou de todos). Retorna (ok, falhas)."""
+    now = datetime.utcnow()
+    stmt = (
+        select(AsaasCustomerDeletion.id, AsaasCustomerDeletion.mentor_id,
+               AsaasCustomerDeletion.customer_id, AsaasCustomerDeletion.attempts)
+        .where(
+            AsaasCustomerDeletion.next_attempt_at <= now,
+            AsaasCustomerDeletion.attempts < MAX_ATTEMPTS,
+        )
+        .order_by(AsaasCustomerDeletion.next_attempt_at)
+        .limit(limit)
+    )
+    if mentor_id is not None:
+        stmt = stmt.where(AsaasCustomerDeletion.mentor_id == mentor_id)
+    rows = (await db.execute(stmt)).all()
+    if not rows:
+        return 0, 0
+
+    mentor_ids = {r.mentor_id for r in rows}
+    cfgs = {
+        c.mentor_id: c
+        for c in (await db.execute(select(AsaasConfig).where(AsaasConfig.mentor_id.in_(mentor_ids)))).scalars()
+    }
+
+    done: list[int] = []
+    failed: list[dict] = []
+    sem = asyncio.Semaphore(max(1, settings.ASAAS_MAX_CONCURRENCY))
+
+    for mid in mentor_ids:
+        mine = [r for r in rows if r.mentor_id == mid]
+        cfg = cfgs.get(mid)
+        if not cfg:
+            # sem credenciais não há o que excluir no Asaas
+            done.extend(r.id for r in mine)
+            continue
+        limiter = RateLimiter(settings.ASAAS_REQUESTS_PER_SECOND)
+        async with AsaasClient(cfg.api_key, sandbox=cfg.sandbox, limiter=limiter) as asaas:
+            errors = await asyncio.gather(*(_delete_remote(asaas, sem, r.customer_id) for r in mine))
+        for r, err in zip(mine, errors):
+            if err is None:
+                done.append(r.id)
+                asaas_customers.forget(api_key=cfg.api_key, sandbox=cfg.sandbox, customer_id=r.customer_id)
+            else:
+                attempts = r.attempts + 1
+                failed.append({
+                    "id": r.id,
+                    "attempts": attempts,
+                    "last_error": err,
+                    "next_attempt_at": now + _backoff(attempts),
+                })
+                if attempts >= MAX_ATTEMPTS:
+                    logger.warning("[ASAAS] exclusão do customer %s desistida após %s tentativas: %s",
+                                   r.customer_id, attempts, err)
+
+    if done:
+        await db.execute(delete(AsaasCustomerDeletion).where(AsaasCustomerDeletion.id.in_(done)))
+    if failed:
+        await db.execute(update(AsaasCustomerDeletion), failed)
+    await db.commit()
+    return len(done), len(failed)
+
+
+async def drain_for_mentor(mentor_id: int) -> None:
+    """BackgroundTask disparada após o DELETE local: sessão própria, erros ficam no outbox."""
+    try:
+        async with AsyncSessionLocal() as db:
+            while True:
+                ok, falhas = await process_customer_deletions(db, mentor_id=mentor_id)
+                if ok + falhas < BATCH_SIZE:
+                    break
+    except Exception:
+        logger.exception("[ASAAS] falha ao processar exclusões do mentor %s", mentor_id)
+
+
+async def retry_job() -> None:
+    async with AsyncSessionLocal() as db:
+        await process_customer_deletions(db)
@@ -0,0 +1,34 @@
+# app/services/board_compaction.py
+"""
+Compactação periódica das chaves de ordenação dos quadros (CRM e atividades).
+
+Moves gravam só o card movido (`app.services.ordering`); chaves crescem quando muitos
+cards caem no mesmo intervalo. Este job reespaça, fora do horário das requisições, as
+colunas cujas chaves passaram de `ordering.COMPACT_KEY_LEN`.
+"""
+from __future__ import annotations
+
+import logging
+
+from app.db.session import AsyncSessionLocal
+from app.modules.atividades.models import Activity
+from app.modules.crm.models import CRMLead
+from app.services import ordering
+
+logger = logging.getLogger("mentorpro.ordering")
+
+BOARDS = (
+    (CRMLead, ("tenant_id", "owner_user_id", "stage_id")),
+    (Activity, ("owner_id", "stage_id")),
+)
+
+
+async def compact_job() -> None:
+    for model, scope_cols in BOARDS:
+        try:
+            async with AsyncSessionLocal() as db:
+                n = await ordering.compact(db, model, scope_cols)
+            if n:
+                logger.info("[ORDERING] %s: %s coluna(s) compactada(s)", model.__tablename__, n)
+        except Exception:
+            logger.exception("[ORDERING] falha ao compactar %s", model.__tablename__)
@@ -0,0 +1,162 @@
+# app/services/cohorts.py
+"""
+Retenção/churn/LTV por coorte de compra (mês de `Student.data_compra`).
+
+Os dados vêm em duas consultas colunares (alunos e competências pagas) e a matriz
+coorte × mês é montada com operações vetorizadas do NumPy. O resultado fica no cache
+de respostas (`app/core/cache.py`, tags "students"/"pagamentos" do mentor), com
+stale-while-revalidate.
+
+Definições:
+- ativo no mês k: o aluno ainda não tinha encerrado (data_fim) no mês coorte+k.
+  Alunos não-"Ativo" sem data_fim encerram no último mês pago (ou no mês da compra).
+- pagante no mês k: existe competência "pago" no mês coorte+k.
+- LTV: receita paga da coorte / tamanho da coorte.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, timezone
+from typing import Any
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import cache
+from app.core.config import settings
+from app.modules.financeiro.models import Pagamento
+from app.modules.students.models import Student
+
+# escritas invalidam pelas tags; o TTL só cobre a virada do mês
+CACHE_TTL_SECONDS = 3600
+
+
+def _month_idx(d: date) -> int:
+    return d.year * 12 + d.month - 1
+
+
+def _ym(idx: int) -> str:
+    return f"{idx // 12:04d}-{idx % 12 + 1:02d}"
+
+
+def _months(values) -> np.ndarray:
+    """date | 'YYYY-MM' | None -> índice absoluto de mês (ano*12 + mês-1); None vira -1."""
+    m = np.array(values, dtype="datetime64[M]")
+    return np.where(np.isnat(m), -1, m.astype(np.int64) + 1970 * 12)
+
+
+def build_cohorts(students: list[tuple], pagos: list[tuple], today: date, max_meses: int) -> dict[str, Any]:
+    """
+    students: (id, data_compra, data_fim, status) — só alunos com data_compra.
+    pagos: (student_id, competencia 'YYYY-MM', valor) — só status 'pago'.
+    """
+    today_idx = _month_idx(today)
+    if not students:
+        return {"meses": 0, "cohorts": [], "churn_medio": []}
+
+    s_ids, s_compra, s_fim, s_status = zip(*students)
+    ids = np.array(s_ids, dtype=np.int64)
+    cohort = _months(s_compra)
+    fim = _months(s_fim)
+    ativo = np.array(s_status, dtype=object) == "Ativo"
+
+    order = np.argsort(ids)
+    ids_sorted = ids[order]
+
+    # competências pagas -> (posição do aluno, índice do mês)
+    if pagos:
+        p_sids, p_comps, p_vals = zip(*pagos)
+        p_sid = np.array(p_sids, dtype=np.int64)
+        p_idx = _months(p_comps)
+        p_val = np.array([0 if v is None else v for v in p_vals], dtype=np.float64)
+        pos = np.searchsorted(ids_sorted, p_sid)
+        pos = np.clip(pos, 0, len(ids_sorted) - 1)
+        known = ids_sorted[pos] == p_sid           # ignora pagamentos de alunos sem data_compra
+        p_row = order[pos[known]]
+        p_idx, p_val = p_idx[known], p_val[known]
+    else:
+        p_row = np.empty(0, dtype=np.int64)
+        p_idx = np.empty(0, dtype=np.int64)
+        p_val = np.empty(0, dtype=np.float64)
+
+    # último mês ativo de cada aluno
+    last_paid = np.full(len(ids), -1, dtype=np.int64)
+    np.maximum.at(last_paid, p_row, p_idx)
+    last_active = np.where(fim >= 0, fim, np.where(ativo, today_idx, np.maximum(last_paid, cohort)))
+
+    cohorts, inv = np.unique(cohort, return_inverse=True)
+    n_c = len(cohorts)
+    horizon = int(min(max_meses, today_idx - cohorts.min() + 1))
+    horizon = max(horizon, 1)
+    offsets = np.arange(horizon)
+
+    # alunos × meses (bool) -> soma por coorte
+    month_at = cohort[:, None] + offsets[None, :]
+    alive = (last_active[:, None] >= month_at) & (month_at <= today_idx)
+    ativos = np.zeros((n_c, horizon), dtype=np.int64)
+    np.add.at(ativos, inv, alive.astype(np.int64))
+
+    pagantes = np.zeros((n_c, horizon), dtype=np.int64)
+    p_off = p_idx - cohort[p_row]
+    in_range = (p_off >= 0) & (p_off < horizon)
+    np.add.at(pagantes, (inv[p_row[in_range]], p_off[in_range]), 1)
+
+    tamanho = np.bincount(inv, minlength=n_c)
+    receita = np.bincount(inv[p_row], weights=p_val, minlength=n_c) if len(p_row) else np.zeros(n_c)
+
+    observable = (cohorts[:, None] + offsets[None, :]) <= today_idx
+    with np.errstate(divide="ignore", invalid="ignore"):
+        retencao = np.where(observable, ativos / tamanho[:, None], np.nan)
+        retencao_pag = np.where(observable, pagantes / tamanho[:, None], np.nan)
+
+    # churn médio ponderado por mês de vida (k vs k-1, só coortes observáveis em k)
+    mask = observable[:, 1:]
+    base = (ativos[:, :-1] * mask).sum(axis=0)
+    kept = (ativos[:, 1:] * mask).sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        churn = np.concatenate([[np.nan], np.where(base > 0, 1 - kept / base, np.nan)])
+
+    def _row(a: np.ndarray) -> list:
+        return [None if np.isnan(v) else round(float(v), 4) for v in a]
+
+    return {
+        "meses": horizon,
+        "cohorts": [
+            {
+                "cohort": _ym(int(cohorts[i])),
+                "tamanho": int(tamanho[i]),
+                "ativos": [int(v) for v in ativos[i][observable[i]]],
+                "pagantes": [int(v) for v in pagantes[i][observable[i]]],
+                "retencao": _row(retencao[i]),
+                "retencao_pagantes": _row(retencao_pag[i]),
+                "receita": round(float(receita[i]), 2),
+                "ltv": round(float(receita[i] / tamanho[i]), 2),
+            }
+            for i in range(n_c)
+        ],
+        "churn_medio": _row(churn),
+    }
+
+
+async def _compute(db: AsyncSession, mentor_id: int, max_meses: int) -> dict[str, Any]:
+    students = (await db.execute(
+        select(Student.id, Student.data_compra, Student.data_fim, Student.status)
+        .where(Student.mentor_id == mentor_id, Student.data_compra.is_not(None))
+    )).all()
+    pagos = (await db.execute(
+        select(Pagamento.student_id, Pagamento.competencia, Pagamento.valor)
+        .where(Pagamento.mentor_id == mentor_id, Pagamento.status_pagamento == "pago")
+    )).all()
+
+    result = build_cohorts(students, pagos, date.today(), max_meses)
+    result["gerado_em"] = datetime.now(timezone.utc).isoformat()
+    return result
+
+
+async def get_cohorts(db: AsyncSession, mentor_id: int, max_meses: int = 24) -> dict[str, Any]:
+    return await cache.cached(
+        db, mentor_id=mentor_id, route="metrics.cohorts", params=max_meses,
+        tags=["students", "pagamentos"], ttl=CACHE_TTL_SECONDS,
+        stale=settings.DASHBOARD_CACHE_STALE_SECONDS,
+        loader=lambda s: _compute(s, mentor_id, max_meses),
+    )
@@ -0,0 +1,156 @@
+# app/services/events.py
+"""
+Pub/sub de eventos de mudança para o SSE (`GET /api/v1/events/stream`).
+
+- Canal = tenant. `publish(tenant_id, tipo, **dados)` é síncrono e não bloqueia: chame
+  depois do commit. Eventos são compactos (ids, stage, chave de ordem); o cliente busca
+  o resto via GET .../changes se precisar.
+- Cada conexão SSE tem uma fila limitada; se o cliente não acompanhar, eventos são
+  descartados e ele recebe um `resync` (recarregar via /changes).
+- `EVENTS_PG_NOTIFY=true` (Postgres): publica com `pg_notify` e cada instância faz
+  `LISTEN`, entregando às conexões locais — cobre deploy com várias instâncias.
+  Exige conexão direta (LISTEN não funciona atrás de pooler em modo transação).
+"""
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import logging
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+from sqlalchemy.engine.url import make_url
+
+from app.core.config import settings
+
+logger = logging.getLogger("mentorpro.events")
+
+QUEUE_SIZE = 256
+PG_CHANNEL = "mentorpro_events"
+PG_RECONNECT_SECONDS = 5
+
+
+class Subscription:
+    def __init__(self, tenant_id: str) -> None:
+        self.tenant_id = tenant_id
+        self.queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(QUEUE_SIZE)
+        self.overflow = False
+
+    def push(self, event: dict[str, Any]) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflow = True
+
+
+_subs: dict[str, set[Subscription]] = defaultdict(set)
+_seq = itertools.count(1)
+_tasks: set[asyncio.Task] = set()
+
+
+@contextmanager
+def subscribe(tenant_id: str) -> Iterator[Subscription]:
+    sub = Subscription(tenant_id)
+    _subs[tenant_id].add(sub)
+    try:
+        yield sub
+    finally:
+        _subs[tenant_id].discard(sub)
+        if not _subs[tenant_id]:
+            _subs.pop(tenant_id, None)
+
+
+def _deliver(tenant_id: str, event: dict[str, Any]) -> None:
+    for sub in list(_subs.get(tenant_id, ())):
+        sub.push(event)
+
+
+def publish(tenant_id: Optional[str], type_: str, **data: Any) -> None:
+    """Publica um evento no canal do tenant (local ou via Postgres NOTIFY)."""
+    if not tenant_id:
+        return
+    event = {"type": type_, "seq": next(_seq), **data}
+    if _pg.active:
+        task = asyncio.get_running_loop().create_task(_pg.notify(tenant_id, event))
+        _tasks.add(task)
+        task.add_done_callback(_tasks.discard)
+    else:
+        _deliver(tenant_id, event)
+
+
+# ---------------- fan-out via Postgres ----------------
+
+class _PgFanout:
+    def __init__(self) -> None:
+        self.active = False
+        self._conninfo: Optional[str] = None
+        self._notify_conn = None
+        self._lock = asyncio.Lock()
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        url = make_url(settings.DATABASE_URL) if settings.DATABASE_URL else None
+        if url is None or url.get_backend_name() != "postgresql":
+            logger.warning("[EVENTS] EVENTS_PG_NOTIFY ignorado: banco não é Postgres")
+            return
+        self._conninfo = url.set(drivername="postgresql").render_as_string(hide_password=False)
+        self._listener = asyncio.create_task(self._listen())
+        self.active = True
+
+    async def stop(self) -> None:
+        self.active = False
+        if self._listener:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+        if self._notify_conn is not None:
+            await self._notify_conn.close()
+            self._notify_conn = None
+
+    async def _connect(self):
+        import psycopg  # psycopg 3 (requirements)
+
+        return await psycopg.AsyncConnection.connect(self._conninfo, autocommit=True)
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                conn = await self._connect()
+                async with conn:
+                    await conn.execute(f"LISTEN {PG_CHANNEL}")
+                    async for n in conn.notifies():
+                        try:
+                            msg = json.loads(n.payload)
+                            _deliver(msg["t"], msg["e"])
+                        except Exception:
+                            logger.exception("[EVENTS] payload inválido no NOTIFY")
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("[EVENTS] LISTEN caiu; reconectando em %ss", PG_RECONNECT_SECONDS)
+                await asyncio.sleep(PG_RECONNECT_SECONDS)
+
+    async def notify(self, tenant_id: str, event: dict[str, Any]) -> None:
+        payload = json.dumps({"t": tenant_id, "e": event}, separators=(",", ":"), default=str)
+        try:
+            async with self._lock:
+                if self._notify_conn is None or self._notify_conn.closed:
+                    self._notify_conn = await self._connect()
+                await self._notify_conn.execute("SELECT pg_notify(%s, %s)", (PG_CHANNEL, payload))
+        except Exception:
+            logger.exception("[EVENTS] NOTIFY falhou; entregando só nesta instância")
+            self._notify_conn = None
+            _deliver(tenant_id, event)
+
+
+_pg = _PgFanout()
+
+
+async def start() -> None:
+    if settings.EVENTS_PG_NOTIFY:
+        await _pg.start()
+
+
+async def stop() -> None:
+    await _pg.stop()
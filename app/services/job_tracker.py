@@ -0,0 +1,79 @@
+# app/services/job_tracker.py
+"""
+Registro em memória de jobs assíncronos (ex.: emissão de cobranças em lote), consultados
+por id pelo próprio mentor. O estado vive no processo: com várias instâncias, o GET de
+progresso precisa cair na mesma máquina que criou o job.
+"""
+from __future__ import annotations
+
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+# jobs concluídos ficam consultáveis por este tempo
+RETENTION_SECONDS = 3600
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    mentor_id: int
+    status: str = "pendente"  # pendente | executando | concluido | erro
+    total: int = 0
+    processados: int = 0
+    sucesso: int = 0
+    falhas: int = 0
+    erro: Optional[str] = None
+    meta: dict[str, Any] = field(default_factory=dict)
+    resultados: list[dict[str, Any]] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+    def add_result(self, ok: bool, **item: Any) -> None:
+        self.processados += 1
+        if ok:
+            self.sucesso += 1
+        else:
+            self.falhas += 1
+        self.resultados.append({"ok": ok, **item})
+
+    def finish(self, erro: Optional[str] = None) -> None:
+        self.status = "erro" if erro else "concluido"
+        self.erro = erro
+        self.finished_at = time.time()
+
+
+_JOBS: dict[str, Job] = {}
+
+
+def _purge() -> None:
+    limit = time.time() - RETENTION_SECONDS
+    for job_id in [k for k, j in _JOBS.items() if j.finished_at and j.finished_at < limit]:
+        _JOBS.pop(job_id, None)
+
+
+def create(kind: str, mentor_id: int, **meta: Any) -> Job:
+    _purge()
+    job = Job(id=uuid.uuid4().hex, kind=kind, mentor_id=mentor_id, meta=meta)
+    _JOBS[job.id] = job
+    return job
+
+
+def find_active(kind: str, mentor_id: int, **meta: Any) -> Optional[Job]:
+    """Job ainda não concluído do mesmo tipo/mentor com os mesmos `meta` (ex.: competência)."""
+    for job in _JOBS.values():
+        if (
+            job.kind == kind and job.mentor_id == mentor_id and job.finished_at is None
+            and all(job.meta.get(k) == v for k, v in meta.items())
+        ):
+            return job
+    return None
+
+
+def get(job_id: str, mentor_id: int) -> Optional[Job]:
+    job = _JOBS.get(job_id)
+    if job is None or job.mentor_id != mentor_id:
+        return None
+    return job
@@ -0,0 +1,155 @@
+# app/services/metrics_engine.py
+"""
+MRR/assinantes incrementais.
+
+- `apply_student_change` aplica o delta de um aluno (antes/depois) no contador do mentor,
+  na mesma transação da escrita do aluno.
+- `recompute_mrr` refaz o agregado completo (usado em escritas em lote, mudanças de
+  produto e para semear o contador).
+- `snapshot_job` grava 1 ponto por mentor/dia em `metrics_mrr_snapshots`.
+"""
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal
+from typing import Optional, Tuple
+
+from sqlalchemy import select, update, func, literal, Date
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.dialect import upsert_insert
+from app.db.session import AsyncSessionLocal
+from app.modules.metrics.models import MrrCounter, MrrSnapshot
+from app.modules.products.models import Product
+from app.modules.students.models import Student
+
+# Durações consideradas "recorrentes" (não inclui trimestral/semestral/anual à vista)
+DURACOES_RECORRENTES = ("recorrente", "mensal")
+
+# (plano, status) — tudo o que importa de um aluno para o MRR
+StudentState = Tuple[Optional[str], Optional[str]]
+
+
+def student_state(st: Student) -> StudentState:
+    return (st.plano, st.status)
+
+
+async def _aggregate(db: AsyncSession, mentor_id: int) -> tuple[Decimal, int]:
+    # Join por nome do plano (Student.plano == Product.nome) e pelo mentor_id
+    stmt = (
+        select(func.coalesce(func.sum(Product.valor), 0), func.count())
+        .select_from(Student)
+        .join(
+            Product,
+            (Product.nome == Student.plano) & (Product.mentor_id == Student.mentor_id),
+        )
+        .where(
+            Student.mentor_id == mentor_id,
+            Student.status == "Ativo",
+            Product.duracao.in_(DURACOES_RECORRENTES),
+        )
+    )
+    total, qtd = (await db.execute(stmt)).one_or_none() or (0, 0)
+    return Decimal(str(total or 0)), int(qtd or 0)
+
+
+async def recompute_mrr(db: AsyncSession, mentor_id: int) -> tuple[float, int]:
+    """Recalcula o agregado completo e grava no contador (não faz commit)."""
+    total, qtd = await _aggregate(db, mentor_id)
+    stmt = upsert_insert(db, MrrCounter).values(mentor_id=mentor_id, mrr=total, assinantes=qtd)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[MrrCounter.mentor_id],
+        set_={"mrr": stmt.excluded.mrr, "assinantes": stmt.excluded.assinantes, "updated_at": func.now()},
+    )
+    await db.execute(stmt)
+    return float(total), qtd
+
+
+async def _contribution(db: AsyncSession, mentor_id: int, state: StudentState | None) -> tuple[Decimal, int]:
+    """Quanto um aluno nesse estado soma ao agregado (mesma semântica do join de `_aggregate`)."""
+    if not state:
+        return Decimal(0), 0
+    plano, status_ = state
+    if status_ != "Ativo" or not plano:
+        return Decimal(0), 0
+    res = await db.execute(
+        select(func.coalesce(func.sum(Product.valor), 0), func.count(Product.id)).where(
+            Product.mentor_id == mentor_id,
+            Product.nome == plano,
+            Product.duracao.in_(DURACOES_RECORRENTES),
+        )
+    )
+    total, qtd = res.one()
+    return Decimal(str(total or 0)), int(qtd or 0)
+
+
+async def apply_student_change(
+    db: AsyncSession,
+    mentor_id: int,
+    before: StudentState | None,
+    after: StudentState | None,
+) -> None:
+    """
+    Aplica o delta (after - before) no contador do mentor. Chamar antes do commit da escrita
+    do aluno. Se o contador ainda não existir, semeia com o agregado completo.
+    """
+    if before == after:
+        return
+    v_before, n_before = await _contribution(db, mentor_id, before)
+    v_after, n_after = await _contribution(db, mentor_id, after)
+    d_valor, d_qtd = v_after - v_before, n_after - n_before
+    if not d_valor and not d_qtd:
+        return
+
+    res = await db.execute(
+        update(MrrCounter)
+        .where(MrrCounter.mentor_id == mentor_id)
+        .values(mrr=MrrCounter.mrr + d_valor, assinantes=MrrCounter.assinantes + d_qtd)
+    )
+    if not res.rowcount:
+        await recompute_mrr(db, mentor_id)
+
+
+async def current_mrr(db: AsyncSession, mentor_id: int) -> tuple[float, int]:
+    """Valor atual lido do contador; semeia (e faz commit) na primeira leitura."""
+    row = (await db.execute(
+        select(MrrCounter.mrr, MrrCounter.assinantes).where(MrrCounter.mentor_id == mentor_id)
+    )).one_or_none()
+    if row is not None:
+        return float(row[0] or 0), int(row[1] or 0)
+    result = await recompute_mrr(db, mentor_id)
+    await db.commit()
+    return result
+
+
+async def snapshot_counters(db: AsyncSession, dia: date | None = None) -> None:
+    """Copia todos os contadores para a série diária (upsert por mentor/dia)."""
+    dia = dia or date.today()
+
+    # semeia contadores de mentores que ainda não têm (ex.: nunca abriram o dashboard)
+    missing = (await db.execute(
+        select(Student.mentor_id)
+        .where(~select(MrrCounter.mentor_id).where(MrrCounter.mentor_id == Student.mentor_id).exists())
+        .distinct()
+    )).scalars().all()
+    for mentor_id in missing:
+        await recompute_mrr(db, mentor_id)
+
+    src = select(
+        MrrCounter.mentor_id,
+        literal(dia, Date),
+        MrrCounter.mrr,
+        MrrCounter.assinantes,
+    ).where(MrrCounter.mentor_id.is_not(None))  # WHERE exigido pelo SQLite em INSERT..SELECT..ON CONFLICT
+    stmt = upsert_insert(db, MrrSnapshot).from_select(["mentor_id", "dia", "mrr", "assinantes"], src)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[MrrSnapshot.mentor_id, MrrSnapshot.dia],
+        set_={"mrr": stmt.excluded.mrr, "assinantes": stmt.excluded.assinantes},
+    )
+    await db.execute(stmt)
+
+
+async def snapshot_job() -> None:
+    async with AsyncSessionLocal() as db:
+        await snapshot_counters(db)
+        await db.commit()
@@ -0,0 +1,404 @@
+# app/services/ordering.py
+"""
+Ordenação de quadros (kanban) por chaves fracionárias (estilo LexoRank).
+
+Cada item guarda uma string `order_key`; a ordem da coluna é `ORDER BY order_key, id`.
+Mover um card só grava o card movido: a nova chave fica entre as chaves dos vizinhos
+(`key_between`). Chaves só crescem quando muitos inserts caem no mesmo intervalo; nesse
+caso a coluna é rebalanceada (`rebalance`) fora da requisição. Exclusões não renumeram
+nada (buracos entre chaves são válidos); a única reescrita em lote é a do rebalance/
+compactação, com SQL específico por dialeto (`_bulk_set_keys`).
+
+Algoritmo: "fractional indexing" (parte inteira de tamanho variável + fração) em base 62.
+As chaves usam só [0-9A-Za-z], comparadas byte a byte (no Postgres a coluna usa COLLATE "C").
+"""
+from __future__ import annotations
+
+import logging
+from itertools import groupby
+from typing import Any, Optional, Sequence
+
+from sqlalchemy import String, Table, bindparam, column, func, select, text, update, values
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import etag
+from app.db import ddl
+from app.db.dialect import dialect_name
+from app.db.session import AsyncSessionLocal
+
+logger = logging.getLogger("mentorpro.ordering")
+
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+_ZERO = DIGITS[0]
+_SMALLEST_INT = "A" + _ZERO * 26
+
+# acima disso a coluna é rebalanceada em background (logo após o move)
+MAX_KEY_LEN = 24
+# acima disso a compactação periódica reespaça a coluna
+COMPACT_KEY_LEN = 12
+# linhas por statement na reescrita em lote
+RENUMBER_CHUNK = 1000
+
+
+def key_type(length: int = 64):
+    """Tipo da coluna de chave: comparação binária no Postgres."""
+    return String(length).with_variant(String(length, collation="C"), "postgresql")
+
+
+# ---------------- algoritmo ----------------
+
+def _midpoint(a: str, b: Optional[str]) -> str:
+    """Fração entre `a` e `b` (a < b; b None = +infinito). Nenhuma termina em zero."""
+    if b is not None:
+        n = 0
+        while (a[n] if n < len(a) else _ZERO) == b[n]:
+            n += 1
+        if n > 0:
+            return b[:n] + _midpoint(a[n:], b[n:])
+    digit_a = DIGITS.index(a[0]) if a else 0
+    digit_b = DIGITS.index(b[0]) if b is not None else len(DIGITS)
+    if digit_b - digit_a > 1:
+        return DIGITS[(digit_a + digit_b + 1) // 2]
+    if b is not None and len(b) > 1:
+        return b[:1]
+    return DIGITS[digit_a] + _midpoint(a[1:], None)
+
+
+def _integer_length(head: str) -> int:
+    if "a" <= head <= "z":
+        return ord(head) - ord("a") + 2
+    if "A" <= head <= "Z":
+        return ord("Z") - ord(head) + 2
+    raise ValueError(f"chave de ordenação inválida: {head!r}")
+
+
+def _integer_part(key: str) -> str:
+    n = _integer_length(key[0])
+    if n > len(key):
+        raise ValueError(f"chave de ordenação inválida: {key!r}")
+    return key[:n]
+
+
+def _validate(key: str) -> None:
+    if key == _SMALLEST_INT:
+        raise ValueError(f"chave de ordenação inválida: {key!r}")
+    if key[len(_integer_part(key)):].endswith(_ZERO):
+        raise ValueError(f"chave de ordenação inválida: {key!r}")
+
+
+def _increment_integer(x: str) -> Optional[str]:
+    head, digs = x[0], list(x[1:])
+    carry = True
+    for i in reversed(range(len(digs))):
+        d = DIGITS.index(digs[i]) + 1
+        if d == len(DIGITS):
+            digs[i] = _ZERO
+        else:
+            digs[i] = DIGITS[d]
+            carry = False
+            break
+    if not carry:
+        return head + "".join(digs)
+    if head == "Z":
+        return "a" + _ZERO
+    if head == "z":
+        return None
+    h = chr(ord(head) + 1)
+    if h > "a":
+        digs.append(_ZERO)
+    else:
+        digs.pop()
+    return h + "".join(digs)
+
+
+def _decrement_integer(x: str) -> Optional[str]:
+    head, digs = x[0], list(x[1:])
+    borrow = True
+    for i in reversed(range(len(digs))):
+        d = DIGITS.index(digs[i]) - 1
+        if d == -1:
+            digs[i] = DIGITS[-1]
+        else:
+            digs[i] = DIGITS[d]
+            borrow = False
+            break
+    if not borrow:
+        return head + "".join(digs)
+    if head == "a":
+        return "Z" + DIGITS[-1]
+    if head == "A":
+        return None
+    h = chr(ord(head) - 1)
+    if h < "Z":
+        digs.append(DIGITS[-1])
+    else:
+        digs.pop()
+    return h + "".join(digs)
+
+
+def key_between(a: Optional[str], b: Optional[str]) -> str:
+    """Chave estritamente entre `a` e `b` (None = início/fim da coluna)."""
+    if a is not None:
+        _validate(a)
+    if b is not None:
+        _validate(b)
+    if a is not None and b is not None and a >= b:
+        raise ValueError(f"{a!r} >= {b!r}")
+
+    if a is None:
+        if b is None:
+            return "a" + _ZERO
+        ib = _integer_part(b)
+        fb = b[len(ib):]
+        if ib == _SMALLEST_INT:
+            return ib + _midpoint("", fb)
+        if ib < b:
+            return ib
+        res = _decrement_integer(ib)
+        if res is None:
+            raise ValueError("não há chave antes de " + b)
+        return res
+
+    if b is None:
+        ia = _integer_part(a)
+        fa = a[len(ia):]
+        i = _increment_integer(ia)
+        return ia + _midpoint(fa, None) if i is None else i
+
+    ia = _integer_part(a)
+    fa = a[len(ia):]
+    ib = _integer_part(b)
+    fb = b[len(ib):]
+    if ia == ib:
+        return ia + _midpoint(fa, fb)
+    i = _increment_integer(ia)
+    if i is None:
+        raise ValueError("não há chave após " + a)
+    if i < b:
+        return i
+    return ia + _midpoint(fa, None)
+
+
+def keys_between(a: Optional[str], b: Optional[str], n: int) -> list[str]:
+    """`n` chaves crescentes entre `a` e `b`, distribuídas para ficarem curtas."""
+    if n <= 0:
+        return []
+    if n == 1:
+        return [key_between(a, b)]
+    if b is None:
+        out = [key_between(a, None)]
+        for _ in range(n - 1):
+            out.append(key_between(out[-1], None))
+        return out
+    if a is None:
+        out = [key_between(None, b)]
+        for _ in range(n - 1):
+            out.append(key_between(None, out[-1]))
+        out.reverse()
+        return out
+    mid = n // 2
+    c = key_between(a, b)
+    return [*keys_between(a, c, mid), c, *keys_between(c, b, n - mid - 1)]
+
+
+def needs_rebalance(key: Optional[str]) -> bool:
+    return key is not None and len(key) > MAX_KEY_LEN
+
+
+# ---------------- banco ----------------
+
+async def last_key(db: AsyncSession, key_col: Any, scope: Sequence[Any]) -> Optional[str]:
+    return (await db.execute(
+        select(key_col).where(*scope, key_col.is_not(None)).order_by(key_col.desc()).limit(1)
+    )).scalar_one_or_none()
+
+
+async def key_for_position(
+    db: AsyncSession,
+    model: Any,
+    scope: Sequence[Any],
+    position: Optional[int],
+    exclude_id: Optional[Any] = None,
+) -> Optional[str]:
+    """
+    Chave para inserir um item na posição `position` (0 = topo; None/excedente = fim) da
+    coluna definida por `scope`, lendo só os dois vizinhos pelo índice (scope..., order_key).
+    Retorna None quando os vizinhos têm chaves iguais/ausentes (coluna precisa de rebalance).
+    """
+    key_col, id_col = model.order_key, model.id
+    conds = [*scope]
+    if exclude_id is not None:
+        conds.append(id_col != exclude_id)
+
+    if position is None or position < 0:
+        return key_between(await last_key(db, key_col, conds), None)
+
+    lo = max(position - 1, 0)
+    rows = (await db.execute(
+        select(key_col).where(*conds).order_by(key_col, id_col).offset(lo).limit(2)
+    )).scalars().all()
+
+    if any(k is None for k in rows):
+        return None  # coluna ainda sem chaves (legado)
+    if position == 0:
+        before, after = None, (rows[0] if rows else None)
+    elif not rows:  # posição além do fim
+        before, after = await last_key(db, key_col, conds), None
+    else:
+        before, after = rows[0], (rows[1] if len(rows) > 1 else None)
+
+    if before is not None and after is not None and before >= after:
+        return None
+    return key_between(before, after)
+
+
+async def move_key(
+    db: AsyncSession,
+    model: Any,
+    scope: Sequence[Any],
+    position: Optional[int],
+    exclude_id: Optional[Any] = None,
+) -> str:
+    """
+    `key_for_position`; se a coluna tiver chaves repetidas/ausentes (dados legados),
+    reespaça a coluna na mesma transação e tenta de novo.
+    """
+    key = await key_for_position(db, model, scope, position, exclude_id)
+    if key is None:
+        await rebalance(db, model, scope)
+        key = await key_for_position(db, model, scope, position, exclude_id)
+    return key
+
+
+async def rebalance(db: AsyncSession, model: Any, scope: Sequence[Any]) -> int:
+    """
+    Reescreve as chaves da coluna com espaçamento uniforme, mantendo a ordem (linhas sem
+    chave vão para o fim, pela ordem legada de order_index). Sem commit.
+    """
+    ids = (await db.execute(
+        select(model.id).where(*scope).order_by(model.order_key.nulls_last(), model.order_index, model.id)
+    )).scalars().all()
+    if not ids:
+        return 0
+    await _bulk_set_keys(db, model, list(zip(ids, keys_between(None, None, len(ids)))))
+    await etag.touch(db, model, scope)
+    return len(ids)
+
+
+async def _bulk_set_keys(db: AsyncSession, model: Any, pairs: list[tuple[Any, str]]) -> None:
+    """
+    Grava (id, order_key) em lote. Postgres: um `UPDATE ... FROM (VALUES ...)` por bloco;
+    demais bancos (SQLite): executemany do UPDATE por PK.
+    """
+    table = model.__table__
+    if dialect_name(db) == "postgresql":
+        id_type, key_type_ = table.c.id.type, table.c.order_key.type
+        for i in range(0, len(pairs), RENUMBER_CHUNK):
+            v = values(column("id", id_type), column("k", key_type_), name="v").data(pairs[i:i + RENUMBER_CHUNK])
+            await db.execute(update(table).where(table.c.id == v.c.id).values(order_key=v.c.k))
+        return
+    await db.execute(update(model), [{"id": i, "order_key": k} for i, k in pairs])
+
+
+async def rebalance_column(model: Any, scope: dict[str, Any]) -> None:
+    """BackgroundTask: reespaça a coluna (`scope` = {coluna: valor}) com sessão própria."""
+    try:
+        async with AsyncSessionLocal() as db:
+            await rebalance(db, model, [getattr(model, k) == v for k, v in scope.items()])
+            await db.commit()
+    except Exception:
+        logger.exception("[ORDERING] falha ao rebalancear %s %s", model.__tablename__, scope)
+
+
+def with_positions(rows: Sequence[Any], schema: Any, column_of: Any) -> list:
+    """
+    Serializa `rows` (já ordenadas por coluna/order_key) com `order_index` = posição
+    na coluna; `column_of(row)` identifica a coluna.
+    """
+    out, pos = [], {}
+    for row in rows:
+        col = column_of(row)
+        i = pos.get(col, 0)
+        pos[col] = i + 1
+        out.append(schema.model_validate(row).model_copy(update={"order_index": i}))
+    return out
+
+
+async def compact(
+    db: AsyncSession,
+    model: Any,
+    scope_cols: Sequence[str],
+    max_len: Optional[int] = None,
+    limit: int = 100,
+) -> int:
+    """
+    Rebalanceia as colunas (agrupadas por `scope_cols`) que têm chaves maiores que `max_len`
+    ou linhas ainda sem chave. Faz commit por coluna. Retorna quantas colunas foram reescritas.
+    """
+    max_len = COMPACT_KEY_LEN if max_len is None else max_len
+    scope = [getattr(model, c) for c in scope_cols]
+    groups = (await db.execute(
+        select(*scope)
+        .group_by(*scope)
+        .having(
+            (func.max(func.length(model.order_key)) > max_len)
+            | (func.count(model.order_key) < func.count())
+        )
+        .limit(limit)
+    )).all()
+    for values in groups:
+        await rebalance(db, model, [c == v for c, v in zip(scope, values)])
+        await db.commit()
+    return len(groups)
+
+
+# ---------------- DDL (coluna + backfill + índice) ----------------
+
+def _backfill_sync(conn: Connection, table: Table, scope_cols: Sequence[str]) -> None:
+    """Gera chaves para linhas sem order_key, respeitando o order_index legado."""
+    scope = [table.c[c] for c in scope_cols]
+    rows = conn.execute(
+        select(*scope, table.c.id)
+        .where(table.c.order_key.is_(None))
+        .order_by(*scope, table.c.order_index, table.c.id)
+    ).all()
+    params = []
+    for group_key, group in groupby(rows, key=lambda r: tuple(r[: len(scope)])):
+        ids = [r[-1] for r in group]
+        start = conn.execute(
+            select(func.max(table.c.order_key)).where(*(c == v for c, v in zip(scope, group_key)))
+        ).scalar()
+        params += [{"b_id": i, "order_key": k} for i, k in zip(ids, keys_between(start, None, len(ids)))]
+    if params:
+        conn.execute(update(table).where(table.c.id == bindparam("b_id")), params)
+
+
+def register_order_key_ddl(
+    table: Table,
+    scope_cols: Sequence[str],
+    index_name: str,
+    drop_indexes: Sequence[str] = (),
+) -> None:
+    """
+    Registra no `app.db.ddl` a criação de `order_key` em tabelas já existentes, o backfill
+    a partir de `order_index` e o índice (scope..., order_key) usado pelas leituras/moves.
+    """
+    name = f"{table.name}_order_key"
+    cols = ", ".join([*scope_cols, "order_key"])
+
+    def make_step(col_type: str):
+        def step(conn: Connection) -> Optional[bool]:
+            if not ddl.has_table(conn, table.name):
+                return False
+            if not ddl.has_column(conn, table.name, "order_key"):
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN order_key {col_type}"))
+            _backfill_sync(conn, table, scope_cols)
+            for ix in drop_indexes:
+                conn.execute(text(f"DROP INDEX IF EXISTS {ix}"))
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table.name} ({cols})"))
+            return True
+        return step
+
+    ddl.register(name, "postgresql")(make_step('varchar(64) COLLATE "C"'))
+    ddl.register(name, "sqlite")(make_step("VARCHAR(64)"))
@@ -0,0 +1,44 @@
+# app/services/overdue_sweeper.py
+"""
+Marca como "atrasado" as competências "pendente" com due_date < hoje.
+Um UPDATE set-based por lote (via índice parcial ix_pagto_pendente_due), com commit
+por lote para não segurar locks em tabelas grandes.
+"""
+from __future__ import annotations
+
+from datetime import date
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import AsyncSessionLocal
+from app.modules.financeiro.models import Pagamento
+
+BATCH_SIZE = 1000
+
+
+async def sweep_overdue(db: AsyncSession, today: date | None = None, batch_size: int = BATCH_SIZE) -> int:
+    today = today or date.today()
+    total = 0
+    while True:
+        batch = (
+            select(Pagamento.id)
+            .where(Pagamento.status_pagamento == "pendente", Pagamento.due_date < today)
+            .limit(batch_size)
+        )
+        res = await db.execute(
+            update(Pagamento)
+            .where(Pagamento.id.in_(batch))
+            .values(status_pagamento="atrasado")
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        n = res.rowcount or 0
+        total += n
+        if n < batch_size:
+            return total
+
+
+async def sweep_job() -> None:
+    async with AsyncSessionLocal() as db:
+        await sweep_overdue(db)
@@ -0,0 +1,47 @@
+# app/services/scheduler.py
+"""
+Agendador mínimo de jobs em background (asyncio), iniciado no lifespan do app.
+Cada job roda em loop no próprio processo; jobs precisam ser idempotentes, pois
+com várias instâncias (Fly) cada máquina executa a sua cópia.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+logger = logging.getLogger("mentorpro.scheduler")
+
+
+@dataclass
+class PeriodicJob:
+    name: str
+    interval: float | None                 # segundos entre execuções; None = roda uma vez na subida
+    func: Callable[[], Awaitable[object]]
+    initial_delay: float = 0.0
+
+
+async def _run(job: PeriodicJob) -> None:
+    if job.initial_delay:
+        await asyncio.sleep(job.initial_delay)
+    while True:
+        try:
+            await job.func()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("[JOB] %s falhou", job.name)
+        if job.interval is None:
+            return
+        await asyncio.sleep(job.interval)
+
+
+def start(jobs: list[PeriodicJob]) -> list[asyncio.Task]:
+    return [asyncio.create_task(_run(job), name=f"job:{job.name}") for job in jobs]
+
+
+async def stop(tasks: list[asyncio.Task]) -> None:
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
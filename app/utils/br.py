@@ -1,6 +1,19 @@
 # app/utils/br.py
 import re
 
+from app.utils.text import strip_accents_lower
+
+UFS = {
+    "AC": "Acre", "AL": "Alagoas", "AP": "Amapá", "AM": "Amazonas", "BA": "Bahia",
+    "CE": "Ceará", "DF": "Distrito Federal", "ES": "Espírito Santo", "GO": "Goiás",
+    "MA": "Maranhão", "MT": "Mato Grosso", "MS": "Mato Grosso do Sul", "MG": "Minas Gerais",
+    "PA": "Pará", "PB": "Paraíba", "PR": "Paraná", "PE": "Pernambuco", "PI": "Piauí",
+    "RJ": "Rio de Janeiro", "RN": "Rio Grande do Norte", "RS": "Rio Grande do Sul",
+    "RO": "Rondônia", "RR": "Roraima", "SC": "Santa Catarina", "SP": "São Paulo",
+    "SE": "Sergipe", "TO": "Tocantins",
+}
+_UF_BY_NAME = {strip_accents_lower(nome): uf for uf, nome in UFS.items()}
+
 def only_digits(s: str | None) -> str:
     return re.sub(r"\D+", "", s or "")
 
@@ -14,3 +27,10 @@ def normalize_mobile_phone(value: str | None) -> str | None:
     # Asaas aceita strings como "11987654321" (DDI opcional); vamos enviar só dígitos
     digits = only_digits(value)
     return digits or None
+
+def normalize_uf(value: str | None) -> str | None:
+    """'sp' / 'São Paulo' / 'SAO PAULO' -> 'SP'; None se não for uma UF válida."""
+    key = " ".join(strip_accents_lower(value).split())
+    if key.upper() in UFS:
+        return key.upper()
+    return _UF_BY_NAME.get(key)
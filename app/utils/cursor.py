@@ -0,0 +1,29 @@
+# app/utils/cursor.py
+import base64
+import json
+from typing import Any
+
+
+def encode_cursor(*values: Any) -> str:
+    """Cursor opaco (base64 url-safe de um array JSON) para paginação por chave."""
+    raw = json.dumps(list(values), separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int, types: tuple[type, ...] | None = None) -> list[Any]:
+    """
+    Inverso de `encode_cursor`; ValueError se o cursor for inválido. Com `types`, cada
+    valor precisa ser do tipo na mesma posição (bool não conta como int).
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except Exception as e:
+        raise ValueError("cursor inválido") from e
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("cursor inválido")
+    if types is not None and not all(
+        isinstance(v, t) and not (isinstance(v, bool) and t is not bool) for v, t in zip(values, types)
+    ):
+        raise ValueError("cursor inválido")
+    return values
@@ -0,0 +1,48 @@
+# app/utils/singleflight.py
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class _LeaderCancelled(Exception):
+    """O líder foi cancelado (ex.: cliente desconectou); quem esperava tenta de novo."""
+
+
+class SingleFlight:
+    """
+    Coalesce chamadas concorrentes com a mesma chave: enquanto uma está em andamento,
+    as demais aguardam o mesmo resultado (ou a mesma exceção) em vez de repetir a chamada.
+    Se o líder for cancelado, o cancelamento não se propaga: quem esperava refaz a
+    chamada (um deles vira o novo líder).
+    """
+
+    def __init__(self) -> None:
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        while True:
+            fut = self._inflight.get(key)
+            if fut is None:
+                return await self._lead(key, fn)
+            try:
+                return await asyncio.shield(fut)
+            except _LeaderCancelled:
+                continue
+
+    async def _lead(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            fut.set_exception(_LeaderCancelled())
+            fut.exception()
+            raise
+        except BaseException as e:
+            fut.set_exception(e)
+            fut.exception()  # marca como lida se ninguém estiver esperando
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(key, None)
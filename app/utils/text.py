@@ -0,0 +1,14 @@
+# app/utils/text.py
+import re
+import unicodedata
+
+
+def strip_accents_lower(s: str | None) -> str:
+    """'Polícia Civil' -> 'policia civil'"""
+    nfkd = unicodedata.normalize("NFKD", s or "")
+    return "".join(ch for ch in nfkd if not unicodedata.combining(ch)).lower()
+
+
+def search_terms(q: str | None) -> list[str]:
+    """Termos de busca normalizados (sem acento, minúsculos, só letras/dígitos)."""
+    return re.findall(r"[a-z0-9]+", strip_accents_lower(q))
@@ -0,0 +1,123 @@
+# scripts/bench_serialization.py
+"""
+Compara GET /students antes e depois do caminho rápido (linhas/s), com consulta real
+num SQLite temporário — o tempo inclui buscar as linhas e serializar a resposta:
+
+  antigo   select(Student) -> entidades ORM -> response_model (validate_python com
+           from_attributes + dump_json; é o que o FastAPI faz numa rota com
+           response_model e a response_class padrão)
+  novo     select(colunas) -> tuplas -> RowSerializer.dicts -> orjson
+           (app.core.responses)
+
+Cada repetição usa uma sessão nova, então a hidratação ORM (identity map, estado por
+instância) entra na conta do caminho antigo. A "serialização" do antigo inclui a
+validação do response_model linha a linha (EmailStr etc.), que o novo não faz.
+
+Uso: python -m scripts.bench_serialization [linhas] [repetições]
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from pydantic import TypeAdapter
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.responses import FastJSONResponse, row_serializer
+from app.db.base import Base
+from app.modules.students.models import Student
+from app.modules.students.schemas import StudentOut
+from app.modules.tenants.models import Tenant
+from app.modules.users.models import User
+
+MENTOR_ID = 1
+
+
+def _rows(n: int) -> list[dict]:
+    base = date(2024, 1, 1)
+    return [
+        {
+            "mentor_id": MENTOR_ID,
+            "nome": f"Aluno {i:06d}",
+            "email": f"aluno{i}@example.com",
+            "concurso": "TRT" if i % 3 else None,
+            "telefone": f"1199{i:07d}",
+            "status": "Ativo" if i % 5 else "Inativo",
+            "plano": "Mensal",
+            "cpf": f"{i:011d}",
+            "dia_vencimento": 1 + i % 28,
+            "data_compra": base + timedelta(days=i % 365),
+            "metodo_pagamento": "PIX",
+        }
+        for i in range(n)
+    ]
+
+
+async def _bench(label: str, sessions, fn, n: int, reps: int) -> None:
+    async with sessions() as db:
+        await fn(db)  # aquecimento
+    fetch = ser = 0.0
+    for _ in range(reps):
+        async with sessions() as db:
+            f, s, size = await fn(db)
+        fetch += f
+        ser += s
+    fetch, ser = fetch / reps, ser / reps
+    total = fetch + ser
+    print(
+        f"{label:<8} {n / total:>10,.0f} linhas/s  total {total * 1000:7.1f} ms"
+        f"  (busca {fetch * 1000:6.1f} + serialização {ser * 1000:6.1f})  {size / 1024:6.0f} KiB"
+    )
+
+
+async def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    reps = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda c: Base.metadata.create_all(c, tables=[Tenant.__table__, User.__table__, Student.__table__]))
+        await conn.execute(insert(Student), _rows(n))
+
+    adapter = TypeAdapter(list[StudentOut])
+    serializer = row_serializer(StudentOut, Student)
+
+    async def old(db):
+        t0 = time.perf_counter()
+        entities = (await db.execute(
+            select(Student).where(Student.mentor_id == MENTOR_ID).order_by(Student.nome)
+        )).scalars().all()
+        t1 = time.perf_counter()
+        body = adapter.dump_json(adapter.validate_python(entities, from_attributes=True))
+        return t1 - t0, time.perf_counter() - t1, len(body)
+
+    async def new(db):
+        t0 = time.perf_counter()
+        rows = (await db.execute(
+            select(*serializer.columns).where(Student.mentor_id == MENTOR_ID).order_by(Student.nome)
+        )).all()
+        t1 = time.perf_counter()
+        body = FastJSONResponse(serializer.dicts(rows)).body
+        return t1 - t0, time.perf_counter() - t1, len(body)
+
+    async with sessions() as db:
+        entities = (await db.execute(select(Student).order_by(Student.nome))).scalars().all()
+        rows = (await db.execute(select(*serializer.columns).order_by(Student.nome))).all()
+    expected = adapter.dump_json(adapter.validate_python(entities, from_attributes=True))
+    assert json.loads(expected) == json.loads(FastJSONResponse(serializer.dicts(rows)).body), "saídas divergentes"
+
+    print(f"{n} linhas, média de {reps} execuções (SQLite em {path})")
+    await _bench("antigo", sessions, old, n, reps)
+    await _bench("novo", sessions, new, n, reps)
+    await engine.dispose()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -10,6 +10,7 @@ from sqlalchemy import select, insert
 from app.db.session import AsyncSessionLocal
 from app.modules.tenants.models import Tenant
 from app.modules.users.models import User
+from app.modules.atividades.crud import seed_default_stages
 from app.core.security import hash_password
 
 async def main():
@@ -45,6 +46,8 @@ async def main():
             is_active=True,
         )
         db.add(u)
+        await db.flush()
+        await seed_default_stages(db, u.id)
         await db.commit()
         await db.refresh(u)
         print(f"Superadmin created: {u.id} ({u.email}) tenant={u.tenant_id}")